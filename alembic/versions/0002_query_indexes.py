@@ -0,0 +1,46 @@
+"""indexes for hot query shapes
+
+Revision ID: 0002_query_indexes
+Revises: 0001_seed
+Create Date: 2025-03-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002_query_indexes'
+down_revision = '0001_seed'
+branch_labels = None
+depends_on = None
+
+ACTIVE = "'NEW', 'CONFIRMED', 'COOKING', 'COURIER_ASSIGNED', 'OUT_FOR_DELIVERY'"
+
+# (nomi, jadval, ustunlar, partial sharti)
+INDEXES = [
+    ('ix_orders_created_at', 'orders', ['created_at'], None),
+    ('ix_orders_status', 'orders', ['status'], None),
+    ('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at'], None),
+    ('ix_orders_delivered_at', 'orders', ['delivered_at'], "status = 'DELIVERED'"),
+    ('ix_orders_active', 'orders', ['created_at'], f"status IN ({ACTIVE})"),
+    ('ix_orders_channel_message_id', 'orders', ['channel_message_id'], "channel_message_id IS NOT NULL"),
+    ('ix_order_items_order_id', 'order_items', ['order_id'], None),
+    ('ix_foods_is_active_category_id', 'foods', ['is_active', 'category_id'], None),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY — jadvallar yozish uchun bloklanmaydi; tranzaksiyadan tashqarida ishlaydi
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
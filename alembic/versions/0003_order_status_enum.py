@@ -0,0 +1,76 @@
+"""orders.status as native enum
+
+Revision ID: 0003_order_status_enum
+Revises: 0002_query_indexes
+Create Date: 2025-03-08 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003_order_status_enum'
+down_revision = '0002_query_indexes'
+branch_labels = None
+depends_on = None
+
+STATUSES = ('NEW', 'CONFIRMED', 'COOKING', 'COURIER_ASSIGNED', 'OUT_FOR_DELIVERY', 'DELIVERED', 'CANCELED')
+ACTIVE = "'NEW', 'CONFIRMED', 'COOKING', 'COURIER_ASSIGNED', 'OUT_FOR_DELIVERY'"
+
+# status ga bog'liq indekslar — ustun turi o'zgarganda qayta quriladi
+STATUS_INDEXES = [
+    ('ix_orders_status', ['status'], None),
+    ('ix_orders_delivered_at', ['delivered_at'], "status = 'DELIVERED'"),
+    ('ix_orders_active', ['created_at'], f"status IN ({ACTIVE})"),
+]
+
+
+def _check_unknown_statuses():
+    """Enum da yo'q statuslar bo'lsa — ALTER dan oldin to'xtash, id lar bilan.
+
+    Ularni qaysi statusga o'tkazish (masalan CANCELED) — ma'lumotga qarab qo'lda
+    hal qilinadi, migratsiya o'zi taxmin qilmaydi.
+    """
+    known = ", ".join(f"'{s}'" for s in STATUSES)
+    rows = op.get_bind().execute(sa.text(
+        f"SELECT status, count(*), (array_agg(id ORDER BY id))[1:20] FROM orders "
+        f"WHERE status NOT IN ({known}) GROUP BY status ORDER BY status"
+    )).all()
+    if rows:
+        details = "; ".join(f"{status!r}: {count} ta, id={ids}" for status, count, ids in rows)
+        raise RuntimeError(f"orders.status da noma'lum qiymatlar bor, avval tuzating — {details}")
+
+
+def _drop_status_indexes():
+    for name, _, _ in STATUS_INDEXES:
+        op.drop_index(name, table_name='orders', if_exists=True)
+
+
+def _create_status_indexes():
+    for name, columns, where in STATUS_INDEXES:
+        op.create_index(name, 'orders', columns, postgresql_where=sa.text(where) if where else None)
+
+
+def upgrade() -> None:
+    order_status = sa.Enum(*STATUSES, name='order_status')
+    order_status.create(op.get_bind(), checkfirst=True)
+
+    _drop_status_indexes()
+    # Eski satrlarda katta-kichik harf yoki bo'sh joy farqi bo'lishi mumkin
+    op.execute("UPDATE orders SET status = upper(trim(status::text)) WHERE status::text <> upper(trim(status::text))")
+    op.execute("UPDATE orders SET status = 'NEW' WHERE status IS NULL")
+    _check_unknown_statuses()
+    op.execute("ALTER TABLE orders ALTER COLUMN status DROP DEFAULT")
+    op.execute("ALTER TABLE orders ALTER COLUMN status TYPE order_status USING status::text::order_status")
+    op.execute("ALTER TABLE orders ALTER COLUMN status SET DEFAULT 'NEW'")
+    op.execute("ALTER TABLE orders ALTER COLUMN status SET NOT NULL")
+    _create_status_indexes()
+
+
+def downgrade() -> None:
+    _drop_status_indexes()
+    op.execute("ALTER TABLE orders ALTER COLUMN status DROP NOT NULL")
+    op.execute("ALTER TABLE orders ALTER COLUMN status DROP DEFAULT")
+    op.execute("ALTER TABLE orders ALTER COLUMN status TYPE VARCHAR(32) USING status::text")
+    op.execute("ALTER TABLE orders ALTER COLUMN status SET DEFAULT 'NEW'")
+    _create_status_indexes()
+    sa.Enum(name='order_status').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,23 @@
+"""foods.image_variants
+
+Revision ID: 0004_food_image_variants
+Revises: 0003_order_status_enum
+Create Date: 2025-03-10 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004_food_image_variants'
+down_revision = '0003_order_status_enum'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # {"src": ".../uploads/v/<id>", "w": [160, 320, 640]} — app/services/images.py
+    op.add_column('foods', sa.Column('image_variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('foods', 'image_variants')
@@ -0,0 +1,40 @@
+"""notification_outbox
+
+Revision ID: 0005_notification_outbox
+Revises: 0004_food_image_variants
+Create Date: 2025-03-12 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005_notification_outbox'
+down_revision = '0004_food_image_variants'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Telegram xabarlari navbati — app/services/outbox.py
+    op.create_table(
+        'notification_outbox',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('kind', sa.String(32), nullable=False),
+        sa.Column('order_id', sa.Integer(), sa.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    # Worker faqat yuborilmaganlarni o'qiydi — indeks kichik bo'lib qoladi
+    op.create_index(
+        'ix_notification_outbox_pending', 'notification_outbox', ['next_attempt_at'],
+        postgresql_where=sa.text('sent_at IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notification_outbox_pending', table_name='notification_outbox')
+    op.drop_table('notification_outbox')
@@ -0,0 +1,26 @@
+"""users.phone — guestlar telefon bo'yicha
+
+Revision ID: 0006_user_phone
+Revises: 0005_notification_outbox
+Create Date: 2025-03-14 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006_user_phone'
+down_revision = '0005_notification_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Guest: phone = "+998901234567", tg_id = -998901234567 (app/services/guests.py).
+    # Eski guestlar keyin fon vazifasi / `python -m app.services.guests --merge` bilan birlashtiriladi.
+    op.add_column('users', sa.Column('phone', sa.String(32), nullable=True))
+    op.create_index('ix_users_phone', 'users', ['phone'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_phone', table_name='users')
+    op.drop_column('users', 'phone')
@@ -0,0 +1,81 @@
+"""kunlik savdo yig'indilari — daily_sales, daily_food_sales, daily_courier_sales
+
+Revision ID: 0007_sales_rollups
+Revises: 0006_user_phone
+Create Date: 2025-03-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007_sales_rollups'
+down_revision = '0006_user_phone'
+branch_labels = None
+depends_on = None
+
+# Mahalliy kun (UTC+5, app/utils/time.py) — app/services/rollups.py dagi local_day_sql bilan bir xil
+CREATED_DAY = "CAST(timezone('UTC', o.created_at) + interval '18000 seconds' AS DATE)"
+DELIVERED_DAY = "CAST(timezone('UTC', o.delivered_at) + interval '18000 seconds' AS DATE)"
+
+
+def upgrade() -> None:
+    op.create_table(
+        'daily_sales',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('orders_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('orders_total', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('delivered_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('canceled_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_table(
+        'daily_food_sales',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('food_id', sa.Integer(), primary_key=True),
+        sa.Column('qty', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Float(), nullable=False, server_default='0'),
+    )
+    op.create_table(
+        'daily_courier_sales',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('courier_id', sa.Integer(), primary_key=True),
+        sa.Column('delivered_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Float(), nullable=False, server_default='0'),
+    )
+
+    # Mavjud buyurtmalardan boshlang'ich to'ldirish; keyinchalik qayta qurish:
+    # python -m app.services.rollups --rebuild
+    op.execute(f"""
+        INSERT INTO daily_sales (day, orders_count, orders_total, delivered_count, revenue, canceled_count)
+        SELECT day, sum(orders_count), sum(orders_total), sum(delivered_count), sum(revenue), sum(canceled_count)
+        FROM (
+            SELECT {CREATED_DAY} AS day, count(*) AS orders_count, sum(o.total) AS orders_total,
+                   0 AS delivered_count, 0.0 AS revenue,
+                   count(*) FILTER (WHERE o.status = 'CANCELED') AS canceled_count
+            FROM orders o GROUP BY 1
+            UNION ALL
+            SELECT {DELIVERED_DAY}, 0, 0.0, count(*), sum(o.total), 0
+            FROM orders o WHERE o.status = 'DELIVERED' AND o.delivered_at IS NOT NULL GROUP BY 1
+        ) parts
+        GROUP BY day
+    """)
+    op.execute(f"""
+        INSERT INTO daily_food_sales (day, food_id, qty, revenue)
+        SELECT {CREATED_DAY}, oi.food_id, sum(oi.qty), sum(oi.line_total)
+        FROM order_items oi JOIN orders o ON o.id = oi.order_id
+        WHERE oi.food_id IS NOT NULL
+        GROUP BY 1, 2
+    """)
+    op.execute(f"""
+        INSERT INTO daily_courier_sales (day, courier_id, delivered_count, revenue)
+        SELECT {DELIVERED_DAY}, o.courier_id, count(*), sum(o.total)
+        FROM orders o
+        WHERE o.status = 'DELIVERED' AND o.delivered_at IS NOT NULL AND o.courier_id IS NOT NULL
+        GROUP BY 1, 2
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('daily_courier_sales')
+    op.drop_table('daily_food_sales')
+    op.drop_table('daily_sales')
@@ -0,0 +1,32 @@
+"""order_items(food_id, order_id) indeksi — taom bo'yicha agregatlar
+
+Revision ID: 0008_order_items_food_index
+Revises: 0007_sales_rollups
+Create Date: 2025-03-17 00:00:00.000000
+
+"""
+from alembic import op
+
+revision = '0008_order_items_food_index'
+down_revision = '0007_sales_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Yig'indilarni qayta qurish (food_id bo'yicha GROUP BY), taomning oxirgi
+    # name_snapshot i va foods dan DELETE dagi FK tekshiruvi — shu indeksdan
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_order_items_food_id_order_id', 'order_items', ['food_id', 'order_id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_order_items_food_id_order_id', table_name='order_items',
+            postgresql_concurrently=True, if_exists=True,
+        )
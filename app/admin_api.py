@@ -2,25 +2,31 @@
 app/admin_api.py  —  Admin REST API (web panel uchun)
 """
 from fastapi import APIRouter, HTTPException, Query, UploadFile, File
-from sqlalchemy import select, func, cast, String, desc
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, desc, tuple_
+from sqlalchemy.orm import selectinload, noload
 from typing import Optional
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime
 from pydantic import BaseModel
-import os, uuid, shutil
+import os
 
 from app.db.session import AsyncSessionFactory
-from app.models.order import Order
-from app.models.order_item import OrderItem
+from app.models.order import Order, OrderStatus, ACTIVE_STATUSES
 from app.models.food import Food
 from app.models.category import Category
 from app.models.courier import Courier
 from app.models.promo import Promo
 from app.services.settings_service import set_setting, get_setting
+from app.services.stats import get_stats, get_food_ranking
+from app.services.orders import apply_status_change
+from app.services.menu_cache import refresh_menu_snapshot
+from app.services.images import UPLOAD_DIR, build_variants, variants_for_url
+from app.services.uploads import save_upload, collect_garbage, EXTENSIONS as UPLOAD_EXTENSIONS
+from app.services import shared_cache, outbox
+from app.responses import FastJSONResponse
+from app.services.pagination import encode_cursor, decode_cursor, parse_fields
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
-UPLOAD_DIR = "web_app/uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 # ── Schemas ──────────────────────────────────────
@@ -32,6 +38,7 @@ class FoodCreate(BaseModel):
     price: float
     rating: float = 5.0
     image_url: Optional[str] = None
+    image_variants: Optional[dict] = None
     is_new: bool = False
     is_active: bool = True
 
@@ -42,6 +49,7 @@ class FoodUpdate(BaseModel):
     price: Optional[float] = None
     rating: Optional[float] = None
     image_url: Optional[str] = None
+    image_variants: Optional[dict] = None
     is_new: Optional[bool] = None
     is_active: Optional[bool] = None
 
@@ -68,42 +76,58 @@ class SettingUpdate(BaseModel):
 
 # ── Image Upload ─────────────────────────────────
 
-ALLOWED = {"image/jpeg", "image/png", "image/webp", "image/gif"}
+ALLOWED = set(UPLOAD_EXTENSIONS)
 
 @router.post("/upload-image")
 async def upload_image(file: UploadFile = File(...)):
     if file.content_type not in ALLOWED:
         raise HTTPException(400, "Faqat jpg, png, webp, gif ruxsat")
-    ext = file.filename.rsplit(".", 1)[-1].lower() if "." in (file.filename or "") else "jpg"
-    name = f"{uuid.uuid4().hex}.{ext}"
-    with open(os.path.join(UPLOAD_DIR, name), "wb") as f:
-        shutil.copyfileobj(file.file, f)
+    set_id, name = await save_upload(file)
     base = os.environ.get("WEBHOOK_URL", "")
-    return {"url": f"{base}/uploads/{name}"}
+    # Bir xil rasm qayta yuklansa variantlar ham qayta qurilmaydi.
+    # Pillow bo'lmasa yoki rasm o'qilmasa — variants None, original ishlatiladi
+    variants = variants_for_url(name, base) or await build_variants(os.path.join(UPLOAD_DIR, name), set_id, base)
+    return {"url": f"{base}/uploads/{name}", "variants": variants}
+
+@router.post("/uploads/gc")
+async def admin_uploads_gc(dry_run: bool = Query(True)):
+    """Hech bir taomga bog'lanmagan yuklamalarni o'chirish (standart: faqat ro'yxat)"""
+    async with AsyncSessionFactory() as s:
+        return await collect_garbage(s, dry_run=dry_run)
 
 # ── Stats ─────────────────────────────────────────
 
 @router.get("/stats")
-async def admin_stats(period: str = Query("today")):
-    now = datetime.now(timezone.utc)
-    since = now.replace(hour=0,minute=0,second=0,microsecond=0) if period=="today" else now - timedelta(days=7 if period=="week" else 30)
-    async with AsyncSessionFactory() as s:
-        cnt   = (await s.execute(select(func.count()).where(Order.created_at>=since))).scalar() or 0
-        dlvd  = (await s.execute(select(func.count()).where(cast(Order.status,String)=="DELIVERED", Order.delivered_at>=since))).scalar() or 0
-        rev   = float((await s.execute(select(func.sum(Order.total)).where(cast(Order.status,String)=="DELIVERED", Order.delivered_at>=since))).scalar() or 0)
-        act   = (await s.execute(select(func.count()).where(cast(Order.status,String).in_(["NEW","CONFIRMED","COOKING","COURIER_ASSIGNED","OUT_FOR_DELIVERY"])))).scalar() or 0
-        tops  = (await s.execute(
-            select(OrderItem.name_snapshot, func.sum(OrderItem.qty).label("q"))
-            .join(Order).where(Order.created_at>=since)
-            .group_by(OrderItem.name_snapshot).order_by(func.sum(OrderItem.qty).desc()).limit(5)
-        )).all()
-    return {"orders_count":cnt,"delivered_count":dlvd,"revenue":rev,"active_count":act,
-            "top_foods":[{"name":r[0],"qty":int(r[1])} for r in tops]}
+async def admin_stats(
+    period: str = Query("today"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+):
+    """Kunlik yig'indilardan, istalgan oraliq (?from=2025-03-01&to=2025-03-31) — services/stats.py"""
+    _check_range(date_from, date_to)
+    return await get_stats(period, date_from, date_to)
+
+@router.get("/stats/foods")
+async def admin_stats_foods(
+    period: str = Query("today"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+):
+    """Barcha taomlar reytingi (soni, tushumi, ulushi %) — /stats bilan bir xil oraliq va kesh"""
+    _check_range(date_from, date_to)
+    return await get_food_ranking(period, date_from, date_to)
+
+def _check_range(date_from: Optional[date], date_to: Optional[date]):
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(400, "'from' sanasi 'to' dan keyin bo'lishi mumkin emas")
 
 # ── Orders ────────────────────────────────────────
 
-def _ser_order(o):
-    return {
+ORDER_FIELDS = ("id", "order_number", "customer_name", "phone", "comment", "total", "status",
+                "promo_code", "created_at", "delivered_at", "courier", "items")
+
+def _ser_order(o, only=None):
+    d = {
         "id": o.id, "order_number": o.order_number,
         "customer_name": o.customer_name, "phone": o.phone,
         "comment": o.comment, "total": float(o.total),
@@ -113,53 +137,59 @@ def _ser_order(o):
         "courier": {"id": o.courier.id, "name": o.courier.name} if o.courier else None,
         "items": [{"id":i.id,"name_snapshot":i.name_snapshot,"qty":i.qty,
                    "price_snapshot":float(i.price_snapshot),"line_total":float(i.line_total)}
-                  for i in (o.items or [])],
+                  for i in (o.items or [])] if not only or "items" in only else None,
     }
+    return {k: d[k] for k in only} if only else d
+
+def _parse_status(value: str) -> OrderStatus:
+    try:
+        return OrderStatus(value)
+    except ValueError:
+        raise HTTPException(400, f"Noto'g'ri status: {value}")
 
 @router.get("/orders")
-async def admin_orders(status: Optional[str]=None, limit: int=Query(100,le=500)):
-    active = ["NEW","CONFIRMED","COOKING","COURIER_ASSIGNED","OUT_FOR_DELIVERY"]
+async def admin_orders(status: Optional[str]=None, limit: int=Query(100,le=500),
+                       cursor: Optional[str]=None, fields: Optional[str]=None):
+    """(created_at, id) bo'yicha keyset; keyingi sahifa kursori X-Next-Cursor da"""
+    only = parse_fields(fields, ORDER_FIELDS)
+    # user serializatsiya qilinmaydi; items/courier faqat so'ralganda yuklanadi
+    opts = [noload(Order.user)]
+    opts.append(selectinload(Order.items) if not only or "items" in only else noload(Order.items))
+    opts.append(selectinload(Order.courier) if not only or "courier" in only else noload(Order.courier))
     async with AsyncSessionFactory() as s:
-        q = select(Order).options(selectinload(Order.items),selectinload(Order.user),selectinload(Order.courier)).order_by(desc(Order.created_at)).limit(limit)
-        if status=="active": q=q.where(cast(Order.status,String).in_(active))
-        elif status: q=q.where(cast(Order.status,String)==status)
-        return [_ser_order(o) for o in (await s.execute(q)).scalars().all()]
+        q = select(Order).options(*opts).order_by(desc(Order.created_at), desc(Order.id)).limit(limit)
+        if status=="active": q=q.where(Order.status.in_(ACTIVE_STATUSES))
+        elif status: q=q.where(Order.status==_parse_status(status))
+        if cursor:
+            c = decode_cursor(cursor)
+            try:
+                c_at, c_id = datetime.fromisoformat(c[0]), int(c[1])
+            except (IndexError, TypeError, ValueError):
+                raise HTTPException(400, "Noto'g'ri cursor")
+            q = q.where(tuple_(Order.created_at, Order.id) < tuple_(c_at, c_id))
+        orders = (await s.execute(q)).scalars().all()
+    headers = {}
+    if len(orders) == limit:
+        last = orders[-1]
+        headers["X-Next-Cursor"] = encode_cursor([last.created_at.isoformat(), last.id])
+    # Tayyor dict lar — jsonable_encoder dan o'tkazmasdan kodlanadi
+    return FastJSONResponse([_ser_order(o, only) for o in orders], headers=headers)
 
 @router.patch("/orders/{oid}/status")
 async def admin_order_status(oid: int, body: OrderStatusUpdate):
+    new_status = _parse_status(body.status)
     async with AsyncSessionFactory() as s:
         res = await s.execute(
-            select(Order)
-            .options(selectinload(Order.user), selectinload(Order.courier), selectinload(Order.items))
-            .where(Order.id==oid)
+            select(Order).options(selectinload(Order.user)).where(Order.id==oid)
         )
         o = res.scalar_one_or_none()
         if not o: raise HTTPException(404, "Buyurtma topilmadi")
-        o.status = body.status
-        if body.status == "DELIVERED":
-            o.delivered_at = datetime.now(timezone.utc)
+        await apply_status_change(s, o, new_status)
+        # Mijoz va kanal xabarlari status bilan bitta commit da (outbox worker yuboradi)
+        outbox.enqueue_status_change(s, o)
         await s.commit()
-        await s.refresh(o)
-
-        # Foydalanuvchiga Telegram xabari
-        try:
-            from aiogram import Bot
-            from app.config import settings
-            from app.services.telegram_notify import notify_user_status, update_channel_message
-            from app.services.settings_service import get_shop_channel_id
-            _bot = Bot(token=settings.BOT_TOKEN)
-            try:
-                if o.user and o.user.tg_id and o.user.tg_id > 0:
-                    await notify_user_status(_bot, o.user.tg_id, o)
-                shop_channel_id = await get_shop_channel_id(s)
-                if shop_channel_id and o.channel_message_id:
-                    closed = body.status in ("DELIVERED", "CANCELED")
-                    await update_channel_message(_bot, shop_channel_id, o.channel_message_id, o, closed=closed)
-            finally:
-                await _bot.session.close()
-        except Exception as e:
-            import logging
-            logging.getLogger(__name__).warning(f"Telegram notify xatosi: {e}")
+    outbox.wake()
+    await shared_cache.invalidate("stats")
 
     return {"ok": True}
 
@@ -167,9 +197,13 @@ async def admin_order_status(oid: int, body: OrderStatusUpdate):
 
 @router.post("/foods")
 async def admin_create_food(body: FoodCreate):
+    data = body.model_dump()
+    if data["image_url"] and not data["image_variants"]:
+        data["image_variants"] = variants_for_url(data["image_url"], os.environ.get("WEBHOOK_URL", ""))
     async with AsyncSessionFactory() as s:
-        f = Food(**body.model_dump())
+        f = Food(**data)
         s.add(f); await s.commit(); await s.refresh(f)
+    await refresh_menu_snapshot()
     return {"id": f.id, "name": f.name}
 
 @router.put("/foods/{fid}")
@@ -178,9 +212,14 @@ async def admin_update_food(fid: int, body: FoodUpdate):
         res = await s.execute(select(Food).where(Food.id==fid))
         f = res.scalar_one_or_none()
         if not f: raise HTTPException(404,"Taom topilmadi")
-        for k,v in body.model_dump(exclude_none=True).items():
+        data = body.model_dump(exclude_none=True)
+        if "image_url" in data and "image_variants" not in data and data["image_url"] != f.image_url:
+            # Yangi rasm — eski variantlar endi mos emas
+            data["image_variants"] = variants_for_url(data["image_url"], os.environ.get("WEBHOOK_URL", ""))
+        for k,v in data.items():
             setattr(f,k,v)
         await s.commit()
+    await refresh_menu_snapshot()
     return {"ok": True}
 
 @router.delete("/foods/{fid}")
@@ -190,6 +229,7 @@ async def admin_delete_food(fid: int):
         f = res.scalar_one_or_none()
         if not f: raise HTTPException(404,"Taom topilmadi")
         await s.delete(f); await s.commit()
+    await refresh_menu_snapshot()
     return {"ok": True}
 
 # ── Categories ────────────────────────────────────
@@ -206,6 +246,7 @@ async def admin_create_cat(body: CategoryCreate):
     async with AsyncSessionFactory() as s:
         await s.execute(text("SELECT setval('categories_id_seq', GREATEST((SELECT COALESCE(MAX(id),0) FROM categories),1))"))
         c = Category(name=body.name); s.add(c); await s.commit(); await s.refresh(c)
+    await refresh_menu_snapshot()
     return {"id":c.id,"name":c.name}
 
 @router.delete("/categories/{cid}")
@@ -215,6 +256,7 @@ async def admin_delete_cat(cid: int):
         c = res.scalar_one_or_none()
         if not c: raise HTTPException(404,"Kategoriya topilmadi")
         await s.delete(c); await s.commit()
+    await refresh_menu_snapshot()
     return {"ok": True}
 
 # ── Couriers ──────────────────────────────────────
@@ -267,6 +309,7 @@ async def admin_create_promo(body: PromoCreate):
         p = Promo(code=body.code.upper(),discount_percent=body.discount_percent,
                   usage_limit=body.usage_limit,expires_at=body.expires_at,is_active=True,used_count=0)
         s.add(p); await s.commit(); await s.refresh(p)
+    await shared_cache.invalidate("promo")
     return {"id":p.id,"code":p.code}
 
 @router.delete("/promos/{pid}")
@@ -276,6 +319,7 @@ async def admin_delete_promo(pid: int):
         p = res.scalar_one_or_none()
         if not p: raise HTTPException(404,"Promokod topilmadi")
         await s.delete(p); await s.commit()
+    await shared_cache.invalidate("promo")
     return {"ok": True}
 
 # ── Settings ──────────────────────────────────────
@@ -284,7 +328,9 @@ async def admin_delete_promo(pid: int):
 async def admin_get_settings():
     async with AsyncSessionFactory() as s:
         shop = await get_setting(s, "shop_channel_id")
-    return {"shop_channel_id": shop}
+        is_open = await get_setting(s, "shop_is_open")
+        hours = await get_setting(s, "work_hours")
+    return {"shop_channel_id": shop, "shop_is_open": is_open, "work_hours": hours}
 
 @router.post("/settings")
 async def admin_save_setting(body: SettingUpdate):
@@ -298,7 +344,7 @@ async def admin_save_setting(body: SettingUpdate):
 @router.get("/test-channel")
 async def admin_test_channel(channel_id: str = Query(...)):
     """Bot kanalga kira olishini tekshirish"""
-    from app.main import bot
+    from app.bot import bot
     try:
         cid = int(channel_id)
     except ValueError:
@@ -337,27 +383,38 @@ def _add_log(level: str, msg: str):
 async def admin_get_logs():
     return {"logs": list(_LOG_BUFFER)}
 
+@router.get("/outbox")
+async def admin_outbox():
+    """Telegram xabarlari navbati: kutilayotgan / qayta urinilayotgan / voz kechilgan"""
+    from app.services.telegram_sender import scheduler
+    async with AsyncSessionFactory() as s:
+        stats = await outbox.get_outbox_stats(s)
+    return {**stats, "sender": scheduler.stats()}
+
 # ── Database Management ──────────────────────────────────────────────────────
 
 from app.models.user import User as UserModel
 from app.models.order_item import OrderItem as OrderItemModel
 from sqlalchemy import text, inspect as sa_inspect
 
+# Buyurtmalar o'chirilsa kunlik yig'indilar ham (services/rollups.py)
+ROLLUP_TABLES = ["daily_sales", "daily_food_sales", "daily_courier_sales"]
+
 CLEARABLE_TABLES = {
     "orders": {
         "label": "Buyurtmalar",
         "description": "Barcha buyurtmalar (order_items ham o'chadi)",
-        "depends": ["order_items"],
+        "depends": ["order_items", *ROLLUP_TABLES],
     },
     "order_items": {
         "label": "Buyurtma elementlari",
         "description": "Barcha buyurtma qatorlari",
-        "depends": [],
+        "depends": ["daily_food_sales"],
     },
     "users": {
         "label": "Foydalanuvchilar",
         "description": "Barcha botdan ro'yxatdan o'tgan userlar",
-        "depends": ["orders", "order_items"],
+        "depends": ["orders", "order_items", *ROLLUP_TABLES],
     },
     "promos": {
         "label": "Promokodlar",
@@ -372,12 +429,12 @@ CLEARABLE_TABLES = {
     "foods": {
         "label": "Taomlar",
         "description": "Barcha menu taomlar",
-        "depends": ["order_items"],
+        "depends": ["order_items", "daily_food_sales"],
     },
     "categories": {
         "label": "Kategoriyalar",
         "description": "Barcha kategoriyalar",
-        "depends": ["foods", "order_items"],
+        "depends": ["foods", "order_items", "daily_food_sales"],
     },
     "app_settings": {
         "label": "Sozlamalar",
@@ -432,6 +489,16 @@ async def admin_clear_table(body: ClearTableRequest):
             await s.rollback()
             raise HTTPException(500, f"Tozalashda xatolik: {str(e)}")
 
+    cleared = {body.table, *(CLEARABLE_TABLES[body.table]["depends"] if body.cascade else [])}
+    if cleared & {"foods", "categories"}:
+        await refresh_menu_snapshot()
+    if "promos" in cleared:
+        await shared_cache.invalidate("promo")
+    if "app_settings" in cleared:
+        await shared_cache.invalidate("settings")
+    if cleared & {"orders", *ROLLUP_TABLES}:
+        await shared_cache.invalidate("stats")
+
     return {"ok": True, "table": body.table, "remaining_rows": remaining}
 
 
@@ -1,12 +1,19 @@
 import hashlib
 import hmac
 import json
+import time
 import urllib.parse
-from fastapi import HTTPException, Query, Depends
+from collections import OrderedDict
+from fastapi import HTTPException, Query, Depends, Request, Response
+from app.responses import FastJSONResponse
+from app.http_cache import etag_matches, gzip_etag
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
 from app.db.session import AsyncSessionFactory
-from app.services.foods import get_all_categories
+from app.services.menu_cache import get_menu_snapshot, encode_json, gzip_body, FOOD_FIELDS
+from app.services.pagination import encode_cursor, decode_cursor, parse_fields
+from app.services.search import search_index
+from app.services.settings_service import get_shop_status
 from app.services.promo import validate_promo
 from typing import Optional
 import logging
@@ -14,80 +21,188 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+# BOT_TOKEN o'zgarmaydi — HMAC kalitini bir marta hisoblaymiz
+_WEBAPP_SECRET = hmac.new(b"WebAppData", settings.BOT_TOKEN.encode(), hashlib.sha256).digest()
+
+# Tasdiqlangan initData → (auth_date, user). Sessiya davomida bir xil satr qayta keladi.
+_verified_init_data: "OrderedDict[str, tuple[int, dict]]" = OrderedDict()
+
+
+def _is_expired(auth_date: int, now: float) -> bool:
+    return settings.INIT_DATA_MAX_AGE > 0 and now - auth_date > settings.INIT_DATA_MAX_AGE
+
+
 def verify_telegram_init_data(init_data: str) -> Optional[dict]:
+    now = time.time()
+    hit = _verified_init_data.get(init_data)
+    if hit is not None:
+        auth_date, user = hit
+        if _is_expired(auth_date, now):
+            _verified_init_data.pop(init_data, None)
+            return None
+        _verified_init_data.move_to_end(init_data)
+        return user
+
     try:
         parsed = dict(urllib.parse.parse_qsl(init_data, keep_blank_values=True))
         received_hash = parsed.pop("hash", None)
         if not received_hash:
             return None
         data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(parsed.items()))
-        secret_key = hmac.new(b"WebAppData", settings.BOT_TOKEN.encode(), hashlib.sha256).digest()
-        calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+        calculated_hash = hmac.new(_WEBAPP_SECRET, data_check_string.encode(), hashlib.sha256).hexdigest()
         if not hmac.compare_digest(calculated_hash, received_hash):
             return None
+        auth_date = int(parsed.get("auth_date") or 0)
+        if settings.INIT_DATA_MAX_AGE > 0 and not auth_date:
+            return None
+        if _is_expired(auth_date, now):
+            return None
         user_data = parsed.get("user")
-        if user_data:
-            return json.loads(user_data)
-        return parsed
+        user = json.loads(user_data) if user_data else parsed
     except Exception as e:
         logger.error(f"InitData verify error: {e}")
         return None
 
+    _verified_init_data[init_data] = (auth_date, user)
+    if len(_verified_init_data) > settings.INIT_DATA_CACHE_SIZE:
+        _verified_init_data.popitem(last=False)
+    return user
+
 
 async def get_db():
     async with AsyncSessionFactory() as session:
         yield session
 
 
+def cached_json_response(request: Request, body: bytes, etag: str, gz: Optional[bytes] = None) -> Response:
+    """
+    Oldindan kodlangan JSON; If-None-Match mos kelsa 304 (tanasiz) qaytadi.
+
+    ``gz`` — shu tananing oldindan siqilgan nusxasi: gzip qabul qiladigan
+    klientga ``Content-Encoding: gzip`` va ``-gz`` ETag bilan beriladi
+    (GZipMiddleware unga tegmaydi, har so'rovda qayta siqilmaydi).
+    """
+    headers = {"Cache-Control": "no-cache"}
+    encoding = None
+    if gz is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        # Siqilmagan variantga Vary ni GZipMiddleware o'zi qo'shadi
+        headers["Vary"] = "Accept-Encoding"
+        body, etag, encoding = gz, gzip_etag(etag), "gzip"
+    headers["ETag"] = etag
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 async def api_categories(
+    request: Request,
     init_data: str = Query(default=""),
-    session: AsyncSession = Depends(get_db),
 ):
     if init_data and not verify_telegram_init_data(init_data):
         raise HTTPException(status_code=403, detail="Invalid initData")
-    cats = await get_all_categories(session)
-    return [{"id": c.id, "name": c.name} for c in cats]
+    snap = await get_menu_snapshot()
+    return cached_json_response(request, snap.categories_json, snap.etag("cats"), snap.categories_gz)
 
 
 async def api_foods(
+    request: Request,
     category_id: Optional[int] = Query(default=None),
     sort: Optional[str] = Query(default=None),
+    limit: Optional[int] = Query(default=None, ge=1, le=200),
+    cursor: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(default=None),
     init_data: str = Query(default=""),
-    session: AsyncSession = Depends(get_db),
 ):
     if init_data and not verify_telegram_init_data(init_data):
         raise HTTPException(status_code=403, detail="Invalid initData")
+    snap = await get_menu_snapshot()
+    cid, sort = snap.variant(category_id, sort)
+    if limit is None and cursor is None and fields is None:
+        return cached_json_response(
+            request, snap.get_foods_json(cid, sort), snap.etag("foods", cid or 0, sort or "id"),
+            snap.get_foods_gz(cid, sort),
+        )
+
+    # Sahifalangan / qisqartirilgan ro'yxat — (sort kaliti, id) bo'yicha keyset
+    after = None
+    if cursor:
+        values = decode_cursor(cursor)
+        if not values or values[0] != (sort or ""):
+            raise HTTPException(400, "Cursor boshqa sort uchun")
+        after = tuple(values[1:])
+        if not all(isinstance(v, (int, float)) for v in after):
+            raise HTTPException(400, "Noto'g'ri cursor")
+    only = parse_fields(fields, FOOD_FIELDS)
+    foods, next_key = snap.get_foods_page(cid, sort, after, limit or 50)
+    if only:
+        foods = [{k: f[k] for k in only} for f in foods]
+    headers = {"X-Next-Cursor": encode_cursor([sort or "", *next_key])} if next_key else {}
+    return FastJSONResponse(content=foods, headers=headers)
+
+
+async def api_food_search(
+    q: str = Query(..., min_length=1, max_length=64),
+    category_id: Optional[int] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+    init_data: str = Query(default=""),
+):
+    if init_data and not verify_telegram_init_data(init_data):
+        raise HTTPException(status_code=403, detail="Invalid initData")
+    await get_menu_snapshot()  # index snapshot bilan birga quriladi
+    return search_index.search(q, limit=limit, category_id=category_id)
+
+
+async def api_food_detail(
+    food_id: int,
+    init_data: str = Query(default=""),
+):
+    if init_data and not verify_telegram_init_data(init_data):
+        raise HTTPException(status_code=403, detail="Invalid initData")
+    snap = await get_menu_snapshot()
+    food = snap.foods_by_id.get(food_id)
+    if not food:
+        raise HTTPException(status_code=404, detail="Taom topilmadi")
+    return food
+
 
-    from sqlalchemy import select
-    from app.models.food import Food as FoodModel
-
-    query = select(FoodModel).where(FoodModel.is_active == True)
-    if category_id:
-        query = query.where(FoodModel.category_id == category_id)
-    if sort == "rating":
-        query = query.order_by(FoodModel.rating.desc())
-    elif sort == "new":
-        query = query.order_by(FoodModel.created_at.desc())
-    elif sort == "price_asc":
-        query = query.order_by(FoodModel.price.asc())
-    elif sort == "price_desc":
-        query = query.order_by(FoodModel.price.desc())
-
-    result = await session.execute(query)
-    foods = result.scalars().all()
-    return [
-        {
-            "id": f.id,
-            "name": f.name,
-            "description": f.description,
-            "price": f.price,
-            "rating": f.rating,
-            "is_new": f.is_new,
-            "image_url": f.image_url,
-            "category_id": f.category_id,
-        }
-        for f in foods
-    ]
+# Mini-app birinchi ochilishi: kategoriyalar + taomlar + do'kon holati bitta javobda.
+# Tayyor (gzip) baytlar menyu versiyasi va do'kon holati bo'yicha keshlanadi.
+_bootstrap_cache: dict[tuple[str, bytes], tuple[str, bytes, Optional[bytes]]] = {}
+
+
+def _bootstrap_body(snap, shop: dict) -> tuple[str, bytes, Optional[bytes]]:
+    shop_json = encode_json(shop)
+    key = (snap.version, shop_json)
+    hit = _bootstrap_cache.get(key)
+    if hit:
+        return hit
+    body = b"".join([
+        b'{"version":', encode_json(snap.version),
+        b',"categories":', snap.categories_json,
+        b',"foods":', snap.get_foods_json(),
+        b',"shop":', shop_json, b"}",
+    ])
+    etag = snap.etag("boot", hashlib.sha1(shop_json).hexdigest()[:8])
+    entry = (etag, body, gzip_body(body))
+    if len(_bootstrap_cache) >= 8:
+        _bootstrap_cache.clear()
+    _bootstrap_cache[key] = entry
+    return entry
+
+
+async def api_bootstrap(
+    request: Request,
+    init_data: str = Query(default=""),
+):
+    if init_data and not verify_telegram_init_data(init_data):
+        raise HTTPException(status_code=403, detail="Invalid initData")
+    snap = await get_menu_snapshot()
+    async with AsyncSessionFactory() as session:
+        shop = await get_shop_status(session)
+    etag, body, gz = _bootstrap_body(snap, shop)
+    return cached_json_response(request, body, etag, gz)
 
 
 async def api_promo_validate(
@@ -106,30 +221,38 @@ async def api_promo_validate(
 # ─────────────────────────────────────────────
 # POST /api/orders  — brauzerdan buyurtma qabul qilish
 # ─────────────────────────────────────────────
+import asyncio
+import contextlib
 from pydantic import BaseModel
 from typing import List, Any
-from sqlalchemy import select, desc
-from app.models.user import User
-from app.models.order import Order
-from app.services.orders import create_order, set_channel_message_id
-from app.services.promo import use_promo
-from app.services.settings_service import get_shop_channel_id
-import time
+from app.services import shared_cache
+from app.services.guests import normalize_phone
+from fastapi import Header
+from app.services import kv_store
+from app.services.orders import (
+    ORDER_COOLDOWN, ORDER_LOCK_TTL, create_order, find_user_for_order, in_order_cooldown, order_lock,
+    start_order_cooldown,
+)
+from app.services.promo import PromoUnavailable, checkout_promo
+from app.services.pricing import CartError, MIN_ORDER_TOTAL, price_cart
 
-_order_cooldown: dict[int, float] = {}
-ORDER_COOLDOWN = 60
+IDEMPOTENCY_TTL = 24 * 3600     # saqlangan javob shuncha vaqt qayta beriladi
+# Birinchi so'rov bajarilayotgan paytdagi belgi: order lock dan uzoqroq yashaydi
+# va so'rov davom etayotgan bo'lsa har TTL/3 da uzaytiriladi (_keep_pending)
+IDEMPOTENCY_PENDING_TTL = ORDER_LOCK_TTL + 30
 
 
 class OrderItemIn(BaseModel):
     food_id: int
-    name: str
     qty: int
-    price: float
+    # Faqat ma'lumot uchun — narx va nom serverda menyudan olinadi
+    name: str | None = None
+    price: float | None = None
 
 
 class OrderCreateRequest(BaseModel):
     items: List[OrderItemIn]
-    total: float
+    total: float | None = None  # e'tiborga olinmaydi, server qayta hisoblaydi
     customer_name: str
     phone: str
     comment: str | None = None
@@ -138,20 +261,98 @@ class OrderCreateRequest(BaseModel):
     created_at_client: str | None = None
 
 
+@contextlib.asynccontextmanager
+async def _keep_pending(key: str):
+    """So'rov tugaguncha in-flight belgisining TTL ini yangilab turish."""
+    async def refresh():
+        while True:
+            await asyncio.sleep(IDEMPOTENCY_PENDING_TTL / 3)
+            await kv_store.touch(key, IDEMPOTENCY_PENDING_TTL)
+
+    task = asyncio.create_task(refresh())
+    try:
+        yield
+    finally:
+        # Javob yozilishidan oldin to'xtatiladi — aks holda 24 soatlik TTL qisqarardi
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+
 async def api_create_order(
     body: OrderCreateRequest,
     init_data: str = Query(default=""),
+    idempotency_key: str | None = Header(default=None, max_length=128),
     session: AsyncSession = Depends(get_db),
 ):
-    """Brauzer va Telegram WebApp uchun buyurtma yaratish endpointi."""
+    """
+    Brauzer va Telegram WebApp uchun buyurtma yaratish endpointi.
+
+    ``Idempotency-Key`` header i bilan qayta yuborilgan so'rov (tarmoq uzilib,
+    klient qayta urinsa) ikkinchi buyurtma yaratmaydi — saqlangan javob
+    ``Idempotent-Replayed: true`` bilan qaytariladi.
+    """
     # Telegram initData bilan foydalanuvchini topish
     tg_user = None
     if init_data:
         tg_user = verify_telegram_init_data(init_data)
+    tg_id = tg_user.get("id") if tg_user else None
+
+    scope = _idempotency_scope(body, tg_id)
+    if not idempotency_key or scope is None:
+        return await _create_order_guarded(body, tg_id, session)
 
+    key = f"idem:orders:{scope}:{idempotency_key}"
+    fingerprint = hashlib.sha256(
+        body.model_dump_json(exclude={"created_at_client"}).encode()
+    ).hexdigest()[:32]
+    stored = await kv_store.get(key)
+    if stored is None:
+        if await kv_store.set(key, json.dumps({"fp": fingerprint}), IDEMPOTENCY_PENDING_TTL, nx=True):
+            try:
+                async with _keep_pending(key):
+                    result = await _create_order_guarded(body, tg_id, session)
+            except Exception:
+                await kv_store.delete(key)
+                raise
+            await kv_store.set(key, json.dumps({"fp": fingerprint, "response": result}), IDEMPOTENCY_TTL)
+            return result
+        stored = await kv_store.get(key)
+    entry = json.loads(stored) if stored else {}
+    if entry.get("fp") != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key boshqa so'rov bilan ishlatilgan.")
+    if "response" not in entry:
+        raise HTTPException(status_code=409, detail="Bu buyurtma hali qayta ishlanmoqda.")
+    return FastJSONResponse(entry["response"], headers={"Idempotent-Replayed": "true"})
+
+
+def _idempotency_scope(body: OrderCreateRequest, tg_id: int | None) -> Optional[str]:
+    """
+    Idempotency kaliti kimga tegishli: Telegram foydalanuvchisi yoki mehmonning
+    telefoni (hash). Telefon yaroqsiz bo'lsa None — replay yo'q, buyurtma baribir 400.
+    """
+    if tg_id:
+        return str(tg_id)
+    phone = normalize_phone(body.phone)
+    if phone is None:
+        return None
+    return "guest-" + hashlib.sha256(phone.encode()).hexdigest()[:16]
+
+
+async def _create_order_guarded(body: OrderCreateRequest, tg_id: int | None, session: AsyncSession) -> dict:
+    """Telegram foydalanuvchisi uchun: umumiy cooldown + in-flight lock (barcha workerlar)."""
+    if not tg_id:
+        return await _create_order(body, None, session)
+    if await in_order_cooldown(tg_id):
+        raise HTTPException(status_code=429, detail="Iltimos, biroz kuting.")
+    async with order_lock(tg_id) as acquired:
+        if not acquired:
+            raise HTTPException(status_code=429, detail="Buyurtma allaqachon yuborilmoqda.")
+        return await _create_order(body, tg_id, session)
+
+
+async def _create_order(body: OrderCreateRequest, tg_id: int | None, session: AsyncSession) -> dict:
     # Validatsiya
-    if body.total < 50000:
-        raise HTTPException(status_code=400, detail="Minimal buyurtma summasi — 50 000 so'm.")
     if not body.items:
         raise HTTPException(status_code=400, detail="Savat bo'sh.")
     lat = body.location.get("lat")
@@ -159,85 +360,63 @@ async def api_create_order(
     if not lat or not lng:
         raise HTTPException(status_code=400, detail="Joylashuv ko'rsatilmagan.")
 
-    # Foydalanuvchini topish (Telegram ID bo'lsa)
+    # Foydalanuvchi + dublikat tekshiruvi — bitta so'rov
     user = None
-    if tg_user:
-        tg_id = tg_user.get("id")
-        if tg_id:
-            # Cooldown tekshirish
-            now = time.time()
-            last = _order_cooldown.get(tg_id, 0)
-            if now - last < ORDER_COOLDOWN:
-                # DB da ham tekshirish
-                from datetime import datetime, timedelta, timezone
-                cutoff = datetime.now(timezone.utc) - timedelta(seconds=ORDER_COOLDOWN)
-                dup_result = await session.execute(
-                    select(Order)
-                    .join(User, Order.user_id == User.id)
-                    .where(User.tg_id == tg_id)
-                    .where(Order.created_at >= cutoff)
-                    .order_by(desc(Order.created_at))
-                    .limit(1)
-                )
-                if dup_result.scalar_one_or_none():
-                    raise HTTPException(status_code=429, detail="Iltimos, biroz kuting.")
-            _order_cooldown[tg_id] = now
-
-            result = await session.execute(select(User).where(User.tg_id == tg_id))
-            user = result.scalar_one_or_none()
-
-    # Agar user topilmasa — telefon raqam bo'yicha qidirish yoki yangi yaratish
+    if tg_id:
+        user, recent_order = await find_user_for_order(session, tg_id, ORDER_COOLDOWN)
+        if recent_order:
+            await start_order_cooldown(tg_id)
+            raise HTTPException(status_code=429, detail="Iltimos, biroz kuting.")
+
+    # Agar user topilmasa — telefon raqami bo'yicha guest (upsert buyurtma INSERT i ichida)
+    guest_phone = None
     if not user:
-        # Guest foydalanuvchi yaratish (Telegram ID si yo'q)
-        import random
-        guest_tg_id = -(random.randint(10_000_000, 99_999_999))  # manfiy — real Telegram ID emas
-        user = User(
-            tg_id=guest_tg_id,
-            full_name=body.customer_name,
-            username=None,
-        )
-        session.add(user)
-        await session.flush()
+        guest_phone = normalize_phone(body.phone)
+        if guest_phone is None:
+            raise HTTPException(status_code=400, detail="Telefon raqami noto'g'ri.")
 
-    # Promo tekshirish
+    # Promo chegirmasi keshdan; atomar ishlatish — buyurtma INSERT i ichida.
+    # Savat server narxlari bilan qayta hisoblanadi.
+    promo = None
     if body.promo_code:
-        promo_info = await validate_promo(session, body.promo_code)
-        if not promo_info:
+        promo = await checkout_promo(session, body.promo_code)
+        if not promo:
             raise HTTPException(status_code=400, detail="Promokod yaroqsiz yoki muddati o'tgan.")
-        await use_promo(session, body.promo_code)
-
-    # Buyurtma yaratish
-    items_data = [i.model_dump() for i in body.items]
-    order = await create_order(
-        session=session,
-        user_id=user.id,
-        customer_name=body.customer_name,
-        phone=body.phone,
-        comment=body.comment,
-        total=body.total,
-        location_lat=lat,
-        location_lng=lng,
-        items=items_data,
-        promo_code=body.promo_code,
-    )
-
-    # Admin kanalga yuborish
-    shop_channel_id = await get_shop_channel_id(session)
-    if shop_channel_id:
-        from aiogram import Bot
-        from app.config import settings
-        from app.services.telegram_notify import send_order_to_channel
-        _bot = Bot(token=settings.BOT_TOKEN)
-        try:
-            msg_id = await send_order_to_channel(_bot, shop_channel_id, order)
-            if msg_id:
-                await set_channel_message_id(session, order.id, msg_id)
-        finally:
-            await _bot.session.close()
+    try:
+        cart = await price_cart(session, [i.model_dump() for i in body.items], promo and promo["discount_percent"])
+    except CartError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if cart["total"] < MIN_ORDER_TOTAL:
+        raise HTTPException(status_code=400, detail="Minimal buyurtma summasi — 50 000 so'm.")
+
+    # user, promo, order, itemlar, kanal xabari (outbox) — bitta commit
+    try:
+        order = await create_order(
+            session=session,
+            user=user,
+            customer_name=body.customer_name,
+            phone=body.phone,
+            comment=body.comment,
+            total=cart["total"],
+            location_lat=lat,
+            location_lng=lng,
+            items=cart["items"],
+            promo=promo,
+            guest_phone=guest_phone,
+        )
+    except PromoUnavailable as e:
+        await shared_cache.invalidate("promo")  # keshdagi holat eskirgan
+        raise HTTPException(status_code=400, detail=str(e))
+    if tg_id:
+        await start_order_cooldown(tg_id)
+    if promo and promo["limited"]:
+        await shared_cache.invalidate("promo")
 
     return {
         "ok": True,
+        "order_id": order.id,
         "order_number": order.order_number,
         "total": order.total,
+        "discount": cart["discount"],
         "message": f"✅ Buyurtmangiz #{order.order_number} qabul qilindi!",
     }
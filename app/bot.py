@@ -0,0 +1,60 @@
+"""
+Yagona (app-scoped) Bot va uning HTTP ulanishlar puli.
+
+Har bir so'rovda ``Bot(token=...)`` yaratish — har safar api.telegram.org ga
+yangi TCP + TLS handshake. Bu yerda bitta ``bot`` bor, uning aiohttp sessiyasi
+ulanishlarni keep-alive bilan qayta ishlatadi; ``app.main`` (webhook),
+outbox worker va admin API shu obyektdan foydalanadi. Yopish — lifespan da.
+Telegram limitlari — services/telegram_sender.py.
+"""
+import ssl as _ssl
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer, PRODUCTION
+
+from app.config import settings
+from app.services.telegram_sender import RateLimitMiddleware
+
+
+class PooledSession(AiohttpSession):
+    """aiogram AiohttpSession, ulanishlar puli sozlamalari bilan."""
+
+    def __init__(
+        self,
+        api_url: str = "",
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 60.0,
+        timeout: float = 30.0,
+        ssl: Optional[_ssl.SSLContext] = None,
+    ):
+        api = TelegramAPIServer.from_base(api_url) if api_url else PRODUCTION
+        super().__init__(api=api, limit=limit, timeout=timeout)
+        # Bot API bitta host — limit_per_host=0 (cheklanmagan) umumiy limit bilan bir xil.
+        # keepalive_timeout: aiohttp standarti 15 s; buyurtmalar orasidagi pauza
+        # odatda uzunroq, ulanish handshake siz qayta ishlatilsin.
+        self._connector_init.update(
+            limit_per_host=limit_per_host,
+            keepalive_timeout=keepalive_timeout,
+            enable_cleanup_closed=True,
+        )
+        if ssl is not None:
+            self._connector_init["ssl"] = ssl
+
+
+def create_bot(api_url: Optional[str] = None, ssl: Optional[_ssl.SSLContext] = None) -> Bot:
+    session = PooledSession(
+        api_url=settings.TELEGRAM_API_URL if api_url is None else api_url,
+        limit=settings.BOT_HTTP_POOL_SIZE,
+        keepalive_timeout=settings.BOT_HTTP_KEEPALIVE,
+        timeout=settings.BOT_HTTP_TIMEOUT,
+        ssl=ssl,
+    )
+    # Barcha send/edit so'rovlari rate limit va ustuvorlik navbatidan o'tadi
+    session.middleware(RateLimitMiddleware())
+    return Bot(token=settings.BOT_TOKEN, session=session)
+
+
+bot = create_bot()
@@ -15,6 +15,13 @@ class Settings(BaseSettings):
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
     SECRET_KEY: str = "secret"
+    INIT_DATA_MAX_AGE: int = 86400     # soniya; 0 = auth_date tekshirilmaydi
+    INIT_DATA_CACHE_SIZE: int = 10000
+    MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    TELEGRAM_API_URL: str = ""         # bo'sh = api.telegram.org; local Bot API server uchun
+    BOT_HTTP_POOL_SIZE: int = 100      # Bot API ga bir vaqtdagi ulanishlar
+    BOT_HTTP_KEEPALIVE: float = 60.0   # bo'sh ulanish necha soniya ochiq turadi
+    BOT_HTTP_TIMEOUT: float = 30.0
 
     @property
     def admin_ids(self) -> List[int]:
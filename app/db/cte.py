@@ -0,0 +1,16 @@
+"""
+Bir nechta yozuvni bitta so'rovga birlashtirish — PostgreSQL data-modifying CTE.
+
+    WITH w_0 AS (INSERT ...), w_1 AS (INSERT ... ON CONFLICT ...)
+    INSERT INTO order_items ... RETURNING ...
+
+Barcha qismlar bitta snapshot da, bitta round trip da bajariladi. CTE lar
+asosiy so'rovdan ko'rinmaydi — faqat bir-biriga bog'liq bo'lmagan yozuvlar uchun.
+"""
+
+
+def with_ctes(main, statements: list, prefix: str = "w"):
+    """``main`` ga ``statements`` (``None`` lar tashlab ketiladi) ni CTE qilib qo'shadi."""
+    for i, stmt in enumerate(s for s in statements if s is not None):
+        main = main.add_cte(stmt.cte(f"{prefix}_{i}"))
+    return main
@@ -8,7 +8,7 @@ from app.db.session import AsyncSessionFactory
 from app.services.foods import (
     get_all_categories, create_food, get_foods_by_category, delete_food, create_category, delete_category
 )
-from app.services.promo import create_promo, get_all_promos
+from app.services.promo import CODE_MAX_LENGTH, create_promo, get_all_promos, normalize_code
 from app.services.courier import add_courier, get_all_couriers, disable_courier, remove_courier
 from app.services.settings_service import set_setting
 from app.config import settings
@@ -229,7 +229,11 @@ async def promo_create_start(call: CallbackQuery, state: FSMContext):
 
 @router.message(PromoCreateStates.waiting_code)
 async def promo_code_entered(message: Message, state: FSMContext):
-    await state.update_data(code=message.text.upper())
+    code = normalize_code(message.text or "")
+    if not code:
+        await message.answer(f"❌ Faqat lotin harflari, raqamlar, - va _ (ko'pi bilan {CODE_MAX_LENGTH} ta):")
+        return
+    await state.update_data(code=code)
     await state.set_state(PromoCreateStates.waiting_discount)
     await message.answer("💸 Chegirma foizini kiriting (1-90):")
 
@@ -50,8 +50,7 @@ async def show_stats(call: CallbackQuery):
     if not is_admin(call.from_user.id):
         return
     period = call.data.split(":")[1]
-    async with AsyncSessionFactory() as session:
-        data = await get_stats(session, period)
+    data = await get_stats(period)
 
     period_label = {"today": "Bugun", "week": "Hafta", "month": "Oy"}.get(period, period)
     top_text = "\n".join(f"  {i+1}. {f['name']} — {f['qty']} dona" for i, f in enumerate(data["top_foods"])) or "  —"
@@ -1,51 +1,36 @@
 from aiogram import Router, F
 from aiogram.types import Message
-from sqlalchemy import select
 import json
 import logging
-import time
 
 from app.db.session import AsyncSessionFactory
-from app.services.orders import create_order, set_channel_message_id
-from app.services.promo import validate_promo, use_promo
-from app.services.settings_service import get_shop_channel_id
-from app.services.telegram_notify import send_order_to_channel, notify_user_status
-from app.models.user import User
-from app.models.order import Order
-from sqlalchemy import cast, String, desc
+from app.services import shared_cache
+from app.services.orders import (
+    ORDER_COOLDOWN, create_order, find_user_for_order, in_order_cooldown, order_lock, start_order_cooldown,
+)
+from app.services.promo import PromoUnavailable, checkout_promo
+from app.services.pricing import CartError, MIN_ORDER_TOTAL, price_cart
 
 router = Router()
 logger = logging.getLogger(__name__)
 
-# Parallel so'rovlarni bloklash uchun (faqat ichki himoya)
-_processing: set = set()
-# In-memory cooldown — server restart bo'lsa reset bo'ladi, shuning uchun DB-check asosiy
-_last_order_time: dict[int, float] = {}
-ORDER_COOLDOWN = 60  # soniya
-
 
 @router.message(F.web_app_data)
 async def handle_webapp_data(message: Message):
     tg_id = message.from_user.id
 
-    # Parallel so'rovni bloklash (bir vaqtda 2 ta xabar kelsa)
-    if tg_id in _processing:
-        logger.warning(f"Parallel order attempt blocked for {tg_id}")
-        return  # Foydalanuvchiga xabar bermaymiz — shunchaki ignore
-    _processing.add(tg_id)
-
-    try:
+    # Parallel so'rovni bloklash (bir vaqtda 2 ta xabar kelsa) — barcha workerlar uchun
+    async with order_lock(tg_id) as acquired:
+        if not acquired:
+            logger.warning(f"Parallel order attempt blocked for {tg_id}")
+            return  # Foydalanuvchiga xabar bermaymiz — shunchaki ignore
         await _process_order(message, tg_id)
-    finally:
-        _processing.discard(tg_id)
 
 
 async def _process_order(message: Message, tg_id: int):
-    # In-memory cooldown (tez bloklash, xabar bermasdan)
-    now = time.time()
-    last = _last_order_time.get(tg_id, 0)
-    if now - last < ORDER_COOLDOWN:
-        logger.warning(f"In-memory cooldown: user {tg_id}")
+    # Umumiy cooldown (Redis) — DB ga bormasdan, xabar bermasdan bloklash
+    if await in_order_cooldown(tg_id):
+        logger.warning(f"Cooldown: user {tg_id}")
         return  # Xabar bermaymiz
 
     # JSON parse
@@ -59,12 +44,7 @@ async def _process_order(message: Message, tg_id: int):
     if data.get("type") != "order_create":
         return
 
-    # Validatsiya
-    total = data.get("total", 0)
-    if total < 50000:
-        await message.answer("❌ Minimal buyurtma summasi — 50 000 so'm.")
-        return
-
+    # Validatsiya (summa serverda qayta hisoblanadi, klient total iga ishonilmaydi)
     items = data.get("items", [])
     if not items:
         await message.answer("❌ Savat bo'sh.")
@@ -80,71 +60,55 @@ async def _process_order(message: Message, tg_id: int):
     promo_code = data.get("promo_code")
 
     async with AsyncSessionFactory() as session:
-        # User topish
-        result = await session.execute(select(User).where(User.tg_id == tg_id))
-        user = result.scalar_one_or_none()
+        # User + DB-level duplicate check — bitta so'rov
+        user, recent_order = await find_user_for_order(session, tg_id, ORDER_COOLDOWN)
         if not user:
             await message.answer("❌ Foydalanuvchi topilmadi. /start ni bosing.")
             return
-
-        # DB-level duplicate check
-        from datetime import datetime, timedelta, timezone
-        cutoff = datetime.now(timezone.utc) - timedelta(seconds=ORDER_COOLDOWN)
-        dup_result = await session.execute(
-            select(Order)
-            .where(Order.user_id == user.id)
-            .where(Order.created_at >= cutoff)
-            .order_by(desc(Order.created_at))
-            .limit(1)
-        )
-        dup = dup_result.scalar_one_or_none()
-        if dup:
-            _last_order_time[tg_id] = now
-            logger.warning(f"DB duplicate blocked for user {tg_id}, order {dup.order_number}")
+        if recent_order:
+            await start_order_cooldown(tg_id)
+            logger.warning(f"DB duplicate blocked for user {tg_id}, order {recent_order}")
             return  # Xabar bermaymiz — foydalanuvchi allaqachon tasdiqlash olgan
 
-        # Cooldown o'rnatish (DB yozishdan OLDIN)
-        _last_order_time[tg_id] = now
-
-        # Promo tekshirish
+        # Promo chegirmasi keshdan; atomar ishlatish — buyurtma INSERT i ichida
+        promo = None
         if promo_code:
-            promo_info = await validate_promo(session, promo_code)
-            if not promo_info:
+            promo = await checkout_promo(session, promo_code)
+            if not promo:
                 await message.answer("❌ Promokod yaroqsiz yoki muddati o'tgan.")
                 return
-            await use_promo(session, promo_code)
+
+        # Savatni server narxlari bilan qayta hisoblash
+        try:
+            cart = await price_cart(session, items, promo and promo["discount_percent"])
+        except CartError as e:
+            await message.answer(f"❌ {e}")
+            return
+        if cart["total"] < MIN_ORDER_TOTAL:
+            await message.answer("❌ Minimal buyurtma summasi — 50 000 so'm.")
+            return
 
         # Buyurtma yaratish
-        order = await create_order(
-            session=session,
-            user_id=user.id,
-            customer_name=data.get("customer_name", message.from_user.full_name),
-            phone=data.get("phone", ""),
-            comment=data.get("comment"),
-            total=total,
-            location_lat=lat,
-            location_lng=lng,
-            items=items,
-            promo_code=promo_code,
-        )
-
-        # Foydalanuvchiga xabar
-        await notify_user_status(message.bot, tg_id, order)
-
-        # Shop kanalga yuborish
-        shop_channel_id = await get_shop_channel_id(session)
-        logger.info(f"Shop channel ID: {shop_channel_id}")
-        if shop_channel_id:
-            msg_id = await send_order_to_channel(message.bot, shop_channel_id, order)
-            if msg_id:
-                await set_channel_message_id(session, order.id, msg_id)
-            else:
-                logger.error(f"send_order_to_channel returned None for order {order.order_number}")
-                from app.admin_api import _add_log
-                _add_log("error", f"❌ #{order.order_number} buyurtma shop kanalga yuborilmadi (channel_id={shop_channel_id}). Bot admin emasmi?")
-        else:
-            logger.warning("shop_channel_id is 0 or None — kanal sozlanmagan!")
-            from app.admin_api import _add_log
-            _add_log("warn", "⚠️ Shop kanal ID sozlanmagan! Admin paneldan Sozlamalar > Shop kanal ID ni kiriting.")
+        try:
+            order = await create_order(
+                session=session,
+                user=user,
+                customer_name=data.get("customer_name", message.from_user.full_name),
+                phone=data.get("phone", ""),
+                comment=data.get("comment"),
+                total=cart["total"],
+                location_lat=lat,
+                location_lng=lng,
+                items=cart["items"],
+                promo=promo,
+                notify_user=True,  # mijoz va shop kanal xabarlari outbox orqali
+            )
+        except PromoUnavailable as e:
+            await shared_cache.invalidate("promo")  # keshdagi holat eskirgan
+            await message.answer(f"❌ {e}")
+            return
+        await start_order_cooldown(tg_id)
+        if promo and promo["limited"]:
+            await shared_cache.invalidate("promo")
 
     logger.info(f"✅ Order {order.order_number} created for user {tg_id}")
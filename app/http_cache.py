@@ -0,0 +1,17 @@
+"""
+HTTP kesh yordamchilari — ETag solishtirish (api.py va static_assets.py uchun).
+"""
+from typing import Optional
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (t.strip() for t in if_none_match.split(","))
+
+
+def gzip_etag(etag: str) -> str:
+    """Siqilgan variant uchun alohida kuchli ETag: ``"v-foods"`` → ``"v-foods-gz"``."""
+    return f'{etag[:-1]}-gz"'
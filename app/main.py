@@ -1,24 +1,35 @@
 import os
+import asyncio
+import contextlib
 import logging
 import traceback
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.middleware.gzip import GZipMiddleware
 import uvicorn
-from aiogram import Bot, Dispatcher
+from aiogram import Dispatcher
 from aiogram.types import Update
 from aiogram.fsm.storage.memory import MemoryStorage
 from app.config import settings
 from app.db.session import init_db
+from app.db.redis import close_redis
+from app.services.shared_cache import run_invalidation_listener
+from app.services.outbox import run_outbox_worker
+from app.services.guests import run_guest_merge_worker
+from app.services.images import shutdown_pool as shutdown_image_pool
+from app.services.menu_cache import GZIP_LEVEL, GZIP_MIN_SIZE
+from app import static_assets
+from app.responses import FastJSONResponse
 
 # ---------------- LOGGING ---------------- #
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # ---------------- BOT INIT ---------------- #
-bot = Bot(token=settings.BOT_TOKEN)
+# Yagona bot — ulanishlar puli bilan (app/bot.py)
+from app.bot import bot
 storage = MemoryStorage()
 dp = Dispatcher(storage=storage)
 
@@ -39,14 +50,24 @@ setup_routers()
 async def lifespan(app: FastAPI):
     logger.info("🚀 Starting Bot in Webhook mode")
     await init_db()
+    await asyncio.to_thread(static_assets.build)
     webhook_url = f"{os.environ.get('WEBHOOK_URL', '')}/webhook"
     await bot.set_webhook(webhook_url)
     logger.info(f"✅ Webhook set to: {webhook_url}")
+    cache_listener = asyncio.create_task(run_invalidation_listener())
+    outbox_worker = asyncio.create_task(run_outbox_worker(bot))
+    guest_merge = asyncio.create_task(run_guest_merge_worker())
     yield
     logger.info("🛑 Shutting down...")
+    for task in (cache_listener, outbox_worker, guest_merge):
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    shutdown_image_pool()
+    await close_redis()
     await bot.session.close()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -54,7 +75,10 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
+# Kichik javoblarni siqish foydasiz; oldindan siqilganlariga (Content-Encoding bor) tegmaydi
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=GZIP_LEVEL)
 
 # ---------------- ADMIN API ROUTER ---------------- #
 from app.admin_api import router as admin_router
@@ -62,8 +86,11 @@ app.include_router(admin_router)
 
 # ---------------- API ROUTES ---------------- #
 from app.api import (
+    api_bootstrap,
     api_categories,
     api_foods,
+    api_food_detail,
+    api_food_search,
     api_promo_validate,
     verify_telegram_init_data,
     get_db,
@@ -71,8 +98,11 @@ from app.api import (
 from fastapi import Query, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
+app.add_api_route("/api/bootstrap", api_bootstrap, methods=["GET"])
 app.add_api_route("/api/categories", api_categories, methods=["GET"])
 app.add_api_route("/api/foods", api_foods, methods=["GET"])
+app.add_api_route("/api/foods/search", api_food_search, methods=["GET"])
+app.add_api_route("/api/foods/{food_id}", api_food_detail, methods=["GET"])
 app.add_api_route("/api/promo/validate", api_promo_validate, methods=["GET"])
 
 # Brauzerdan ham buyurtma qabul qilish (Telegram WebApp + oddiy brauzer)
@@ -95,22 +125,25 @@ async def telegram_webhook(request: Request):
 # ---------------- STATIC UPLOADS ---------------- #
 uploads_dir = "web_app/uploads"
 os.makedirs(uploads_dir, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=uploads_dir), name="uploads")
+app.mount("/uploads", static_assets.UploadFiles(directory=uploads_dir), name="uploads")
+
+# ---------------- STATIC ASSETS (hashli, oldindan siqilgan) ---------------- #
+app.add_api_route("/static/{path}", static_assets.serve_static, methods=["GET"], include_in_schema=False)
 
 # ---------------- ADMIN PANEL ---------------- #
 @app.get("/admin")
-async def serve_admin():
-    f = "web_app/admin.html"
-    if os.path.exists(f):
-        return FileResponse(f)
+async def serve_admin(request: Request):
+    page = static_assets.get_page("admin.html")
+    if page:
+        return static_assets.asset_response(request, page)
     return JSONResponse(status_code=404, content={"error": "admin.html topilmadi"})
 
 # ---------------- WEBAPP ---------------- #
 @app.get("/")
-async def serve_webapp():
-    index = "web_app/index.html"
-    if os.path.exists(index):
-        return FileResponse(index)
+async def serve_webapp(request: Request):
+    page = static_assets.get_page("index.html")
+    if page:
+        return static_assets.asset_response(request, page)
     return {"status": "running"}
 
 # ---------------- RUN ---------------- #
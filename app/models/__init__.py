@@ -6,5 +6,8 @@ from app.models.order_item import OrderItem
 from app.models.promo import Promo
 from app.models.courier import Courier
 from app.models.setting import AppSetting
+from app.models.notification_outbox import NotificationOutbox
+from app.models.sales_rollup import DailySales, DailyFoodSales, DailyCourierSales
 
-__all__ = ["User", "Category", "Food", "Order", "OrderItem", "Promo", "Courier", "AppSetting"]
+__all__ = ["User", "Category", "Food", "Order", "OrderItem", "Promo", "Courier", "AppSetting", "NotificationOutbox",
+           "DailySales", "DailyFoodSales", "DailyCourierSales"]
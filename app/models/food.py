@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Boolean, Float, ForeignKey, Text, DateTime
+from sqlalchemy import Integer, String, Boolean, Float, ForeignKey, Text, DateTime, Index, JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
@@ -6,6 +6,9 @@ from app.db.base import Base
 
 class Food(Base):
     __tablename__ = "foods"
+    __table_args__ = (
+        Index("ix_foods_is_active_category_id", "is_active", "category_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     category_id: Mapped[int] = mapped_column(Integer, ForeignKey("categories.id"), nullable=False)
@@ -16,6 +19,7 @@ class Food(Base):
     is_new: Mapped[bool] = mapped_column(Boolean, default=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     image_url: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    image_variants: Mapped[dict | None] = mapped_column(JSON, nullable=True)  # services/images.py
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     category = relationship("Category", back_populates="foods", lazy="joined")
@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Float, ForeignKey, Text, DateTime, BigInteger
+from sqlalchemy import Integer, String, Float, ForeignKey, Text, DateTime, BigInteger, Index, Enum, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 import enum
@@ -15,6 +15,17 @@ class OrderStatus(str, enum.Enum):
     CANCELED = "CANCELED"
 
 
+# Yakunlanmagan buyurtmalar — "aktiv" ro'yxat, statistika va partial index uchun
+ACTIVE_STATUSES = [
+    OrderStatus.NEW,
+    OrderStatus.CONFIRMED,
+    OrderStatus.COOKING,
+    OrderStatus.COURIER_ASSIGNED,
+    OrderStatus.OUT_FOR_DELIVERY,
+]
+_ACTIVE_SQL = ", ".join(f"'{s.value}'" for s in ACTIVE_STATUSES)
+
+
 STATUS_LABELS = {
     "NEW": "Принят",
     "CONFIRMED": "Подтвержден",
@@ -28,6 +39,17 @@ STATUS_LABELS = {
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_created_at", "created_at"),
+        Index("ix_orders_status", "status"),
+        Index("ix_orders_user_id_created_at", "user_id", "created_at"),
+        Index("ix_orders_delivered_at", "delivered_at", postgresql_where=text("status = 'DELIVERED'")),
+        Index("ix_orders_active", "created_at", postgresql_where=text(f"status IN ({_ACTIVE_SQL})")),
+        Index("ix_orders_channel_message_id", "channel_message_id",
+              postgresql_where=text("channel_message_id IS NOT NULL")),
+    )
+    # created_at/updated_at INSERT ... RETURNING bilan qaytadi — alohida refresh kerak emas
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     order_number: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
@@ -36,7 +58,10 @@ class Order(Base):
     phone: Mapped[str] = mapped_column(String(32), nullable=False)
     comment: Mapped[str | None] = mapped_column(Text, nullable=True)
     total: Mapped[float] = mapped_column(Float, nullable=False)
-    status: Mapped[str] = mapped_column(String(32), default="NEW")
+    # Postgres ENUM — filtrlar ustunni to'g'ridan-to'g'ri solishtiradi va indeksga tushadi
+    status: Mapped[OrderStatus] = mapped_column(
+        Enum(OrderStatus, name="order_status"), nullable=False, default=OrderStatus.NEW
+    )
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     delivered_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
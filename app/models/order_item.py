@@ -1,13 +1,17 @@
-from sqlalchemy import Integer, String, Float, ForeignKey
+from sqlalchemy import Integer, String, Float, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
 
 class OrderItem(Base):
     __tablename__ = "order_items"
+    __table_args__ = (
+        # Taom bo'yicha agregatlar va oxirgi nom (services/stats.py, services/rollups.py)
+        Index("ix_order_items_food_id_order_id", "food_id", "order_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    order_id: Mapped[int] = mapped_column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id: Mapped[int] = mapped_column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     food_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("foods.id"), nullable=True)
     name_snapshot: Mapped[str] = mapped_column(String(512), nullable=False)
     price_snapshot: Mapped[float] = mapped_column(Float, nullable=False)
@@ -0,0 +1,37 @@
+from sqlalchemy import Integer, Float, Date
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+
+# Kunlik yig'indilar (mahalliy kun, UTC+5) — buyurtma yozilganda va status
+# o'zgarganda shu tranzaksiyada yangilanadi (services/rollups.py).
+# food_id / courier_id da FK yo'q: taom yoki kuryer o'chirilsa ham tarix qoladi.
+
+
+class DailySales(Base):
+    __tablename__ = "daily_sales"
+
+    day: Mapped[Date] = mapped_column(Date, primary_key=True)
+    orders_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")  # created_at kuni bo'yicha
+    orders_total: Mapped[float] = mapped_column(Float, nullable=False, server_default="0")
+    delivered_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")  # delivered_at kuni bo'yicha
+    revenue: Mapped[float] = mapped_column(Float, nullable=False, server_default="0")
+    canceled_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")  # created_at kuni bo'yicha
+
+
+class DailyFoodSales(Base):
+    __tablename__ = "daily_food_sales"
+
+    day: Mapped[Date] = mapped_column(Date, primary_key=True)
+    food_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    qty: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    revenue: Mapped[float] = mapped_column(Float, nullable=False, server_default="0")
+
+
+class DailyCourierSales(Base):
+    __tablename__ = "daily_courier_sales"
+
+    day: Mapped[Date] = mapped_column(Date, primary_key=True)
+    courier_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    delivered_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    revenue: Mapped[float] = mapped_column(Float, nullable=False, server_default="0")
@@ -11,6 +11,8 @@ class User(Base):
     tg_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False, index=True)
     username: Mapped[str | None] = mapped_column(String(255), nullable=True)
     full_name: Mapped[str] = mapped_column(String(512), nullable=False)
+    # Faqat guestlar uchun: normallashtirilgan raqam, tg_id = -raqam (services/guests.py)
+    phone: Mapped[str | None] = mapped_column(String(32), nullable=True, index=True)
     joined_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     ref_by_user_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("users.id"), nullable=True)
     promo_given: Mapped[bool] = mapped_column(Boolean, default=False)
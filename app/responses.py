@@ -0,0 +1,18 @@
+"""
+Ilova bo'yicha standart javob klassi — JSON orjson bilan kodlanadi.
+
+orjson datetime, date, UUID, Enum va dataclass larni o'zi kodlaydi, shuning
+uchun tayyor dict/list ni ``jsonable_encoder`` siz to'g'ridan-to'g'ri
+``FastJSONResponse(content)`` qilib qaytarish ham mumkin (katta ro'yxatlar).
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
@@ -2,6 +2,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
 from app.models.food import Food
 from app.models.category import Category
+from app.services.menu_cache import refresh_menu_snapshot
 from typing import List, Optional
 
 
@@ -28,6 +29,7 @@ async def create_food(session: AsyncSession, **kwargs) -> Food:
     session.add(food)
     await session.commit()
     await session.refresh(food)
+    await refresh_menu_snapshot()
     return food
 
 
@@ -39,6 +41,7 @@ async def update_food(session: AsyncSession, food_id: int, **kwargs) -> Optional
         setattr(food, k, v)
     await session.commit()
     await session.refresh(food)
+    await refresh_menu_snapshot()
     return food
 
 
@@ -48,6 +51,7 @@ async def delete_food(session: AsyncSession, food_id: int) -> bool:
         return False
     await session.delete(food)
     await session.commit()
+    await refresh_menu_snapshot()
     return True
 
 
@@ -60,6 +64,7 @@ async def create_category(session: AsyncSession, name: str) -> Category:
     session.add(cat)
     await session.commit()
     await session.refresh(cat)
+    await refresh_menu_snapshot()
     return cat
 
 
@@ -70,4 +75,5 @@ async def delete_category(session: AsyncSession, cat_id: int) -> bool:
         return False
     await session.delete(cat)
     await session.commit()
+    await refresh_menu_snapshot()
     return True
@@ -0,0 +1,207 @@
+"""
+Brauzerdan (Telegram initData siz) buyurtma beruvchilar — telefon raqami bo'yicha.
+
+Guest foydalanuvchining ``tg_id`` si normallashtirilgan raqamdan olinadi:
+``+998 90 123-45-67`` → ``-998901234567``. Real Telegram id lar musbat, eski
+tasodifiy guest id lar 8 xonali — to'qnashuv yo'q. Bitta raqam = bitta
+``users`` qatori; yozish — ``INSERT ... ON CONFLICT (tg_id) DO UPDATE``, buyurtma
+INSERT i ichida CTE sifatida.
+
+``merge_guests`` eski (har buyurtmada yangi qator ochilgan) guestlarni
+birlashtiradi: telefon raqami buyurtmadan olinadi, buyurtmalar kanonik
+userga ko'chiriladi, dublikatlar o'chiriladi. Fon vazifasi lifespan da
+ishlaydi (advisory lock — bir vaqtda bitta worker), qo'lda::
+
+    python -m app.services.guests --merge [--dry-run]
+"""
+import asyncio
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import bindparam, delete, func, select, true, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.order import Order
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COUNTRY = "998"
+MIN_DIGITS = 10  # eski tasodifiy guest id lar (8 xona) bilan to'qnashmasligi uchun
+MAX_DIGITS = 15  # E.164
+MERGE_BATCH = 500
+MERGE_INTERVAL = 6 * 3600
+MERGE_LOCK_KEY = 0x6775657374  # pg advisory lock: "guest"
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """``"+998 (90) 123-45-67"`` → ``"+998901234567"``; yaroqsiz bo'lsa ``None``."""
+    if not phone:
+        return None
+    digits = _NON_DIGITS.sub("", phone)
+    if len(digits) == 9:  # mahalliy format: 90 123 45 67
+        digits = DEFAULT_COUNTRY + digits
+    if not MIN_DIGITS <= len(digits) <= MAX_DIGITS or digits.startswith("0"):
+        return None
+    return f"+{digits}"
+
+
+def guest_tg_id(normalized_phone: str) -> int:
+    return -int(normalized_phone.lstrip("+"))
+
+
+def _upsert(rows: list[dict], update_name: bool = True):
+    stmt = pg_insert(User).values(rows)
+    set_ = {"phone": stmt.excluded.phone}  # DO UPDATE — RETURNING mavjud qatorni ham qaytarishi uchun
+    if update_name:
+        # Mavjud ism saqlanadi — faqat bo'sh bo'lsa buyurtmadagi ism yoziladi
+        set_["full_name"] = func.coalesce(func.nullif(User.full_name, ""), stmt.excluded.full_name)
+    return stmt.on_conflict_do_update(index_elements=[User.tg_id], set_=set_)
+
+
+def upsert_guest_cte(phone: str, full_name: str):
+    """
+    Guest userni olish/yaratish — alohida so'rov emas: ``create_order`` dagi
+    ``INSERT orders`` uchun CTE, ``orders.user_id`` shu ``RETURNING id`` dan olinadi.
+    """
+    tg_id = guest_tg_id(phone)
+    return _upsert([{"tg_id": tg_id, "full_name": full_name, "phone": phone}]).returning(User.id).cte("guest_user")
+
+
+# ── Eski guestlarni birlashtirish ──────────────────────────────────────────
+
+_LAST_ORDER = (
+    select(Order.phone, Order.customer_name)
+    .where(Order.user_id == User.id)
+    .order_by(Order.created_at.desc())
+    .limit(1)
+    .lateral()
+)
+
+_MOVE_ORDERS = (
+    update(Order.__table__)
+    .where(Order.__table__.c.user_id == bindparam("old_id"))
+    .values(user_id=bindparam("new_id"))
+)
+_MOVE_REFERRALS = (
+    update(User.__table__)
+    .where(User.__table__.c.ref_by_user_id == bindparam("old_id"))
+    .values(ref_by_user_id=bindparam("new_id"))
+)
+
+
+async def merge_guests(session: AsyncSession, dry_run: bool = False) -> dict:
+    """
+    Eski guestlarni (``tg_id < 0``, ``phone`` yo'q) telefon bo'yicha kanonik
+    userga birlashtiradi. Partiyalar bilan, har biri alohida commit.
+    """
+    stats = {"scanned": 0, "merged": 0, "canonical": 0, "orders_moved": 0, "skipped": 0}
+    last_id = 0
+    while True:
+        rows = (await session.execute(
+            select(User.id, _LAST_ORDER.c.phone, _LAST_ORDER.c.customer_name, User.full_name)
+            .outerjoin(_LAST_ORDER, true())
+            .where(User.tg_id < 0, User.phone.is_(None), User.id > last_id)
+            .order_by(User.id)
+            .limit(MERGE_BATCH)
+        )).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        stats["scanned"] += len(rows)
+
+        groups: dict[str, list] = {}
+        for row in rows:
+            phone = normalize_phone(row.phone)
+            if phone is None:
+                stats["skipped"] += 1  # buyurtmasi yo'q yoki raqam yaroqsiz
+                continue
+            groups.setdefault(phone, []).append(row)
+        if not groups:
+            continue
+
+        canonical = {
+            tg_id: uid for uid, tg_id in (await session.execute(
+                _upsert([
+                    {"tg_id": guest_tg_id(phone), "phone": phone,
+                     "full_name": group[-1].customer_name or group[-1].full_name}
+                    for phone, group in groups.items()
+                ], update_name=False).returning(User.id, User.tg_id)
+            )).all()
+        }
+        moves = [
+            {"old_id": row.id, "new_id": canonical[guest_tg_id(phone)]}
+            for phone, group in groups.items() for row in group
+        ]
+        moved = (await session.execute(
+            select(func.count()).select_from(Order).where(Order.user_id.in_([m["old_id"] for m in moves]))
+        )).scalar_one()
+        await session.execute(_MOVE_ORDERS, moves)
+        await session.execute(_MOVE_REFERRALS, moves)
+        await session.execute(delete(User).where(User.id.in_([m["old_id"] for m in moves])))
+
+        stats["canonical"] += len(canonical)
+        stats["merged"] += len(moves)
+        stats["orders_moved"] += moved
+        if dry_run:
+            await session.rollback()
+        else:
+            await session.commit()
+    return stats
+
+
+async def _merge_locked(dry_run: bool = False) -> Optional[dict]:
+    from app.db.session import AsyncSessionFactory
+
+    async with AsyncSessionFactory() as lock_session:
+        # Sessiya darajasidagi lock — merge_guests partiyalarni alohida commit qiladi
+        got = (await lock_session.execute(select(func.pg_try_advisory_lock(MERGE_LOCK_KEY)))).scalar()
+        if not got:
+            return None
+        try:
+            async with AsyncSessionFactory() as session:
+                return await merge_guests(session, dry_run=dry_run)
+        finally:
+            await lock_session.execute(select(func.pg_advisory_unlock(MERGE_LOCK_KEY)))
+
+
+async def run_guest_merge_worker():
+    """Lifespan da fon vazifasi: startup dan keyin va har ``MERGE_INTERVAL`` da."""
+    await asyncio.sleep(60)
+    while True:
+        try:
+            stats = await _merge_locked()
+            if stats and stats["merged"]:
+                logger.info(f"Guest merge: {stats}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Guest merge error: {e}")
+        await asyncio.sleep(MERGE_INTERVAL)
+
+
+async def _cli(dry_run: bool):
+    from app.db.session import engine
+
+    stats = await _merge_locked(dry_run)
+    await engine.dispose()
+    if stats is None:
+        raise SystemExit("Boshqa worker hozir birlashtirmoqda — keyinroq urinib ko'ring.")
+    print(("dry run: " if dry_run else "") + ", ".join(f"{k}={v}" for k, v in stats.items()))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Guest foydalanuvchilarni telefon bo'yicha birlashtirish")
+    parser.add_argument("--merge", action="store_true", help="eski guestlarni birlashtirish")
+    parser.add_argument("--dry-run", action="store_true", help="o'zgarishlarni commit qilmaslik")
+    args = parser.parse_args()
+    if args.merge:
+        asyncio.run(_cli(args.dry_run))
+    else:
+        parser.print_help()
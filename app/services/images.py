@@ -0,0 +1,200 @@
+"""
+Rasm variantlari — yuklangan rasmdan bir nechta o'lchamdagi WebP + JPEG.
+
+Kartochkalar kichik, lekin yuklanadigan / seed qilingan rasmlar to'liq
+o'lchamli PNG. Har bir rasm uchun ``VARIANT_WIDTHS`` kengliklarida fayllar
+quriladi: ``uploads/v/<id>_<w>.webp`` va ``uploads/v/<id>_<w>.jpg``.
+Taom yozuvida faqat ``{"src": ".../uploads/v/<id>", "w": [160, 320, 640]}``
+saqlanadi — klient ``srcset`` ni o'zi yig'adi.
+
+Siqish CPU ga og'ir, shuning uchun u event loop da emas, alohida
+jarayonlar pulida bajariladi. Pillow o'rnatilmagan bo'lsa variantlar
+qurilmaydi va faqat original ishlatiladi.
+
+Eski rasmlar uchun bir martalik backfill:
+
+    python -m app.services.images --backfill
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = "web_app/uploads"
+VARIANT_DIR = os.path.join(UPLOAD_DIR, "v")
+SEED_DIR = "images"
+VARIANT_WIDTHS = (160, 320, 640)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+IMAGE_EXTS = {"jpg", "jpeg", "png", "webp", "gif"}
+POOL_WORKERS = 2
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def is_available() -> bool:
+    return Image is not None
+
+
+def _render_variants(src_path: str, set_id: str, out_dir: str) -> list[int]:
+    """Jarayon pulida ishlaydi. Qurilgan kengliklar ro'yxatini qaytaradi."""
+    os.makedirs(out_dir, exist_ok=True)
+    with Image.open(src_path) as im:
+        im.seek(0)  # GIF — faqat birinchi kadr
+        im = ImageOps.exif_transpose(im)
+        has_alpha = im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info)
+        im = im.convert("RGBA" if has_alpha else "RGB")
+        if has_alpha:
+            flat = Image.new("RGB", im.size, (255, 255, 255))
+            flat.paste(im, mask=im.getchannel("A"))
+        else:
+            flat = im
+
+        # Originaldan katta variant qurilmaydi, lekin kamida bittasi bo'ladi
+        widths = [w for w in VARIANT_WIDTHS if w <= im.width] or [VARIANT_WIDTHS[0]]
+        for w in widths:
+            h = max(1, round(im.height * w / im.width))
+            base = os.path.join(out_dir, f"{set_id}_{w}")
+            im.resize((w, h), Image.LANCZOS).save(f"{base}.webp", "WEBP", quality=WEBP_QUALITY, method=4)
+            flat.resize((w, h), Image.LANCZOS).save(
+                f"{base}.jpg", "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True
+            )
+    with open(os.path.join(out_dir, f"{set_id}.json"), "w") as f:
+        json.dump(widths, f)
+    return widths
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # fork emas — ishlayotgan event loop / ulanishlar nusxalanmasin
+        _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def variant_set(set_id: str, widths: list[int], base_url: str = "") -> dict:
+    return {"src": f"{base_url}/uploads/v/{set_id}", "w": widths}
+
+
+async def build_variants(src_path: str, set_id: str, base_url: str = "") -> Optional[dict]:
+    """Variantlarni pulda quradi. Pillow yo'q yoki rasm buzuq bo'lsa — None."""
+    if not is_available():
+        return None
+    loop = asyncio.get_running_loop()
+    try:
+        widths = await loop.run_in_executor(_get_pool(), _render_variants, src_path, set_id, VARIANT_DIR)
+    except BrokenProcessPool as e:
+        # Worker o'ldirilgan (masalan OOM) — keyingi chaqiruv yangi pul ochadi
+        logger.error(f"Image pool broken: {e}")
+        shutdown_pool()
+        return None
+    except Exception as e:
+        logger.warning(f"Image variants error ({src_path}): {e}")
+        return None
+    return variant_set(set_id, widths, base_url)
+
+
+def set_id_from_url(url: Optional[str]) -> Optional[str]:
+    if not url:
+        return None
+    name = url.split("?", 1)[0].rsplit("/", 1)[-1]
+    stem, _, ext = name.rpartition(".")
+    return stem if stem and ext.lower() in IMAGE_EXTS else None
+
+
+def variants_for_url(url: Optional[str], base_url: str = "") -> Optional[dict]:
+    """Rasm URL i uchun avval qurilgan variant to'plami (manifest bo'yicha)."""
+    set_id = set_id_from_url(url)
+    if set_id is None:
+        return None
+    try:
+        with open(os.path.join(VARIANT_DIR, f"{set_id}.json")) as f:
+            widths = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return variant_set(set_id, widths, base_url)
+
+
+# ── Backfill ──────────────────────────────────────
+
+def _source_files() -> list[str]:
+    paths = []
+    for d in (SEED_DIR, UPLOAD_DIR):
+        if not os.path.isdir(d):
+            continue
+        for name in sorted(os.listdir(d)):
+            path = os.path.join(d, name)
+            if os.path.isfile(path) and set_id_from_url(name):
+                paths.append(path)
+    return paths
+
+
+async def backfill(force: bool = False):
+    from sqlalchemy import select
+
+    from app.db.session import AsyncSessionFactory, engine
+    from app.models.food import Food
+    from app.services.menu_cache import refresh_menu_snapshot
+
+    base_url = os.environ.get("WEBHOOK_URL", "")
+    built = 0
+    sem = asyncio.Semaphore(POOL_WORKERS * 2)
+
+    async def one(path: str):
+        nonlocal built
+        set_id = set_id_from_url(path)
+        if not force and variants_for_url(path) is not None:
+            return
+        async with sem:
+            if await build_variants(path, set_id, base_url) is not None:
+                built += 1
+
+    await asyncio.gather(*(one(p) for p in _source_files()))
+
+    linked = 0
+    async with AsyncSessionFactory() as s:
+        foods = (await s.execute(select(Food).where(Food.image_url.is_not(None)))).scalars().all()
+        for f in foods:
+            variants = variants_for_url(f.image_url, base_url)
+            if variants and f.image_variants != variants:
+                f.image_variants = variants
+                linked += 1
+        await s.commit()
+    if linked:
+        await refresh_menu_snapshot()
+    await engine.dispose()
+    shutdown_pool()
+    print(f"variants built: {built}, foods linked: {linked}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rasm variantlari")
+    parser.add_argument("--backfill", action="store_true", help="images/ va uploads/ dagi barcha rasmlar")
+    parser.add_argument("--force", action="store_true", help="mavjud variantlarni ham qayta qurish")
+    args = parser.parse_args()
+    if not is_available():
+        raise SystemExit("Pillow o'rnatilmagan: pip install Pillow")
+    if args.backfill:
+        asyncio.run(backfill(args.force))
+    else:
+        parser.print_help()
@@ -0,0 +1,155 @@
+"""
+TTL li kalit-qiymat ombori: Redis (barcha workerlar uchun umumiy), Redis
+ishlamasa — shu jarayondagi xotira (LRU chiqarib tashlash bilan).
+
+Buyurtma cooldown lari, in-flight locklar va ``Idempotency-Key`` javoblari
+shu yerda saqlanadi. Qiymatlar — satr; murakkab qiymatlarni chaqiruvchi
+JSON qiladi.
+
+Redis uzilsa ``_RETRY_AFTER`` soniya xotira backend ishlatiladi (har so'rovda
+ulanish timeout ini kutmaslik uchun) — bitta worker ichida himoya saqlanadi,
+lekin workerlar o'rtasida emas.
+"""
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from redis.exceptions import RedisError
+
+from app.db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "kv:"
+MEMORY_MAX_KEYS = 10_000
+_RETRY_AFTER = 10
+_redis_down_until = 0.0
+
+# Faqat o'zimiz qo'ygan lockni o'chirish (boshqa worker TTL dan keyin olgan bo'lishi mumkin)
+_RELEASE_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class MemoryStore:
+    """Xotiradagi TTL ombori; ``max_keys`` dan oshsa eng eski kalitlar chiqariladi."""
+
+    def __init__(self, max_keys: int = MEMORY_MAX_KEYS):
+        self.max_keys = max_keys
+        self._data: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+    def _alive(self, key: str, now: float) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[1] <= now:
+            del self._data[key]
+            return None
+        return item[0]
+
+    def get(self, key: str) -> Optional[str]:
+        return self._alive(key, time.monotonic())
+
+    def set(self, key: str, value: str, ttl: float, nx: bool = False) -> bool:
+        now = time.monotonic()
+        if nx and self._alive(key, now) is not None:
+            return False
+        self._data[key] = (value, now + ttl)
+        self._data.move_to_end(key)
+        if len(self._data) > self.max_keys:
+            self._evict(now)
+        return True
+
+    def touch(self, key: str, ttl: float) -> bool:
+        now = time.monotonic()
+        value = self._alive(key, now)
+        if value is None:
+            return False
+        self._data[key] = (value, now + ttl)
+        return True
+
+    def delete(self, key: str, only_if: Optional[str] = None) -> bool:
+        if only_if is not None and self.get(key) != only_if:
+            return False
+        return self._data.pop(key, None) is not None
+
+    def _evict(self, now: float):
+        for key in [k for k, (_, exp) in self._data.items() if exp <= now]:
+            del self._data[key]
+        while len(self._data) > self.max_keys:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+memory = MemoryStore()
+
+
+def _redis_ok() -> bool:
+    return time.monotonic() >= _redis_down_until
+
+
+def _mark_down(what: str, e: Exception):
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + _RETRY_AFTER
+    logger.warning(f"Redis kv store unavailable ({what}), using memory: {e}")
+
+
+async def get(key: str) -> Optional[str]:
+    if _redis_ok():
+        try:
+            raw = await get_redis().get(PREFIX + key)
+            return raw.decode() if isinstance(raw, bytes) else raw
+        except (RedisError, OSError) as e:
+            _mark_down(f"get {key}", e)
+    return memory.get(key)
+
+
+async def set(key: str, value: str, ttl: float, nx: bool = False) -> bool:
+    """``nx=True`` — faqat kalit yo'q bo'lsa yoziladi; yozildimi — qaytaradi."""
+    if _redis_ok():
+        try:
+            return bool(await get_redis().set(PREFIX + key, value, px=int(ttl * 1000), nx=nx))
+        except (RedisError, OSError) as e:
+            _mark_down(f"set {key}", e)
+    return memory.set(key, value, ttl, nx=nx)
+
+
+async def touch(key: str, ttl: float) -> bool:
+    """Mavjud kalitning TTL ini yangilash (qiymat o'zgarmaydi); kalit yo'q bo'lsa ``False``."""
+    if _redis_ok():
+        try:
+            return bool(await get_redis().pexpire(PREFIX + key, int(ttl * 1000)))
+        except (RedisError, OSError) as e:
+            _mark_down(f"touch {key}", e)
+    return memory.touch(key, ttl)
+
+
+async def delete(key: str) -> None:
+    memory.delete(key)
+    if _redis_ok():
+        try:
+            await get_redis().delete(PREFIX + key)
+        except (RedisError, OSError) as e:
+            _mark_down(f"delete {key}", e)
+
+
+async def acquire_lock(key: str, ttl: float) -> Optional[str]:
+    """Lock olinsa token qaytaradi, band bo'lsa ``None``. TTL — jarayon yiqilsa ham lock ochiladi."""
+    token = uuid.uuid4().hex
+    return token if await set(key, token, ttl, nx=True) else None
+
+
+async def release_lock(key: str, token: str) -> None:
+    memory.delete(key, only_if=token)
+    if _redis_ok():
+        try:
+            await get_redis().eval(_RELEASE_LUA, 1, PREFIX + key, token)
+        except (RedisError, OSError) as e:
+            _mark_down(f"release {key}", e)
@@ -0,0 +1,223 @@
+"""
+Menyu snapshot keshi — /api/categories va /api/foods xotiradan beriladi.
+
+Snapshot bir martada quriladi (aktiv kategoriyalar + aktiv taomlar), har bir
+``sort`` rejimi va ``category_id`` uchun oldindan tartiblangan ro'yxatlar bilan
+(JSON baytlari va ularning gzip nusxasi ham shu yerda — har so'rovda siqilmaydi).
+Admin taom/kategoriyani o'zgartirganda ``refresh_menu_snapshot()`` yangi
+snapshot quradi va modul darajasidagi havolani bitta amal bilan almashtiradi —
+o'quvchilar hech qachon yarim qurilgan holatni ko'rmaydi. Qatorlar Redis da
+ham saqlanadi (``shared_cache``), boshqa workerlar pub/sub orqali xabar oladi.
+"""
+import asyncio
+import bisect
+import gzip
+import hashlib
+import logging
+import time
+from typing import Optional
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionFactory
+from app.models.category import Category
+from app.models.food import Food
+from app.services import shared_cache
+from app.services.search import search_index
+
+logger = logging.getLogger(__name__)
+
+SORT_MODES = (None, "rating", "new", "price_asc", "price_desc")
+
+# Har bir rejim uchun tartib kaliti; teng qiymatlarda id bo'yicha barqaror tartib
+_SORT_KEYS = {
+    None: lambda r: (r["id"],),
+    "rating": lambda r: (-(r["rating"] or 0), r["id"]),
+    "new": lambda r: (-r["_created_ts"], r["id"]),
+    "price_asc": lambda r: (r["price"], r["id"]),
+    "price_desc": lambda r: (-r["price"], r["id"]),
+}
+
+GZIP_MIN_SIZE = 1024  # main.py dagi GZipMiddleware(minimum_size) bilan bir xil
+GZIP_LEVEL = 6
+
+FOOD_FIELDS = ("id", "name", "description", "price", "rating", "is_new", "image_url", "image_variants", "category_id")
+
+
+class MenuSnapshot:
+    """Menyuning o'zgarmas nusxasi. Yaratilgandan keyin o'zgartirilmaydi."""
+
+    __slots__ = (
+        "version", "categories", "foods_by_id", "categories_json", "categories_gz",
+        "_foods", "_foods_json", "_foods_gz", "_keys",
+    )
+
+    def __init__(self, categories: list[dict], food_rows: list[dict]):
+        self.categories = categories
+        self.foods_by_id = {r["id"]: _public(r) for r in food_rows}
+
+        category_ids = [None] + sorted({r["category_id"] for r in food_rows})
+        self._foods: dict[tuple[Optional[int], Optional[str]], list[dict]] = {}
+        self._foods_json: dict[tuple[Optional[int], Optional[str]], bytes] = {}
+        self._foods_gz: dict[tuple[Optional[int], Optional[str]], Optional[bytes]] = {}
+        # Keyset pagination uchun har bir ro'yxatga parallel tartib kalitlari
+        self._keys: dict[tuple[Optional[int], Optional[str]], list[tuple]] = {}
+        for sort in SORT_MODES:
+            key_fn = _SORT_KEYS[sort]
+            ordered = sorted(food_rows, key=key_fn)
+            for cid in category_ids:
+                rows = [r for r in ordered if cid is None or r["category_id"] == cid]
+                foods = [self.foods_by_id[r["id"]] for r in rows]
+                self._foods[(cid, sort)] = foods
+                self._foods_json[(cid, sort)] = encode_json(foods)
+                self._foods_gz[(cid, sort)] = gzip_body(self._foods_json[(cid, sort)])
+                self._keys[(cid, sort)] = [key_fn(r) for r in rows]
+
+        self.categories_json = encode_json(categories)
+        self.categories_gz = gzip_body(self.categories_json)
+        digest = hashlib.sha1(self.categories_json + self._foods_json[(None, None)])
+        self.version = digest.hexdigest()[:16]
+
+    def get_foods(self, category_id: Optional[int] = None, sort: Optional[str] = None) -> list[dict]:
+        return self._foods.get(self.variant(category_id, sort), [])
+
+    def get_foods_json(self, category_id: Optional[int] = None, sort: Optional[str] = None) -> bytes:
+        return self._foods_json.get(self.variant(category_id, sort), b"[]")
+
+    def get_foods_gz(self, category_id: Optional[int] = None, sort: Optional[str] = None) -> Optional[bytes]:
+        """``get_foods_json`` ning gzip nusxasi; kichik javoblar uchun ``None``."""
+        return self._foods_gz.get(self.variant(category_id, sort))
+
+    def get_foods_page(
+        self, category_id: Optional[int], sort: Optional[str], after: Optional[tuple], limit: int
+    ) -> tuple[list[dict], Optional[tuple]]:
+        """``after`` kalitidan keyingi ``limit`` ta taom va keyingi sahifa kaliti."""
+        variant = self.variant(category_id, sort)
+        foods = self._foods.get(variant, [])
+        keys = self._keys.get(variant, [])
+        start = bisect.bisect_right(keys, after) if after is not None else 0
+        page = foods[start:start + limit]
+        next_key = keys[start + limit - 1] if start + limit < len(foods) else None
+        return page, next_key
+
+    def etag(self, *parts) -> str:
+        """Kuchli ETag: menyu versiyasi + variant (kategoriya, sort)."""
+        suffix = "-".join(str(p) for p in parts if p is not None)
+        return f'"{self.version}-{suffix}"' if suffix else f'"{self.version}"'
+
+    @staticmethod
+    def variant(category_id: Optional[int], sort: Optional[str]) -> tuple[Optional[int], Optional[str]]:
+        return (category_id or None, sort if sort in _SORT_KEYS else None)
+
+
+def encode_json(data) -> bytes:
+    # FastJSONResponse bilan bir xil format
+    return orjson.dumps(data)
+
+
+def gzip_body(body: bytes) -> Optional[bytes]:
+    """Oldindan siqilgan nusxa; ``GZIP_MIN_SIZE`` dan kichik bo'lsa ``None`` (siqish foydasiz)."""
+    if len(body) < GZIP_MIN_SIZE:
+        return None
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _public(row: dict) -> dict:
+    return {k: row[k] for k in FOOD_FIELDS}
+
+
+async def load_menu_rows(session: AsyncSession) -> tuple[list[dict], list[dict]]:
+    cats = (await session.execute(
+        select(Category.id, Category.name).where(Category.is_active == True).order_by(Category.id)
+    )).all()
+    foods = (await session.execute(
+        select(
+            Food.id, Food.name, Food.description, Food.price, Food.rating,
+            Food.is_new, Food.image_url, Food.image_variants, Food.category_id, Food.created_at,
+        ).where(Food.is_active == True)
+    )).all()
+    categories = [{"id": c.id, "name": c.name} for c in cats]
+    food_rows = [
+        {
+            "id": f.id,
+            "name": f.name,
+            "description": f.description,
+            "price": f.price,
+            "rating": f.rating,
+            "is_new": f.is_new,
+            "image_url": f.image_url,
+            "image_variants": f.image_variants,
+            "category_id": f.category_id,
+            "_created_ts": f.created_at.timestamp() if f.created_at else 0.0,
+        }
+        for f in foods
+    ]
+    return categories, food_rows
+
+
+# Pub/sub ishlamayotgan paytda boshqa workerdagi o'zgarishlarni sezmaymiz —
+# shuning uchun snapshot faqat qisqa muddat ishlatiladi
+FALLBACK_TTL = 30
+
+_snapshot: Optional[MenuSnapshot] = None
+_built_at = 0.0
+_lock = asyncio.Lock()
+
+
+async def _load_rows_from_db() -> dict:
+    async with AsyncSessionFactory() as session:
+        categories, food_rows = await load_menu_rows(session)
+    return {"categories": categories, "foods": food_rows}
+
+
+def _is_fresh(snap: Optional[MenuSnapshot]) -> bool:
+    if snap is None:
+        return False
+    return shared_cache.is_listening() or time.monotonic() - _built_at < FALLBACK_TTL
+
+
+def current_snapshot() -> Optional[MenuSnapshot]:
+    """Tayyor snapshot (bo'lsa) — DB ga murojaat qilmaydi."""
+    snap = _snapshot
+    return snap if _is_fresh(snap) else None
+
+
+async def get_menu_snapshot() -> MenuSnapshot:
+    snap = _snapshot
+    if _is_fresh(snap):
+        return snap
+    async with _lock:
+        if not _is_fresh(_snapshot):
+            rows = await shared_cache.cached("menu", "rows", _load_rows_from_db)
+            _swap(MenuSnapshot(rows["categories"], rows["foods"]))
+        return _snapshot
+
+
+async def refresh_menu_snapshot() -> None:
+    """Taom yoki kategoriya o'zgargandan keyin chaqiriladi (commit'dan so'ng)."""
+    async with _lock:
+        try:
+            rows = await _load_rows_from_db()
+            snap = MenuSnapshot(rows["categories"], rows["foods"])
+        except Exception as e:
+            # Eski snapshotni qoldirmaymiz — keyingi so'rov qayta quradi
+            logger.error(f"Menu snapshot rebuild error: {e}")
+            await shared_cache.invalidate("menu")
+            return
+        # Yangi qatorlar Redis ga yoziladi, keyin boshqa workerlarga xabar ketadi
+        await shared_cache.invalidate("menu", preload={"rows": rows})
+        _swap(snap)
+
+
+def _swap(snap: Optional[MenuSnapshot]) -> None:
+    global _snapshot, _built_at
+    _snapshot = snap
+    _built_at = time.monotonic()
+    if snap is not None:
+        search_index.sync(snap.foods_by_id)
+        logger.info(f"Menu snapshot v{snap.version}: {len(snap.categories)} cats, {len(snap.foods_by_id)} foods")
+
+
+shared_cache.on_invalidate("menu", lambda: _swap(None))
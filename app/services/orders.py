@@ -1,20 +1,99 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, cast, String
+from sqlalchemy import select, func, update, insert, literal, cast
 from sqlalchemy.orm import selectinload
-from app.models.order import Order, OrderStatus
+from sqlalchemy.orm.attributes import set_committed_value
+from app.models.order import Order, OrderStatus, ACTIVE_STATUSES
 from app.models.order_item import OrderItem
+from app.models.user import User
+from app.db.cte import with_ctes
+from app.services import guests, outbox, kv_store, rollups, shared_cache
+from app.services import promo as promo_service
 from typing import List, Optional
+import contextlib
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+
+ORDER_COOLDOWN = 60  # soniya — bitta foydalanuvchining ketma-ket buyurtmalari orasida
+ORDER_LOCK_TTL = 30  # in-flight lock; worker yiqilsa ham shu vaqtdan keyin ochiladi
 
 
 def generate_order_number() -> str:
     return f"F{uuid.uuid4().hex[:8].upper()}"
 
 
+async def in_order_cooldown(tg_id: int) -> bool:
+    """Barcha workerlar uchun umumiy cooldown (kv_store) — DB ga bormasdan."""
+    return await kv_store.get(f"order:cooldown:{tg_id}") is not None
+
+
+async def start_order_cooldown(tg_id: int) -> None:
+    await kv_store.set(f"order:cooldown:{tg_id}", "1", ORDER_COOLDOWN)
+
+
+@contextlib.asynccontextmanager
+async def order_lock(tg_id: int):
+    """Bitta foydalanuvchining parallel buyurtmalarini bloklash; ``True`` — lock olindi."""
+    key = f"order:lock:{tg_id}"
+    token = await kv_store.acquire_lock(key, ORDER_LOCK_TTL)
+    try:
+        yield token is not None
+    finally:
+        if token is not None:
+            await kv_store.release_lock(key, token)
+
+
+async def find_user_for_order(
+    session: AsyncSession, tg_id: int, cooldown_seconds: int
+) -> tuple[Optional[User], Optional[str]]:
+    """
+    Foydalanuvchi va uning oxirgi ``cooldown_seconds`` ichidagi buyurtma raqami —
+    bitta so'rovda (dublikat tekshiruvi alohida round trip emas).
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=cooldown_seconds)
+    recent = (
+        select(Order.order_number)
+        .where(Order.user_id == User.id, Order.created_at >= cutoff)
+        .order_by(Order.created_at.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    row = (await session.execute(
+        select(User, recent.label("recent_order")).where(User.tg_id == tg_id)
+    )).first()
+    if row is None:
+        return None, None
+    return row[0], row[1]
+
+
+def _order_insert(values: dict, user: Optional[User], guest_phone: Optional[str], promo: Optional[dict]):
+    """
+    ``INSERT INTO orders ... SELECT ... RETURNING`` — guest upsert va promo
+    ``UPDATE`` shu so'rov ichida CTE: user_id guest CTE dan, promo_code promo
+    CTE dan olinadi. Promo ishlatib bo'lmasa promo CTE bo'sh — qator yozilmaydi.
+    """
+    table = Order.__table__
+    # SELECT ro'yxatidagi parametr tipini PG ustundan olmaydi — aniq CAST
+    columns = {k: cast(literal(v, table.c[k].type), table.c[k].type) for k, v in values.items()}
+    sources = []
+    if user is not None:
+        columns["user_id"] = cast(literal(user.id, table.c.user_id.type), table.c.user_id.type)
+    else:
+        guest = guests.upsert_guest_cte(guest_phone, values["customer_name"])
+        columns["user_id"] = guest.c.id
+        sources.append(guest)
+    if promo:
+        redeemed = promo_service.redeem_promo_cte(promo)
+        columns["promo_code"] = redeemed.c.code
+        sources.append(redeemed)
+    source = select(*(c.label(k) for k, c in columns.items()))
+    if sources:
+        source = source.select_from(*sources)
+    return insert(Order).from_select(list(columns), source).returning(Order)
+
+
 async def create_order(
     session: AsyncSession,
-    user_id: int,
+    user: Optional[User],
     customer_name: str,
     phone: str,
     comment: Optional[str],
@@ -22,37 +101,68 @@ async def create_order(
     location_lat: Optional[float],
     location_lng: Optional[float],
     items: list,
-    promo_code: Optional[str] = None,
+    promo: Optional[dict] = None,
+    notify_user: bool = False,
+    guest_phone: Optional[str] = None,
 ) -> Order:
-    order_number = generate_order_number()
-    order = Order(
-        order_number=order_number,
-        user_id=user_id,
-        customer_name=customer_name,
-        phone=phone,
-        comment=comment,
-        total=total,
-        status="NEW",
-        location_lat=location_lat,
-        location_lng=location_lng,
-        promo_code=promo_code,
+    """
+    Buyurtma + barcha itemlar bitta tranzaksiyada, ikki so'rov + COMMIT:
+
+      1. ``INSERT orders ... SELECT ... RETURNING`` — ``user`` bo'lmasa
+         ``guest_phone`` bo'yicha guest upsert va ``promo`` (``checkout_promo``
+         natijasi) ni ishlatish shu so'rov ichida CTE;
+      2. ``INSERT order_items ... VALUES (...), (...) RETURNING`` — shop kanal
+         (va ``notify_user`` bo'lsa mijoz) xabari outbox ga va kunlik savdo
+         yig'indilari (services/rollups.py) shu so'rovda CTE.
+
+    Promo ishlatib bo'lmasa (limit tugadi, o'chirildi) — rollback va
+    ``PromoUnavailable``. refresh yo'q; guest buyurtmada ``order.user``
+    yuklanmagan (``order.user_id`` bor).
+    """
+    values = {
+        "order_number": generate_order_number(),
+        "customer_name": customer_name,
+        "phone": phone,
+        "comment": comment,
+        "total": total,
+        "status": OrderStatus.NEW,
+        "location_lat": location_lat,
+        "location_lng": location_lng,
+    }
+    order = (await session.scalars(_order_insert(values, user, guest_phone, promo))).unique().one_or_none()
+    if order is None:
+        await session.rollback()
+        raise promo_service.PromoUnavailable("Promokod yaroqsiz yoki muddati o'tgan.")
+    set_committed_value(order, "courier", None)
+    if user is not None:
+        set_committed_value(order, "user", user)
+
+    rows = [
+        {
+            "order_id": order.id,
+            "food_id": item.get("food_id"),
+            "name_snapshot": item["name"],
+            "price_snapshot": item["price"],
+            "qty": item["qty"],
+            "line_total": item["price"] * item["qty"],
+        }
+        for item in items
+    ]
+    notifications = [{"kind": outbox.CHANNEL_NEW, "order_id": order.id, "payload": {}}]
+    if notify_user and user is not None and user.tg_id > 0:
+        notifications.append({
+            "kind": outbox.USER_STATUS, "order_id": order.id,
+            "payload": {"tg_id": user.tg_id, "status": OrderStatus.NEW.value},
+        })
+    # Itemlar, outbox qatorlari va kunlik yig'indilar — bitta so'rov (qolganlari CTE)
+    stmt = with_ctes(
+        insert(OrderItem).values(rows).returning(OrderItem),
+        [outbox.insert_rows(notifications), *rollups.order_created_statements(order, rows)],
     )
-    session.add(order)
-    await session.flush()
-
-    for item in items:
-        oi = OrderItem(
-            order_id=order.id,
-            food_id=item.get("food_id"),
-            name_snapshot=item["name"],
-            price_snapshot=item["price"],
-            qty=item["qty"],
-            line_total=item["price"] * item["qty"],
-        )
-        session.add(oi)
-
+    order_items = (await session.scalars(stmt)).all()
+    set_committed_value(order, "items", list(order_items))
     await session.commit()
-    await session.refresh(order)
+    outbox.wake()
     return order
 
 
@@ -86,35 +196,45 @@ async def get_user_orders(session: AsyncSession, user_id: int, limit: int = 10)
 
 
 async def get_active_orders(session: AsyncSession) -> List[Order]:
-    active_statuses = ["NEW", "CONFIRMED", "COOKING", "COURIER_ASSIGNED", "OUT_FOR_DELIVERY"]
     result = await session.execute(
         select(Order)
         .options(selectinload(Order.items), selectinload(Order.user), selectinload(Order.courier))
-        .where(cast(Order.status, String).in_(active_statuses))
+        .where(Order.status.in_(ACTIVE_STATUSES))
         .order_by(Order.created_at.desc())
     )
     return result.scalars().all()
 
 
+async def apply_status_change(session: AsyncSession, order: Order, status, **fields) -> None:
+    """
+    Statusni (va qo'shimcha maydonlarni, masalan ``courier_id``) o'rnatish va
+    kunlik yig'indilarni shu tranzaksiyada tuzatish. Commit — chaqiruvchida.
+    Bot handlerlari ham, admin API ham status ni faqat shu yerdan o'zgartiradi.
+    """
+    before = rollups.OrderFacts.of(order)
+    order.status = OrderStatus(status)
+    if order.status == OrderStatus.DELIVERED:
+        order.delivered_at = datetime.now(timezone.utc)
+    for k, v in fields.items():
+        setattr(order, k, v)
+    await rollups.record_status_change(session, before, rollups.OrderFacts.of(order))
+
+
 async def update_order_status(
     session: AsyncSession, order_id: int, status, **kwargs
 ) -> Optional[Order]:
     order = await get_order_by_id(session, order_id)
     if not order:
         return None
-    # Store as string to avoid enum cast issues
-    order.status = status.value if hasattr(status, 'value') else str(status)
-    if str(status) in ("DELIVERED", "OrderStatus.DELIVERED"):
-        order.delivered_at = datetime.now(timezone.utc)
-    for k, v in kwargs.items():
-        setattr(order, k, v)
+    await apply_status_change(session, order, status, **kwargs)
     await session.commit()
     await session.refresh(order)
+    await shared_cache.invalidate("stats")
     return order
 
 
 async def set_channel_message_id(session: AsyncSession, order_id: int, message_id: int):
-    order = await get_order_by_id(session, order_id)
-    if order:
-        order.channel_message_id = message_id
-        await session.commit()
+    await session.execute(
+        update(Order).where(Order.id == order_id).values(channel_message_id=message_id)
+    )
+    await session.commit()
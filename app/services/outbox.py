@@ -0,0 +1,252 @@
+"""
+Telegram xabarlari uchun outbox.
+
+Buyurtma yaratish / status o'zgartirish bilan BITTA tranzaksiyada
+``notification_outbox`` ga qator yoziladi (``enqueue``). Checkout Telegram
+API ni kutmaydi, Telegram ishlamay qolsa ham xabar yo'qolmaydi.
+
+``run_outbox_worker(bot)`` lifespan da fon vazifasi sifatida ishlaydi:
+
+  * navbatdagi qatorlarni qisqa tranzaksiyada ``FOR UPDATE SKIP LOCKED`` bilan
+    "ijaraga" oladi — ``next_attempt_at = now() + CLAIM_LEASE`` — va commit
+    qiladi (bir nechta worker bir xabarni ikki marta yubormaydi, worker
+    yiqilsa ijara tugagach qator yana navbatga qaytadi);
+  * Telegram ga tranzaksiyasiz, DB ulanishini ushlab turmasdan yuboradi;
+  * har bir natijani kichik ``UPDATE`` bilan yozadi: yuborildi yoki
+    eksponensial kutish bilan qayta urinish. Kanalga yuborilgan yangi
+    buyurtma xabarining id si ``orders.channel_message_id`` ga shu so'rovda yoziladi.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from aiogram import Bot
+from sqlalchemy import select, delete, func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.db.cte import with_ctes
+from app.db.session import AsyncSessionFactory
+from app.models.notification_outbox import NotificationOutbox
+from app.models.order import Order, OrderStatus
+from app.services.settings_service import get_shop_channel_id
+from app.services.telegram_notify import send_order_to_channel, notify_user_status, update_channel_message
+
+logger = logging.getLogger(__name__)
+
+# Xabar turlari
+CHANNEL_NEW = "channel_new"        # shop kanalga yangi buyurtma
+CHANNEL_UPDATE = "channel_update"  # kanal xabarini tahrirlash (payload: closed)
+USER_STATUS = "user_status"        # mijozga status (payload: tg_id, status)
+
+BATCH_SIZE = 20
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 5      # soniya: 5, 10, 20, ... BACKOFF_MAX gacha
+BACKOFF_MAX = 600
+IDLE_POLL = 2.0       # boshqa workerlar yozgan qatorlar uchun
+CLAIM_LEASE = timedelta(minutes=5)  # olingan qator shu vaqt ichida boshqa workerga berilmaydi
+KEEP_SENT = timedelta(days=7)
+
+_wakeup = asyncio.Event()
+
+
+def enqueue(session: AsyncSession, kind: str, order_id: int, **payload) -> None:
+    """Chaqiruvchining tranzaksiyasiga qo'shiladi; commit'dan keyin ``wake()``."""
+    session.add(NotificationOutbox(kind=kind, order_id=order_id, payload=payload))
+
+
+def insert_rows(rows: list[dict]):
+    """``[{"kind", "order_id", "payload"}]`` → bitta INSERT; checkout da order_items bilan CTE bo'lib ketadi."""
+    return insert(NotificationOutbox).values([{"attempts": 0, **r} for r in rows])
+
+
+def enqueue_status_change(session: AsyncSession, order: Order) -> None:
+    """Status o'zgarganda: mijozga xabar + kanaldagi xabarni yangilash."""
+    if order.user and order.user.tg_id and order.user.tg_id > 0:
+        enqueue(session, USER_STATUS, order.id, tg_id=order.user.tg_id, status=order.status.value)
+    closed = order.status in (OrderStatus.DELIVERED, OrderStatus.CANCELED)
+    enqueue(session, CHANNEL_UPDATE, order.id, closed=closed)
+
+
+def wake() -> None:
+    """Shu workerdagi outbox ni darhol uyg'otish (commit'dan keyin)."""
+    _wakeup.set()
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX))
+
+
+async def _deliver(bot: Bot, shop_channel_id: int, item: NotificationOutbox, order: Optional[Order]) -> bool:
+    if order is None:
+        return True  # buyurtma o'chirilgan — yuboradigan narsa yo'q
+    if item.kind == USER_STATUS:
+        return await notify_user_status(bot, item.payload["tg_id"], order, OrderStatus(item.payload["status"]))
+
+    if not shop_channel_id:
+        logger.warning(f"Outbox {item.kind} #{order.order_number}: shop_channel_id sozlanmagan")
+        if item.kind == CHANNEL_NEW:
+            from app.admin_api import _add_log
+            _add_log("warn", "⚠️ Shop kanal ID sozlanmagan! Admin paneldan Sozlamalar > Shop kanal ID ni kiriting.")
+        return True
+    if item.kind == CHANNEL_NEW:
+        if order.channel_message_id:
+            return True
+        msg_id = await send_order_to_channel(bot, shop_channel_id, order)
+        if not msg_id:
+            return False
+        order.channel_message_id = msg_id
+        return True
+    if item.kind == CHANNEL_UPDATE:
+        # Kanal xabari hali yuborilmagan — CHANNEL_NEW joriy holatni o'zi ko'rsatadi
+        if not order.channel_message_id:
+            return True
+        return await update_channel_message(
+            bot, shop_channel_id, order.channel_message_id, order, closed=item.payload.get("closed", False)
+        )
+    logger.error(f"Outbox: unknown kind {item.kind}")
+    return True
+
+
+async def _claim(session: AsyncSession) -> list[NotificationOutbox]:
+    """Navbatdagi qatorlarni ijaraga olish — bitta ``UPDATE ... RETURNING``."""
+    due = (
+        select(NotificationOutbox.id)
+        .where(
+            NotificationOutbox.sent_at.is_(None),
+            NotificationOutbox.attempts < MAX_ATTEMPTS,
+            NotificationOutbox.next_attempt_at <= func.now(),
+        )
+        .order_by(NotificationOutbox.id)
+        .limit(BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    )
+    items = (await session.scalars(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id.in_(due.scalar_subquery()))
+        .values(next_attempt_at=datetime.now(timezone.utc) + CLAIM_LEASE)
+        .returning(NotificationOutbox)
+    )).all()
+    return sorted(items, key=lambda i: i.id)
+
+
+async def _record(item: NotificationOutbox, ok: bool, error: Optional[str], order: Optional[Order]) -> None:
+    """Bitta qatorning natijasi — alohida qisqa tranzaksiya."""
+    now = datetime.now(timezone.utc)
+    values = {"sent_at": now, "last_error": None}
+    if not ok:
+        attempts = item.attempts + 1
+        values = {"attempts": attempts, "last_error": error, "next_attempt_at": now + _backoff(attempts)}
+        if attempts >= MAX_ATTEMPTS:
+            logger.error(f"Outbox #{item.id} ({item.kind}, order {item.order_id}) gave up: {error}")
+    stmt = (
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id == item.id, NotificationOutbox.sent_at.is_(None))
+        .values(**values)
+    )
+    channel_post = None
+    if ok and item.kind == CHANNEL_NEW and order is not None and order.channel_message_id:
+        channel_post = (
+            update(Order)
+            .where(Order.id == order.id, Order.channel_message_id.is_(None))
+            .values(channel_message_id=order.channel_message_id)
+        )
+    async with AsyncSessionFactory() as session:
+        await session.execute(with_ctes(stmt, [channel_post], prefix="post"))
+        await session.commit()
+
+
+async def process_batch(bot: Bot) -> int:
+    """Bitta paketni yuboradi; ishlangan qatorlar soni."""
+    # 1. Ijaraga olish, buyurtmalar va sozlama — qisqa tranzaksiya, keyin ulanish pulga qaytadi
+    async with AsyncSessionFactory() as session:
+        items = await _claim(session)
+        if not items:
+            await session.commit()
+            return 0
+        orders = {
+            o.id: o for o in (await session.execute(
+                select(Order)
+                .options(selectinload(Order.items), selectinload(Order.user), selectinload(Order.courier))
+                .where(Order.id.in_({i.order_id for i in items}))
+            )).scalars().all()
+        }
+        shop_channel_id = await get_shop_channel_id(session)
+        await session.commit()
+
+    # 2. Yuborish — tranzaksiyasiz; har bir natija o'z UPDATE i bilan
+    async def deliver_order(group: list[NotificationOutbox]):
+        # Bitta buyurtmaning xabarlari ketma-ket (kanal posti tahrirdan oldin),
+        # turli buyurtmalar parallel — telegram_sender ustuvorlik bo'yicha tartiblaydi
+        for item in group:
+            order = orders.get(item.order_id)
+            try:
+                ok = await _deliver(bot, shop_channel_id, item, order)
+                error = None if ok else "send failed"
+            except Exception as e:
+                ok, error = False, str(e)
+            try:
+                await _record(item, ok, error, order)
+            except Exception as e:
+                # Ijara tugagach qator qayta olinadi (CHANNEL_NEW channel_message_id bo'yicha takrorlanmaydi)
+                logger.warning(f"Outbox #{item.id}: natijani yozib bo'lmadi: {e}")
+
+    groups: dict[int, list[NotificationOutbox]] = {}
+    for item in items:
+        groups.setdefault(item.order_id, []).append(item)
+    await asyncio.gather(*(deliver_order(g) for g in groups.values()))
+    return len(items)
+
+
+async def _purge_sent():
+    async with AsyncSessionFactory() as session:
+        await session.execute(
+            delete(NotificationOutbox).where(NotificationOutbox.sent_at < func.now() - KEEP_SENT)
+        )
+        await session.commit()
+
+
+async def run_outbox_worker(bot: Bot):
+    """Lifespan da fon vazifasi sifatida ishga tushiriladi."""
+    logger.info("Notification outbox worker started")
+    last_purge = 0.0
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            _wakeup.clear()
+            if await process_batch(bot) == BATCH_SIZE:
+                continue  # navbat to'la — darhol keyingi paket
+            if loop.time() - last_purge > 3600:
+                await _purge_sent()
+                last_purge = loop.time()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Outbox worker error: {e}")
+            await asyncio.sleep(5)
+            continue
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=IDLE_POLL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def get_outbox_stats(session: AsyncSession) -> dict:
+    """Navbat chuqurligi: kutilayotgan, qayta urinilayotgan, voz kechilgan."""
+    pending = NotificationOutbox.sent_at.is_(None)
+    row = (await session.execute(
+        select(
+            func.count().filter(pending, NotificationOutbox.attempts < MAX_ATTEMPTS),
+            func.count().filter(pending, NotificationOutbox.attempts > 0, NotificationOutbox.attempts < MAX_ATTEMPTS),
+            func.count().filter(pending, NotificationOutbox.attempts >= MAX_ATTEMPTS),
+            func.min(NotificationOutbox.created_at).filter(pending, NotificationOutbox.attempts < MAX_ATTEMPTS),
+        )
+    )).one()
+    oldest = row[3]
+    return {
+        "pending": row[0],
+        "retrying": row[1],
+        "failed": row[2],
+        "oldest_pending_seconds": int((datetime.now(timezone.utc) - oldest).total_seconds()) if oldest else 0,
+    }
@@ -0,0 +1,39 @@
+"""
+Keyset (cursor) pagination yordamchilari.
+
+Kursor — oxirgi qaytarilgan qatorning tartib kaliti, JSON + base64url
+ko'rinishida. Klient uni ``X-Next-Cursor`` sarlavhasidan oladi va keyingi
+so'rovda ``cursor=`` sifatida yuboradi; ichki tuzilishiga tayanmasligi kerak.
+"""
+import base64
+import json
+from typing import Optional
+
+from fastapi import HTTPException
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Noto'g'ri cursor")
+    if not isinstance(values, list):
+        raise HTTPException(400, "Noto'g'ri cursor")
+    return values
+
+
+def parse_fields(fields: Optional[str], allowed: tuple[str, ...], always: tuple[str, ...] = ("id",)) -> Optional[list[str]]:
+    """``fields=id,name,price`` → ro'yxat; None — barcha maydonlar."""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(400, f"Noma'lum maydon(lar): {', '.join(unknown)}")
+    return list(always) + [f for f in requested if f not in always]
@@ -0,0 +1,75 @@
+"""
+Savatni server tomonda qayta narxlash.
+
+Klient yuborgan ``price``, ``name`` va ``total`` ga ishonilmaydi — narx va
+nom menyu snapshotidan (xotiradan) olinadi. Snapshot yo'q yoki undagi
+ma'lumot eskirgan bo'lsa, barcha taomlar bitta ``WHERE id = ANY(:ids)``
+so'rovi bilan o'qiladi. Aktiv bo'lmagan yoki mavjud bo'lmagan taom —
+``CartError``.
+"""
+from typing import Optional
+
+from sqlalchemy import Integer, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.food import Food
+from app.services.menu_cache import current_snapshot
+
+MIN_ORDER_TOTAL = 50000  # chegirmadan keyingi summa
+MAX_QTY = 99
+
+_FOODS_BY_IDS = (
+    select(Food.id, Food.name, Food.price, Food.is_active)
+    .where(Food.id == any_(bindparam("ids", type_=ARRAY(Integer))))
+)
+
+
+class CartError(ValueError):
+    """Savatni qabul qilib bo'lmaydi; xabar foydalanuvchiga ko'rsatiladi."""
+
+
+def _merge_items(items: list[dict]) -> dict[int, int]:
+    qty_by_id: dict[int, int] = {}
+    for item in items:
+        try:
+            food_id = int(item["food_id"])
+            qty = int(item["qty"])
+        except (KeyError, TypeError, ValueError):
+            raise CartError("Savatda noto'g'ri taom bor.")
+        if qty <= 0:
+            raise CartError("Taom soni noto'g'ri.")
+        qty_by_id[food_id] = qty_by_id.get(food_id, 0) + qty
+        if qty_by_id[food_id] > MAX_QTY:
+            raise CartError(f"Bitta taomdan ko'pi bilan {MAX_QTY} ta buyurtma qilish mumkin.")
+    return qty_by_id
+
+
+async def _load_foods(session: AsyncSession, ids: list[int]) -> dict[int, dict]:
+    snap = current_snapshot()
+    if snap is not None and all(fid in snap.foods_by_id for fid in ids):
+        return {fid: snap.foods_by_id[fid] for fid in ids}
+    rows = (await session.execute(_FOODS_BY_IDS, {"ids": ids})).all()
+    return {r.id: {"id": r.id, "name": r.name, "price": r.price} for r in rows if r.is_active}
+
+
+async def price_cart(session: AsyncSession, items: list[dict], discount_percent: Optional[float] = None) -> dict:
+    """
+    ``items`` — klientdan kelgan ``[{"food_id", "qty", ...}]``. Qaytaradi:
+    ``{"items": [{"food_id", "name", "price", "qty"}], "subtotal", "discount", "total"}``.
+    """
+    if not items:
+        raise CartError("Savat bo'sh.")
+    qty_by_id = _merge_items(items)
+    foods = await _load_foods(session, list(qty_by_id))
+    missing = [fid for fid in qty_by_id if fid not in foods]
+    if missing:
+        raise CartError("Savatdagi ba'zi taomlar hozir mavjud emas. Savatni yangilang.")
+
+    priced = [
+        {"food_id": fid, "name": foods[fid]["name"], "price": float(foods[fid]["price"]), "qty": qty}
+        for fid, qty in qty_by_id.items()
+    ]
+    subtotal = sum(i["price"] * i["qty"] for i in priced)
+    total = round(subtotal * (1 - discount_percent / 100)) if discount_percent else round(subtotal)
+    return {"items": priced, "subtotal": subtotal, "discount": subtotal - total, "total": float(total)}
@@ -1,37 +1,109 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, or_, func
 from app.models.promo import Promo
+from app.services import shared_cache
 from typing import Optional
 from datetime import datetime, timezone
+import re
 import secrets
 import string
 
+# Kod formati — yaratishda ham, tekshirishda ham (/api/promo/validate autentifikatsiyasiz)
+CODE_MAX_LENGTH = 32
+_CODE_RE = re.compile(rf"[A-Z0-9_-]{{1,{CODE_MAX_LENGTH}}}")
+
 
 def generate_promo_code(length: int = 8) -> str:
     alphabet = string.ascii_uppercase + string.digits
     return "".join(secrets.choice(alphabet) for _ in range(length))
 
 
-async def validate_promo(session: AsyncSession, code: str) -> Optional[dict]:
-    result = await session.execute(select(Promo).where(Promo.code == code.upper()))
-    promo = result.scalar_one_or_none()
+def normalize_code(code: str) -> Optional[str]:
+    """Katta harfga o'tkazilgan kod yoki None (uzun yoki ruxsat etilmagan belgilar)."""
+    code = code.strip().upper()
+    return code if _CODE_RE.fullmatch(code) else None
+
+
+async def _get_promo_cached(session: AsyncSession, code: str) -> Optional[dict]:
+    async def load():
+        result = await session.execute(select(Promo).where(Promo.code == code))
+        promo = result.scalar_one_or_none()
+        if not promo:
+            return None
+        return {
+            "code": promo.code,
+            "discount_percent": promo.discount_percent,
+            "is_active": promo.is_active,
+            "expires_at": promo.expires_at.isoformat() if promo.expires_at else None,
+            "usage_limit": promo.usage_limit,
+            "used_count": promo.used_count,
+        }
+
+    # Topilmagan kodlar keshlanmaydi — aks holda tasodifiy kodlar Redis ni to'ldiradi
+    return await shared_cache.cached("promo", code, load, cache_none=False)
+
+
+class PromoUnavailable(ValueError):
+    """Promo-kod buyurtma yozilayotganda yaroqsiz bo'lib qoldi (limit tugadi, o'chirildi, chegirma o'zgardi)."""
+
+
+async def _valid_promo(session: AsyncSession, code: str) -> Optional[dict]:
+    code = normalize_code(code)
+    if not code:
+        return None
+    promo = await _get_promo_cached(session, code)
     if not promo:
         return None
-    if not promo.is_active:
+    if not promo["is_active"]:
         return None
-    if promo.expires_at and promo.expires_at < datetime.now(timezone.utc):
+    if promo["expires_at"] and datetime.fromisoformat(promo["expires_at"]) < datetime.now(timezone.utc):
         return None
-    if promo.usage_limit and promo.used_count >= promo.usage_limit:
+    if promo["usage_limit"] and promo["used_count"] >= promo["usage_limit"]:
         return None
-    return {"discount_percent": promo.discount_percent, "code": promo.code}
+    return promo
 
 
-async def use_promo(session: AsyncSession, code: str):
-    result = await session.execute(select(Promo).where(Promo.code == code.upper()))
-    promo = result.scalar_one_or_none()
-    if promo:
-        promo.used_count += 1
-        await session.commit()
+async def validate_promo(session: AsyncSession, code: str) -> Optional[dict]:
+    promo = await _valid_promo(session, code)
+    if not promo:
+        return None
+    return {"discount_percent": promo["discount_percent"], "code": promo["code"]}
+
+
+async def checkout_promo(session: AsyncSession, code: str) -> Optional[dict]:
+    """
+    Checkout uchun: keshdan (DB ga odatda bormaydi) chegirma va ``limited``.
+    Haqiqiy ishlatish — ``redeem_promo_cte`` orqali buyurtma INSERT ining ichida.
+    ``limited`` True bo'lsa commit'dan keyin ``invalidate("promo")`` kerak
+    (keshdagi used_count eskiradi).
+    """
+    promo = await _valid_promo(session, code)
+    if not promo:
+        return None
+    return {"code": promo["code"], "discount_percent": promo["discount_percent"], "limited": bool(promo["usage_limit"])}
+
+
+def redeem_promo_cte(promo: dict):
+    """
+    Promo-kodni atomar ishlatish — ``create_order`` dagi ``INSERT orders`` uchun
+    ``UPDATE ... RETURNING`` CTE. Faqat aktiv, muddati o'tmagan, limiti
+    tugamagan va chegirmasi narxlashdagi bilan bir xil bo'lsa used_count oshadi
+    va qator qaytadi; aks holda CTE bo'sh — buyurtma qatori ham yozilmaydi.
+    """
+    return (
+        update(Promo)
+        .where(
+            Promo.code == promo["code"].upper(),
+            Promo.is_active == True,
+            or_(Promo.expires_at.is_(None), Promo.expires_at > func.now()),
+            # usage_limit NULL yoki 0 — cheklanmagan (validate_promo bilan bir xil)
+            or_(Promo.usage_limit.is_(None), Promo.usage_limit == 0, Promo.used_count < Promo.usage_limit),
+            Promo.discount_percent == promo["discount_percent"],
+        )
+        .values(used_count=Promo.used_count + 1)
+        .returning(Promo.code)
+        .cte("redeemed_promo")
+    )
 
 
 async def create_promo(
@@ -50,6 +122,7 @@ async def create_promo(
     session.add(promo)
     await session.commit()
     await session.refresh(promo)
+    await shared_cache.invalidate("promo")
     return promo
 
 
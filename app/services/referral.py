@@ -1,7 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, cast, String
+from sqlalchemy import select, func
 from app.models.user import User
-from app.models.order import Order
+from app.models.order import Order, OrderStatus
 from typing import Optional
 
 
@@ -48,7 +48,7 @@ async def get_referral_stats(session: AsyncSession, user_id: int) -> dict:
     delivered_r = await session.execute(
         select(func.count()).where(
             Order.user_id == user_id,
-            cast(Order.status, String) == "DELIVERED"
+            Order.status == OrderStatus.DELIVERED
         )
     )
     delivered_count = delivered_r.scalar() or 0
@@ -0,0 +1,253 @@
+"""
+Kunlik savdo yig'indilari — ``daily_sales``, ``daily_food_sales``, ``daily_courier_sales``.
+
+Kun — mahalliy (Toshkent, UTC+5). Yig'indilar buyurtma bilan bitta
+tranzaksiyada, bitta ``INSERT ... ON CONFLICT DO UPDATE SET x = x + excluded.x``
+so'rovi bilan yangilanadi (bir necha jadval — data-modifying CTE):
+
+  * ``order_created_statements`` — yangi buyurtma: orders_count/orders_total
+    (created_at kuni) va har bir taom bo'yicha qty/revenue; ``INSERT
+    order_items`` ichida CTE sifatida, checkout ga alohida so'rov qo'shmaydi;
+  * ``record_status_change`` — status o'zgarishi: buyurtmaning eski va yangi
+    "hissasi" farqi (DELIVERED → delivered_count/revenue delivered_at kuni va
+    kuryer bo'yicha, CANCELED → canceled_count created_at kuni).
+
+Statistika istalgan sana oralig'i uchun shu qatorlarni qo'shadi
+(services/stats.py) — ``orders`` jadvali skanerlanmaydi.
+
+Bo'sh / buzilgan yig'indilarni ``orders`` dan qayta qurish::
+
+    python -m app.services.rollups --rebuild [--since 2025-03-01]
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from typing import Optional
+
+from sqlalchemy import Date, DateTime, Interval, cast, delete, func, literal_column, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.cte import with_ctes
+from app.models.order import Order, OrderStatus
+from app.models.order_item import OrderItem
+from app.models.sales_rollup import DailySales, DailyFoodSales, DailyCourierSales
+from app.utils.time import LOCAL_TZ, local_day
+
+logger = logging.getLogger(__name__)
+
+_SALES_COLUMNS = ("orders_count", "orders_total", "delivered_count", "revenue", "canceled_count")
+_COURIER_COLUMNS = ("delivered_count", "revenue")
+
+
+# UNION ichidagi nol ustunlar — bind parametr emas (tipini PG aniqlay olmaydi)
+_ZERO = literal_column("0")
+_ZERO_F = literal_column("0.0")
+_LOCAL_OFFSET_SQL = literal_column(
+    f"interval '{int(LOCAL_TZ.utcoffset(None).total_seconds())} seconds'", Interval
+)
+
+
+def local_day_sql(column):
+    """``local_day`` ning SQL varianti. Bind parametrlarsiz — GROUP BY dagi ifoda bilan bir xil bo'lsin."""
+    return cast(func.timezone(literal_column("'UTC'"), column, type_=DateTime) + _LOCAL_OFFSET_SQL, Date)
+
+
+# ── Yozish ────────────────────────────────────────────────────────────────
+
+def _bump(model, keys: tuple[str, ...], deltas: dict[tuple, dict]):
+    """``{key: {col: delta}}`` → bitta ko'p qatorli upsert (qiymatlar qo'shiladi)."""
+    columns = sorted({c for values in deltas.values() for c in values})
+    rows = [
+        {**dict(zip(keys, key)), **{c: values.get(c, 0) for c in columns}}
+        for key, values in deltas.items()
+    ]
+    stmt = pg_insert(model).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={c: getattr(model, c) + getattr(stmt.excluded, c) for c in columns},
+    )
+
+
+async def _execute(session: AsyncSession, statements: list):
+    """Bir nechta upsert — bitta round trip: oxirgisidan boshqalari CTE bo'ladi."""
+    statements = [s for s in statements if s is not None]
+    if not statements:
+        return
+    await session.execute(with_ctes(statements[-1], statements[:-1], prefix="rollup"))
+
+
+def _nonzero(deltas: dict[tuple, dict]) -> dict[tuple, dict]:
+    cleaned = {key: {c: v for c, v in values.items() if v} for key, values in deltas.items()}
+    return {key: values for key, values in cleaned.items() if values}
+
+
+def order_created_statements(order: Order, items: list[dict]) -> list:
+    """
+    Yangi buyurtma uchun upsertlar — alohida bajarilmaydi, ``create_order``
+    ularni ``INSERT order_items`` ga CTE qilib qo'shadi (checkout ga qo'shimcha
+    round trip yo'q). ``items`` — order_items qatorlari.
+    """
+    day = local_day(order.created_at)
+    foods: dict[tuple, dict] = defaultdict(lambda: {"qty": 0, "revenue": 0.0})
+    for item in items:
+        if item.get("food_id") is None:
+            continue  # menyudan tashqari qator — taomlar reytingiga kirmaydi
+        acc = foods[(day, item["food_id"])]
+        acc["qty"] += item["qty"]
+        acc["revenue"] += item["line_total"]
+    return [
+        _bump(DailySales, ("day",), {(day,): {"orders_count": 1, "orders_total": order.total}}),
+        _bump(DailyFoodSales, ("day", "food_id"), dict(foods)) if foods else None,
+    ]
+
+
+@dataclass(frozen=True)
+class OrderFacts:
+    """Status o'zgarishidan oldingi/keyingi holat — yig'indi hissasini hisoblash uchun."""
+    status: OrderStatus
+    created_at: datetime
+    delivered_at: Optional[datetime]
+    courier_id: Optional[int]
+    total: float
+
+    @classmethod
+    def of(cls, order: Order) -> "OrderFacts":
+        return cls(OrderStatus(order.status), order.created_at, order.delivered_at, order.courier_id, order.total)
+
+    def contribution(self) -> tuple[dict, dict]:
+        sales: dict[tuple, dict] = {}
+        couriers: dict[tuple, dict] = {}
+        if self.status == OrderStatus.DELIVERED and self.delivered_at is not None:
+            day = local_day(self.delivered_at)
+            sales[(day,)] = {"delivered_count": 1, "revenue": self.total}
+            if self.courier_id is not None:
+                couriers[(day, self.courier_id)] = {"delivered_count": 1, "revenue": self.total}
+        elif self.status == OrderStatus.CANCELED:
+            sales[(local_day(self.created_at),)] = {"canceled_count": 1}
+        return sales, couriers
+
+
+def _diff(before: dict, after: dict) -> dict:
+    deltas: dict[tuple, dict] = defaultdict(lambda: defaultdict(int))
+    for sign, side in ((-1, before), (1, after)):
+        for key, values in side.items():
+            for c, v in values.items():
+                deltas[key][c] += sign * v
+    return _nonzero(deltas)
+
+
+def status_change_deltas(before: OrderFacts, after: OrderFacts) -> tuple[dict, dict]:
+    """Eski va yangi hissa farqi: ``(sales, couriers)``, ``{key: {col: delta}}`` — nol farqlarsiz."""
+    if before == after:
+        return {}, {}
+    sales_before, couriers_before = before.contribution()
+    sales_after, couriers_after = after.contribution()
+    return _diff(sales_before, sales_after), _diff(couriers_before, couriers_after)
+
+
+async def record_status_change(session: AsyncSession, before: OrderFacts, after: OrderFacts) -> None:
+    """Eski va yangi hissa farqini yozish; farq bo'lmasa — so'rov yo'q."""
+    sales, couriers = status_change_deltas(before, after)
+    await _execute(session, [
+        _bump(DailySales, ("day",), sales) if sales else None,
+        _bump(DailyCourierSales, ("day", "courier_id"), couriers) if couriers else None,
+    ])
+
+
+# ── Qayta qurish ──────────────────────────────────────────────────────────
+
+async def rebuild(session: AsyncSession, since: Optional[date] = None) -> dict:
+    """
+    ``since`` (mahalliy kun) dan boshlab yig'indilarni ``orders`` dan qayta
+    hisoblaydi; ``None`` — hammasi. Commit qiladi.
+
+    Jadvallar EXCLUSIVE rejimda qulflanadi: parallel buyurtmalar yig'indi
+    yozishda shu tranzaksiya tugashini kutadi, keyin o'z deltasini qo'shadi —
+    hech narsa ikki marta sanalmaydi va yo'qolmaydi.
+    """
+    await session.execute(text(
+        "LOCK TABLE daily_sales, daily_food_sales, daily_courier_sales IN EXCLUSIVE MODE"
+    ))
+    since_ts = datetime.combine(since, time(), LOCAL_TZ) if since else None
+    for model in (DailySales, DailyFoodSales, DailyCourierSales):
+        stmt = delete(model)
+        if since:
+            stmt = stmt.where(model.day >= since)
+        await session.execute(stmt)
+
+    created_day = local_day_sql(Order.created_at)
+    delivered_day = local_day_sql(Order.delivered_at)
+    is_delivered = (Order.status == OrderStatus.DELIVERED) & Order.delivered_at.is_not(None)
+    created_filter = [Order.created_at >= since_ts] if since_ts else []
+    delivered_filter = [is_delivered] + ([Order.delivered_at >= since_ts] if since_ts else [])
+
+    parts = union_all(
+        select(
+            created_day.label("day"),
+            func.count().label("orders_count"),
+            func.sum(Order.total).label("orders_total"),
+            _ZERO.label("delivered_count"),
+            _ZERO_F.label("revenue"),
+            func.count().filter(Order.status == OrderStatus.CANCELED).label("canceled_count"),
+        ).where(*created_filter).group_by(created_day),
+        select(
+            delivered_day.label("day"),
+            _ZERO, _ZERO_F,
+            func.count(), func.sum(Order.total),
+            _ZERO,
+        ).where(*delivered_filter).group_by(delivered_day),
+    ).subquery()
+    sales = await session.execute(
+        pg_insert(DailySales).from_select(
+            ["day", *_SALES_COLUMNS],
+            select(parts.c.day, *(func.sum(parts.c[c]) for c in _SALES_COLUMNS)).group_by(parts.c.day),
+        )
+    )
+
+    foods = await session.execute(
+        pg_insert(DailyFoodSales).from_select(
+            ["day", "food_id", "qty", "revenue"],
+            select(created_day, OrderItem.food_id, func.sum(OrderItem.qty), func.sum(OrderItem.line_total))
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(OrderItem.food_id.is_not(None), *created_filter)
+            .group_by(created_day, OrderItem.food_id),
+        )
+    )
+
+    couriers = await session.execute(
+        pg_insert(DailyCourierSales).from_select(
+            ["day", "courier_id", *_COURIER_COLUMNS],
+            select(delivered_day, Order.courier_id, func.count(), func.sum(Order.total))
+            .where(Order.courier_id.is_not(None), *delivered_filter)
+            .group_by(delivered_day, Order.courier_id),
+        )
+    )
+    await session.commit()
+    return {"days": sales.rowcount, "food_rows": foods.rowcount, "courier_rows": couriers.rowcount}
+
+
+async def _cli(since: Optional[date]):
+    from app.db.session import AsyncSessionFactory, engine
+    from app.services import shared_cache
+
+    async with AsyncSessionFactory() as session:
+        stats = await rebuild(session, since)
+    await shared_cache.invalidate("stats")
+    await engine.dispose()
+    print(", ".join(f"{k}={v}" for k, v in stats.items()))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Kunlik savdo yig'indilarini orders dan qayta qurish")
+    parser.add_argument("--rebuild", action="store_true", help="yig'indilarni qayta hisoblash")
+    parser.add_argument("--since", type=date.fromisoformat, help="shu kundan (YYYY-MM-DD, mahalliy) boshlab")
+    args = parser.parse_args()
+    if args.rebuild:
+        asyncio.run(_cli(args.since))
+    else:
+        parser.print_help()
@@ -0,0 +1,136 @@
+"""
+Taom qidiruvi — menyu snapshotidan qurilgan xotiradagi inverted index.
+
+Menyu nomlari o'zbekcha (lotin) va ruscha (kirill) aralash, shuning uchun
+hujjat ham, so'rov ham bir xil kanonik shaklga keltiriladi: kirill → lotin,
+apostroflar olib tashlanadi, x/h, q/k va c/k birlashtiriladi, takroriy
+harflar qisqartiriladi ("Хот-дог" va "Hotdog" bir xil tokenlarga tushadi).
+
+Index snapshot almashganda ``sync()`` orqali yangilanadi — faqat qo'shilgan,
+o'zgargan yoki o'chirilgan taomlar qayta indekslanadi.
+"""
+import re
+from typing import Optional
+
+_CYR = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "yo", "ж": "j",
+    "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "x", "ц": "z",
+    "ч": "ch", "ш": "sh", "щ": "sh", "ъ": "", "ы": "i", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya", "ў": "o", "қ": "q", "ғ": "g", "ҳ": "h",
+}
+_TRANSLIT = str.maketrans({**_CYR, "'": "", "ʻ": "", "ʼ": "", "`": "", "’": ""})
+_FOLDS = (("kh", "h"), ("x", "h"), ("q", "k"))
+_C_RE = re.compile(r"c(?!h)")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_REPEAT_RE = re.compile(r"(.)\1+")
+
+MAX_PREFIX = 16
+
+# Maydon vazni: (to'liq moslik, prefiks moslik)
+_NAME_W = (10.0, 6.0)
+_DESC_W = (3.0, 1.0)
+
+
+def normalize(text: str) -> str:
+    s = text.lower().translate(_TRANSLIT)
+    for a, b in _FOLDS:
+        s = s.replace(a, b)
+    s = _C_RE.sub("k", s)
+    return _REPEAT_RE.sub(r"\1", s)
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    if not text:
+        return []
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def _name_tokens(name: str) -> list[str]:
+    tokens = tokenize(name)
+    # "hot dog" ham "hotdog" so'roviga mos kelsin
+    return tokens + [a + b for a, b in zip(tokens, tokens[1:])]
+
+
+class SearchIndex:
+    def __init__(self):
+        self._exact: dict[str, dict[int, float]] = {}
+        self._prefix: dict[str, dict[int, float]] = {}
+        self._docs: dict[int, tuple[tuple, list[tuple[str, str]]]] = {}
+        self._foods: dict[int, dict] = {}
+
+    def sync(self, foods_by_id: dict[int, dict]) -> int:
+        """Index ni yangi menyuga moslash; qayta indekslangan taomlar sonini qaytaradi."""
+        changed = 0
+        for fid in list(self._docs):
+            if fid not in foods_by_id:
+                self._remove(fid)
+                changed += 1
+        for fid, food in foods_by_id.items():
+            fingerprint = (food["name"], food.get("description"))
+            doc = self._docs.get(fid)
+            if doc is None or doc[0] != fingerprint:
+                if doc is not None:
+                    self._remove(fid)
+                self._add(fid, food, fingerprint)
+                changed += 1
+        self._foods = foods_by_id
+        return changed
+
+    def _add(self, fid: int, food: dict, fingerprint: tuple):
+        postings = []
+        for weights, tokens in ((_NAME_W, _name_tokens(food["name"])), (_DESC_W, tokenize(food.get("description")))):
+            exact_w, prefix_w = weights
+            for tok in tokens:
+                self._put(self._exact, tok, fid, exact_w)
+                postings.append(("e", tok))
+                for n in range(1, min(len(tok), MAX_PREFIX) + 1):
+                    self._put(self._prefix, tok[:n], fid, prefix_w)
+                    postings.append(("p", tok[:n]))
+        self._docs[fid] = (fingerprint, postings)
+
+    @staticmethod
+    def _put(table: dict, key: str, fid: int, weight: float):
+        bucket = table.setdefault(key, {})
+        if bucket.get(fid, 0) < weight:
+            bucket[fid] = weight
+
+    def _remove(self, fid: int):
+        _, postings = self._docs.pop(fid)
+        for kind, key in postings:
+            table = self._exact if kind == "e" else self._prefix
+            bucket = table.get(key)
+            if bucket is not None:
+                bucket.pop(fid, None)
+                if not bucket:
+                    del table[key]
+
+    def search(self, query: str, limit: int = 20, category_id: Optional[int] = None) -> list[dict]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        scores: Optional[dict[int, float]] = None
+        for term in terms:
+            term_scores = dict(self._prefix.get(term[:MAX_PREFIX], {}))
+            for fid, w in self._exact.get(term, {}).items():
+                if term_scores.get(fid, 0) < w:
+                    term_scores[fid] = w
+            # Barcha so'zlar mos kelishi shart (AND)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {fid: s + term_scores[fid] for fid, s in scores.items() if fid in term_scores}
+            if not scores:
+                return []
+
+        hits = []
+        for fid, score in scores.items():
+            food = self._foods.get(fid)
+            if food is None or (category_id and food["category_id"] != category_id):
+                continue
+            hits.append((-score, -(food["rating"] or 0), fid, food))
+        hits.sort(key=lambda h: h[:3])
+        return [h[3] for h in hits[:limit]]
+
+
+search_index = SearchIndex()
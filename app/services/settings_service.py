@@ -1,13 +1,18 @@
+from datetime import datetime, time
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models.setting import AppSetting
 from app.config import settings
+from app.services import shared_cache
+from app.utils.time import LOCAL_TZ
 
 
 async def get_setting(session: AsyncSession, key: str) -> str | None:
-    result = await session.execute(select(AppSetting).where(AppSetting.key == key))
-    s = result.scalar_one_or_none()
-    return s.value if s else None
+    async def load():
+        result = await session.execute(select(AppSetting.value).where(AppSetting.key == key))
+        return result.scalar_one_or_none()
+
+    return await shared_cache.cached("settings", key, load)
 
 
 async def set_setting(session: AsyncSession, key: str, value: str):
@@ -19,6 +24,7 @@ async def set_setting(session: AsyncSession, key: str, value: str):
         row = AppSetting(key=key, value=value)
         session.add(row)
     await session.commit()
+    await shared_cache.invalidate("settings")
 
 
 async def get_shop_channel_id(session: AsyncSession) -> int:
@@ -39,3 +45,31 @@ async def get_courier_channel_id(session: AsyncSession) -> int:
         except ValueError:
             pass
     return settings.COURIER_CHANNEL_ID
+
+
+# Ish vaqti mahalliy (Toshkent, UTC+5) vaqt bo'yicha, masalan "09:00-04:00"
+DEFAULT_WORK_HOURS = "09:00-04:00"
+
+
+def _is_within_hours(work_hours: str, now: datetime) -> bool:
+    try:
+        start_s, end_s = work_hours.split("-")
+        start = time.fromisoformat(start_s.strip())
+        end = time.fromisoformat(end_s.strip())
+    except ValueError:
+        return True
+    t = now.time()
+    if start <= end:
+        return start <= t < end
+    # Yarim tundan o'tadigan oraliq
+    return t >= start or t < end
+
+
+async def get_shop_status(session: AsyncSession) -> dict:
+    is_open_flag = await get_setting(session, "shop_is_open")
+    work_hours = await get_setting(session, "work_hours") or DEFAULT_WORK_HOURS
+    manual_open = is_open_flag not in ("0", "false", "off")
+    return {
+        "is_open": manual_open and _is_within_hours(work_hours, datetime.now(LOCAL_TZ)),
+        "work_hours": work_hours,
+    }
@@ -0,0 +1,190 @@
+"""
+Workerlar o'rtasida umumiy kesh (Redis) + har bir workerda lokal nusxa.
+
+Har bir namespace ("menu", "settings", "promo", ...) uchun Redis da versiya
+kaliti bor: ``cache:<ns>:version``. Qiymatlar ``cache:<ns>:<version>:<key>``
+ostida JSON ko'rinishida saqlanadi. Admin ma'lumotni o'zgartirganda
+``invalidate(ns)`` versiyani oshiradi va ``cache:invalidate`` kanaliga xabar
+yuboradi — boshqa workerlar lokal nusxasini tashlab yuboradi.
+
+Redis ishlamasa hammasi to'g'ridan-to'g'ri loader (Postgres) ga tushadi;
+pub/sub tinglovchisi ulanmagan paytda lokal nusxa saqlanmaydi, aks holda
+boshqa workerdagi o'zgarish bu yerga hech qachon yetib bormasdi.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+from redis.exceptions import RedisError
+
+from app.db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache:invalidate"
+SHARED_TTL = 24 * 3600  # eski versiyadagi kalitlar o'z-o'zidan o'chadi
+
+WORKER_ID = uuid.uuid4().hex[:12]
+
+_local: dict[str, dict[str, Any]] = {}
+_generation: dict[str, int] = {}
+_callbacks: dict[str, list[Callable[[], None]]] = {}
+_listening = False
+# Redis ishlamay qolsa, har so'rovda ulanish timeout ini kutmaslik uchun
+_RETRY_AFTER = 10
+_redis_down_until = 0.0
+
+
+def _version_key(ns: str) -> str:
+    return f"cache:{ns}:version"
+
+
+def _value_key(ns: str, version: int, key: str) -> str:
+    return f"cache:{ns}:{version}:{key}"
+
+
+def is_listening() -> bool:
+    return _listening
+
+
+def on_invalidate(ns: str, callback: Callable[[], None]):
+    """Namespace bekor qilinganda chaqiriladigan sinxron callback."""
+    _callbacks.setdefault(ns, []).append(callback)
+
+
+def drop_local(ns: str):
+    _local.pop(ns, None)
+    _generation[ns] = _generation.get(ns, 0) + 1
+    for cb in _callbacks.get(ns, []):
+        try:
+            cb()
+        except Exception as e:
+            logger.error(f"Cache callback error ({ns}): {e}")
+
+
+def _redis_ok() -> bool:
+    return time.monotonic() >= _redis_down_until
+
+
+def _mark_down(what: str, e: Exception):
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + _RETRY_AFTER
+    logger.warning(f"Redis cache unavailable ({what}): {e}")
+
+
+def _drop_all_local():
+    for ns in set(_local) | set(_callbacks):
+        drop_local(ns)
+
+
+async def cached(ns: str, key: str, loader: Callable[[], Awaitable[Any]], cache_none: bool = True) -> Any:
+    """
+    Lokal → Redis → loader. Qiymat JSON ga aylanadigan bo'lishi kerak.
+    ``cache_none=False`` — loader None qaytarsa hech qayerda saqlanmaydi
+    (ixtiyoriy kalitlar bilan keshni to'ldirib bo'lmasin).
+    """
+    local = _local.get(ns)
+    if local is not None and key in local:
+        return local[key]
+
+    generation = _generation.get(ns, 0)
+    version = None
+    if _redis_ok():
+        try:
+            r = get_redis()
+            version = int(await r.get(_version_key(ns)) or 0)
+            raw = await r.get(_value_key(ns, version, key))
+            if raw is not None:
+                value = json.loads(raw)
+                _remember(ns, key, value, generation)
+                return value
+        except (RedisError, OSError) as e:
+            _mark_down(f"{ns}:{key}", e)
+            version = None
+
+    value = await loader()
+    if value is None and not cache_none:
+        return None
+    if version is not None:
+        try:
+            await get_redis().set(_value_key(ns, version, key), json.dumps(value, default=str), ex=SHARED_TTL)
+        except (RedisError, OSError) as e:
+            _mark_down(f"{ns}:{key}", e)
+    _remember(ns, key, value, generation)
+    return value
+
+
+def _remember(ns: str, key: str, value: Any, generation: int):
+    # Yuklash davomida invalidatsiya kelgan bo'lsa — eski qiymatni saqlamaymiz
+    if not _listening or _generation.get(ns, 0) != generation:
+        return
+    _local.setdefault(ns, {})[key] = value
+
+
+async def invalidate(ns: str, preload: Optional[dict[str, Any]] = None):
+    """
+    Namespace ni barcha workerlarda bekor qilish. ``preload`` berilsa, yangi
+    versiya qiymatlari xabar yuborilishidan OLDIN yoziladi — boshqa workerlar
+    Postgres ga emas, Redis ga murojaat qiladi.
+    """
+    drop_local(ns)
+    if not _redis_ok():
+        return
+    try:
+        r = get_redis()
+        version = await r.incr(_version_key(ns))
+        if preload:
+            async with r.pipeline(transaction=False) as pipe:
+                for key, value in preload.items():
+                    pipe.set(_value_key(ns, version, key), json.dumps(value, default=str), ex=SHARED_TTL)
+                await pipe.execute()
+        await r.publish(CHANNEL, f"{ns}:{WORKER_ID}")
+    except (RedisError, OSError) as e:
+        _mark_down(f"invalidate {ns}", e)
+        return
+    if preload and _listening:
+        _local[ns] = dict(preload)
+
+
+async def run_invalidation_listener():
+    """Lifespan da fon vazifasi sifatida ishga tushiriladi."""
+    global _listening
+    while True:
+        pubsub = None
+        try:
+            # Subscribe tasdiqlari kerak: redis-py uzilgan ulanishni o'zi tiklab
+            # qayta obuna bo'ladi — bu yerda xato ko'rinmaydi
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=False)
+            await pubsub.subscribe(CHANNEL)
+            while True:
+                msg = await pubsub.get_message(timeout=1.0)
+                if not msg:
+                    continue
+                if msg["type"] == "subscribe":
+                    # (Qayta) obuna: ulanish uzilgan paytdagi xabarlar yo'qolgan bo'lishi mumkin
+                    _drop_all_local()
+                    _listening = True
+                    logger.info(f"Cache invalidation listener subscribed (worker {WORKER_ID})")
+                    continue
+                if msg["type"] != "message":
+                    continue
+                data = msg["data"].decode() if isinstance(msg["data"], bytes) else str(msg["data"])
+                ns, _, sender = data.partition(":")
+                if sender != WORKER_ID:
+                    drop_local(ns)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener error: {e}")
+            await asyncio.sleep(5)
+        finally:
+            _listening = False
+            _drop_all_local()
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
@@ -1,63 +1,216 @@
+"""
+Admin statistikasi — kunlik yig'indilardan (services/rollups.py) va qisqa muddatli kesh.
+
+Istalgan sana oralig'i (mahalliy kunlar, UTC+5) uchun metrikalar
+``daily_sales`` / ``daily_food_sales`` qatorlarining yig'indisi — oraliq
+uzunligidan qat'i nazar ko'pi bilan bir necha yuz qator, ``orders`` jadvali
+skanerlanmaydi. Aktiv buyurtmalar soni — joriy holat, ``ix_orders_active``
+partial indeksidan. Hammasi bitta so'rovda (scalar subquery lar).
+
+Taomlar ``food_id`` bo'yicha guruhlanadi (nom o'zgarsa ham hisob bo'linmaydi);
+nomlar menyu keshidan (``menu_cache.current_snapshot``), menyuda yo'q
+(o'chirilgan/aktiv emas) taomlar uchun — oxirgi ``name_snapshot``.
+
+Natija har bir oraliq uchun ``STATS_TTL`` soniya saqlanadi; bir vaqtda kelgan
+so'rovlar bitta yuklashni kutadi. Yuklash keshga tegishli alohida vazifa, o'z
+sessiyasi bilan (menu_cache kabi) — so'rov bekor qilinsa ham boshqa kutuvchilar
+natijani oladi. Buyurtma statusi o'zgarganda
+``shared_cache.invalidate("stats")`` — barcha workerlarda kesh tozalanadi.
+"""
+import asyncio
+import time
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import JSON, select, func, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by, distinct_on
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, cast, String
-from app.models.order import Order, OrderStatus
+
+from app.db.session import AsyncSessionFactory
+from app.models.order import Order, ACTIVE_STATUSES
 from app.models.order_item import OrderItem
-from datetime import datetime, timedelta, timezone
+from app.models.sales_rollup import DailySales, DailyFoodSales
+from app.services import menu_cache, shared_cache
+from app.utils.time import local_today
+
+STATS_TTL = 5.0  # soniya
+TOP_FOODS = 5
+
+_cache: dict[tuple, tuple[float, dict]] = {}
+_inflight: dict[tuple, asyncio.Task] = {}
+_generation = 0
+
+
+def _drop_cache():
+    global _generation
+    _cache.clear()
+    _generation += 1
 
 
-async def get_stats(session: AsyncSession, period: str = "today") -> dict:
-    now = datetime.now(timezone.utc)
-    if period == "today":
-        since = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    elif period == "week":
-        since = now - timedelta(days=7)
-    else:
-        since = now - timedelta(days=30)
+shared_cache.on_invalidate("stats", _drop_cache)
 
-    orders_r = await session.execute(
-        select(func.count()).where(Order.created_at >= since)
+
+PERIOD_DAYS = {"today": 1, "week": 7, "month": 30}
+
+
+def period_range(period: str, today: date) -> tuple[date, date]:
+    """``today`` — bugun, ``week`` / ``month`` — bugun bilan birga oxirgi 7 / 30 kun."""
+    days = PERIOD_DAYS.get(period, PERIOD_DAYS["month"])
+    return today - timedelta(days=days - 1), today
+
+
+def resolve_range(
+    period: str, date_from: Optional[date], date_to: Optional[date]
+) -> tuple[str, date, date]:
+    """``date_from`` / ``date_to`` (mahalliy kunlar, ikkalasi ham kiradi) berilsa — ``period`` o'rniga."""
+    today = local_today()
+    if date_from or date_to:
+        return "custom", date_from or date_to, date_to or today
+    return (period, *period_range(period, today))
+
+
+def _foods_query(start: date, end: date, limit: Optional[int] = None):
+    qty = func.sum(DailyFoodSales.qty)
+    revenue = func.sum(DailyFoodSales.revenue)
+    stmt = (
+        select(DailyFoodSales.food_id, qty.label("qty"), revenue.label("revenue"))
+        .where(DailyFoodSales.day.between(start, end))
+        .group_by(DailyFoodSales.food_id)
+        .order_by(qty.desc(), revenue.desc(), DailyFoodSales.food_id)
     )
-    orders_count = orders_r.scalar() or 0
+    return stmt.limit(limit) if limit else stmt
 
-    delivered_r = await session.execute(
-        select(func.count()).where(
-            cast(Order.status, String) == "DELIVERED",
-            Order.delivered_at >= since
+
+def _stats_query(start: date, end: date):
+    top = _foods_query(start, end, TOP_FOODS).subquery()
+    top_json = select(
+        func.coalesce(
+            func.json_agg(aggregate_order_by(
+                func.json_build_object("food_id", top.c.food_id, "qty", top.c.qty),
+                top.c.qty.desc(), top.c.revenue.desc(), top.c.food_id,
+            )),
+            literal_column("'[]'::json"),
+            type_=JSON,  # asyncpg json ni satr qaytaradi — SQLAlchemy dekodlasin
         )
-    )
-    delivered_count = delivered_r.scalar() or 0
+    ).scalar_subquery()
+    active = select(func.count()).select_from(Order).where(Order.status.in_(ACTIVE_STATUSES)).scalar_subquery()
 
-    revenue_r = await session.execute(
-        select(func.sum(Order.total)).where(
-            cast(Order.status, String) == "DELIVERED",
-            Order.delivered_at >= since
+    return (
+        select(
+            func.coalesce(func.sum(DailySales.orders_count), 0).label("orders_count"),
+            func.coalesce(func.sum(DailySales.delivered_count), 0).label("delivered_count"),
+            func.coalesce(func.sum(DailySales.revenue), 0).label("revenue"),
+            func.coalesce(func.sum(DailySales.canceled_count), 0).label("canceled_count"),
+            active.label("active_count"),
+            top_json.label("top_foods"),
         )
+        .where(DailySales.day.between(start, end))
     )
-    revenue = revenue_r.scalar() or 0
 
-    active_statuses = ["NEW", "CONFIRMED", "COOKING", "COURIER_ASSIGNED", "OUT_FOR_DELIVERY"]
-    active_r = await session.execute(
-        select(func.count()).where(
-            cast(Order.status, String).in_(active_statuses)
+
+async def food_names(session: AsyncSession, food_ids: list[int]) -> dict[int, str]:
+    """Menyu keshidan; keshda yo'qlari — bitta so'rov, ``ix_order_items_food_id_order_id`` dan."""
+    snap = menu_cache.current_snapshot()
+    known = snap.foods_by_id if snap else {}
+    names = {fid: known[fid]["name"] for fid in food_ids if fid in known}
+    missing = [fid for fid in food_ids if fid not in names]
+    if missing:
+        rows = await session.execute(
+            select(OrderItem.food_id, OrderItem.name_snapshot)
+            .where(OrderItem.food_id.in_(missing))
+            .order_by(OrderItem.food_id, OrderItem.order_id.desc())
+            .ext(distinct_on(OrderItem.food_id))
         )
-    )
-    active_count = active_r.scalar() or 0
-
-    top_foods_r = await session.execute(
-        select(OrderItem.name_snapshot, func.sum(OrderItem.qty).label("total_qty"))
-        .join(Order, Order.id == OrderItem.order_id)
-        .where(Order.created_at >= since)
-        .group_by(OrderItem.name_snapshot)
-        .order_by(func.sum(OrderItem.qty).desc())
-        .limit(5)
-    )
-    top_foods = [{"name": row[0], "qty": row[1]} for row in top_foods_r]
+        names.update(rows.tuples())
+    return {fid: names.get(fid, f"#{fid}") for fid in food_ids}
 
+
+async def _load_stats(session: AsyncSession, start: date, end: date) -> dict:
+    row = (await session.execute(_stats_query(start, end))).one()
+    names = await food_names(session, [t["food_id"] for t in row.top_foods])
     return {
-        "orders_count": orders_count,
-        "delivered_count": delivered_count,
-        "revenue": revenue,
-        "active_count": active_count,
-        "top_foods": top_foods,
-        "period": period,
+        "orders_count": int(row.orders_count),
+        "delivered_count": int(row.delivered_count),
+        "revenue": float(row.revenue),
+        "canceled_count": int(row.canceled_count),
+        "active_count": row.active_count,
+        "top_foods": [
+            {"food_id": t["food_id"], "name": names[t["food_id"]], "qty": int(t["qty"])}
+            for t in row.top_foods
+        ],
     }
+
+
+async def _load_food_ranking(session: AsyncSession, start: date, end: date) -> dict:
+    rows = (await session.execute(_foods_query(start, end))).all()
+    names = await food_names(session, [r.food_id for r in rows])
+    total_qty = sum(int(r.qty) for r in rows)
+    total_revenue = sum(float(r.revenue) for r in rows)
+    return {
+        "total_qty": total_qty,
+        "total_revenue": total_revenue,
+        "foods": [
+            {
+                "rank": i,
+                "food_id": r.food_id,
+                "name": names[r.food_id],
+                "qty": int(r.qty),
+                "revenue": float(r.revenue),
+                "revenue_share": round(float(r.revenue) / total_revenue * 100, 2) if total_revenue else 0.0,
+            }
+            for i, r in enumerate(rows, 1)
+        ],
+    }
+
+
+async def _load(key: tuple, load: Callable[[AsyncSession, date, date], Awaitable[dict]]) -> dict:
+    generation = _generation
+    try:
+        async with AsyncSessionFactory() as session:
+            data = await load(session, *key[1:])
+    finally:
+        _inflight.pop(key, None)
+    # Yuklash paytida status o'zgargan bo'lsa — eski natijani keshlamaymiz
+    if generation == _generation:
+        _cache[key] = (time.monotonic() + STATS_TTL, data)
+    return data
+
+
+def _retrieve(task: asyncio.Task):
+    # Barcha kutuvchilar bekor qilingan bo'lsa ham "never retrieved" ogohlantirishi chiqmasin
+    if not task.cancelled():
+        task.exception()
+
+
+async def _cached(key: tuple, load: Callable[[AsyncSession, date, date], Awaitable[dict]]) -> dict:
+    hit = _cache.get(key)
+    if hit and hit[0] > time.monotonic():
+        return hit[1]
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_load(key, load))
+        task.add_done_callback(_retrieve)
+        _inflight[key] = task
+    # shield: kutuvchi bekor qilinsa yuklash davom etadi, qolganlar natijani oladi
+    return await asyncio.shield(task)
+
+
+async def get_stats(
+    period: str = "today",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> dict:
+    period, start, end = resolve_range(period, date_from, date_to)
+    data = await _cached(("summary", start, end), _load_stats)
+    return {**data, "period": period, "from": start.isoformat(), "to": end.isoformat()}
+
+
+async def get_food_ranking(
+    period: str = "today",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> dict:
+    """Oraliqdagi barcha taomlar: qty bo'yicha tartib, tushumdagi ulushi (%) bilan."""
+    period, start, end = resolve_range(period, date_from, date_to)
+    data = await _cached(("foods", start, end), _load_food_ranking)
+    return {**data, "period": period, "from": start.isoformat(), "to": end.isoformat()}
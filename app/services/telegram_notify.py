@@ -2,6 +2,7 @@ from aiogram import Bot
 from app.models.order import Order, OrderStatus, STATUS_LABELS
 from app.models.courier import Courier
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from app.services.telegram_sender import send_priority, PRIORITY_CHANNEL, PRIORITY_COURIER, PRIORITY_CUSTOMER
 import logging
 from datetime import timedelta
 
@@ -64,12 +65,13 @@ async def send_order_to_channel(bot: Bot, channel_id: int, order: Order) -> int
     if not channel_id:
         return None
     try:
-        msg = await bot.send_message(
-            chat_id=channel_id,
-            text=format_admin_channel_message(order),
-            reply_markup=get_admin_channel_keyboard(order),
-            parse_mode="HTML",
-        )
+        with send_priority(PRIORITY_CHANNEL):
+            msg = await bot.send_message(
+                chat_id=channel_id,
+                text=format_admin_channel_message(order),
+                reply_markup=get_admin_channel_keyboard(order),
+                parse_mode="HTML",
+            )
         return msg.message_id
     except Exception as e:
         logger.error(f"Failed to send to channel: {e}")
@@ -87,24 +89,30 @@ async def send_order_to_channel(bot: Bot, channel_id: int, order: Order) -> int
         return None
 
 
-async def update_channel_message(bot: Bot, channel_id: int, message_id: int, order: Order, closed: bool = False):
+async def update_channel_message(bot: Bot, channel_id: int, message_id: int, order: Order, closed: bool = False) -> bool:
     if not channel_id or not message_id:
-        return
+        return False
     try:
         keyboard = get_closed_order_keyboard() if closed else get_admin_channel_keyboard(order)
-        await bot.edit_message_text(
-            chat_id=channel_id,
-            message_id=message_id,
-            text=format_admin_channel_message(order),
-            reply_markup=keyboard,
-            parse_mode="HTML",
-        )
+        with send_priority(PRIORITY_CHANNEL):
+            await bot.edit_message_text(
+                chat_id=channel_id,
+                message_id=message_id,
+                text=format_admin_channel_message(order),
+                reply_markup=keyboard,
+                parse_mode="HTML",
+            )
+        return True
     except Exception as e:
+        if "message is not modified" in str(e).lower():
+            return True
         logger.error(f"Failed to update channel message: {e}")
+        return False
 
 
-async def notify_user_status(bot: Bot, user_tg_id: int, order: Order):
-    status = order.status
+async def notify_user_status(bot: Bot, user_tg_id: int, order: Order, status: OrderStatus | None = None) -> bool:
+    # status — outbox da navbatga qo'yilgan paytdagi holat (order.status keyin o'zgargan bo'lishi mumkin)
+    status = status or order.status
     status_label = STATUS_LABELS.get(status, status)
     try:
         if status == OrderStatus.NEW:
@@ -122,9 +130,12 @@ async def notify_user_status(bot: Bot, user_tg_id: int, order: Order):
             text = f"❌ Buyurtmangiz #{order.order_number} bekor qilindi."
         else:
             text = f"📦 Buyurtma #{order.order_number}: status «{status_label}» ga o'zgardi"
-        await bot.send_message(chat_id=user_tg_id, text=text)
+        with send_priority(PRIORITY_CUSTOMER):
+            await bot.send_message(chat_id=user_tg_id, text=text)
+        return True
     except Exception as e:
         logger.error(f"Failed to notify user {user_tg_id}: {e}")
+        return False
 
 
 async def notify_courier(bot: Bot, courier: Courier, order: Order) -> bool:
@@ -157,21 +168,23 @@ async def notify_courier(bot: Bot, courier: Courier, order: Order) -> bool:
     ])
 
     try:
-        await bot.send_message(
-            chat_id=target,
-            text=text,
-            reply_markup=keyboard,
-        )
+        with send_priority(PRIORITY_COURIER):
+            await bot.send_message(
+                chat_id=target,
+                text=text,
+                reply_markup=keyboard,
+            )
         return True
     except Exception as e:
         logger.error(f"Failed to notify courier channel {target}: {e}")
         if courier.channel_id and courier.chat_id != target:
             try:
-                await bot.send_message(
-                    chat_id=courier.chat_id,
-                    text=text,
-                    reply_markup=keyboard,
-                )
+                with send_priority(PRIORITY_COURIER):
+                    await bot.send_message(
+                        chat_id=courier.chat_id,
+                        text=text,
+                        reply_markup=keyboard,
+                    )
                 return True
             except Exception as e2:
                 logger.error(f"Failed to notify courier direct {courier.chat_id}: {e2}")
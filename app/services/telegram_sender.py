@@ -0,0 +1,173 @@
+"""
+Telegram ga yuborishlarni markaziy rejalashtirish (rate limit + ustuvorlik).
+
+Bot API limitlari (https://core.telegram.org/bots/faq#broadcasting-to-users):
+  * jami ~30 xabar/soniya;
+  * bitta shaxsiy chatga ~1 xabar/soniya;
+  * bitta guruh/kanalga ~20 xabar/daqiqa.
+
+``RateLimitMiddleware`` yagona botning sessiyasiga ulanadi (app/bot.py), shuning
+uchun ``send*`` / ``edit*`` / ``copy*`` / ``forward*`` so'rovlari qayerdan
+chaqirilmasin shu yerdan o'tadi. Avval chat bucket (navbat chat ichida
+tartibli), keyin global bucket — global token bo'shaganda ustuvorligi
+yuqori (raqami kichik) so'rov birinchi oladi. 429 kelsa ``retry_after``
+kutiladi (shu chat to'xtatiladi) va so'rov qayta yuboriladi.
+
+Ustuvorlik ``send_priority`` bilan beriladi::
+
+    with send_priority(PRIORITY_COURIER):
+        await bot.send_message(...)
+"""
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from typing import Optional, Union
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_COURIER = 0
+PRIORITY_CHANNEL = 1
+PRIORITY_DEFAULT = 2   # handlerlardagi javoblar va boshqalar
+PRIORITY_CUSTOMER = 3  # mijozga status xabarlari
+
+GLOBAL_RATE = 30.0           # xabar/soniya
+PRIVATE_CHAT_RATE = 1.0      # xabar/soniya bitta chatga
+GROUP_CHAT_RATE = 20 / 60.0  # xabar/soniya bitta guruh/kanalga
+GROUP_BURST = 3
+MAX_RETRIES = 3
+MAX_RETRY_AFTER = 60         # bundan uzoq kutish kerak bo'lsa — xato qaytadi
+MAX_CHAT_BUCKETS = 10_000
+
+LIMITED_PREFIXES = ("send", "edit", "copy", "forward")
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("send_priority", default=PRIORITY_DEFAULT)
+
+
+@contextlib.contextmanager
+def send_priority(priority: int):
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Band qilinadigan token bucket: ``reserve`` tokenni darhol oladi va kutish vaqtini qaytaradi."""
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def pause(self, now: float, seconds: float):
+        """Keyingi token kamida ``seconds`` dan keyin chiqsin (retry_after)."""
+        self._refill(now)
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+    def is_idle(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class SendScheduler:
+    def __init__(self, global_rate: float = GLOBAL_RATE):
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: dict[Union[int, str], TokenBucket] = {}
+        self._waiters: list = []  # heap: (priority, seq, future)
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                now = time.monotonic()
+                for key in [k for k, b in self._chats.items() if b.is_idle(now)]:
+                    del self._chats[key]
+            # Musbat id — shaxsiy chat; manfiy yoki @username — guruh/kanal
+            private = isinstance(chat_id, int) and chat_id > 0
+            bucket = (
+                TokenBucket(PRIVATE_CHAT_RATE, 1) if private
+                else TokenBucket(GROUP_CHAT_RATE, GROUP_BURST)
+            )
+            self._chats[chat_id] = bucket
+        return bucket
+
+    async def acquire(self, chat_id: Optional[Union[int, str]], priority: int):
+        if chat_id is not None:
+            delay = self._chat_bucket(chat_id).reserve(time.monotonic())
+            if delay:
+                await asyncio.sleep(delay)
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await fut
+
+    async def _dispatch(self):
+        # Global tokenlar ustuvorlik tartibida beriladi; kutish paytida kelgan
+        # yuqori ustuvorlikdagi so'rov navbatni oldinlab ketadi.
+        while self._waiters:
+            delay = self._global.reserve(time.monotonic())
+            if delay:
+                await asyncio.sleep(delay)
+            while self._waiters:
+                _, _, fut = heapq.heappop(self._waiters)
+                if not fut.done():
+                    fut.set_result(None)
+                    break
+
+    def retry_after(self, chat_id: Optional[Union[int, str]], seconds: float):
+        now = time.monotonic()
+        if chat_id is not None:
+            self._chat_bucket(chat_id).pause(now, seconds)
+        else:
+            self._global.pause(now, seconds)
+
+    def stats(self) -> dict:
+        return {"waiting": len(self._waiters), "chats": len(self._chats)}
+
+
+scheduler = SendScheduler()
+
+
+class RateLimitMiddleware(BaseRequestMiddleware):
+    def __init__(self, sched: SendScheduler = scheduler):
+        self.scheduler = sched
+
+    async def __call__(self, make_request, bot, method):
+        if not method.__api_method__.startswith(LIMITED_PREFIXES):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        priority = _priority.get()
+        for attempt in range(MAX_RETRIES + 1):
+            await self.scheduler.acquire(chat_id, priority)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == MAX_RETRIES or e.retry_after > MAX_RETRY_AFTER:
+                    raise
+                logger.warning(
+                    f"Telegram 429 on {method.__api_method__} (chat {chat_id}), retry in {e.retry_after}s"
+                )
+                self.scheduler.retry_after(chat_id, e.retry_after)
@@ -0,0 +1,124 @@
+"""
+Yuklangan rasmlar ombori — fayl nomi = kontent hash (sha256).
+
+Fayl bo'laklab o'qiladi va diskka ``asyncio.to_thread`` orqali yoziladi —
+katta rasm event loop ni (webhook, API) to'xtatib qo'ymaydi. Hajm
+``MAX_UPLOAD_BYTES`` dan oshsa yuklash to'xtatiladi. Bir xil rasm ikki marta
+yuklansa bitta fayl saqlanadi.
+
+``collect_garbage()`` hech qaysi ``Food.image_url`` ga bog'lanmagan
+fayllarni (va ularning variantlarini) o'chiradi.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+import uuid
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.food import Food
+from app.services.images import UPLOAD_DIR, VARIANT_DIR, set_id_from_url
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+TMP_PREFIX = ".tmp-"
+# Rasm yuklanadi, taom esa keyinroq saqlanadi — yangi fayllarga tegmaymiz
+GC_GRACE_SECONDS = 3600
+
+_WIDTH_SUFFIX = re.compile(r"_\d+$")
+
+EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp", "image/gif": "gif"}
+
+
+async def save_upload(file: UploadFile) -> tuple[str, str]:
+    """Faylni saqlaydi; ``(set_id, fayl nomi)`` qaytaradi. set_id — hash."""
+    ext = EXTENSIONS[file.content_type]
+    tmp_path = os.path.join(UPLOAD_DIR, f"{TMP_PREFIX}{uuid.uuid4().hex}")
+    digest = hashlib.sha256()
+    size = 0
+    f = await asyncio.to_thread(open, tmp_path, "wb")
+    try:
+        while chunk := await file.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > settings.MAX_UPLOAD_BYTES:
+                raise HTTPException(413, f"Fayl juda katta (max {settings.MAX_UPLOAD_BYTES // (1024 * 1024)} MB)")
+            digest.update(chunk)
+            await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        await asyncio.to_thread(f.close)
+        await asyncio.to_thread(_remove, tmp_path)
+        raise
+    await asyncio.to_thread(f.close)
+
+    set_id = digest.hexdigest()[:32]
+    name = f"{set_id}.{ext}"
+    path = os.path.join(UPLOAD_DIR, name)
+    if await asyncio.to_thread(os.path.exists, path):
+        await asyncio.to_thread(_remove, tmp_path)
+        # GC grace oynasi qaytadan boshlansin
+        await asyncio.to_thread(os.utime, path)
+    else:
+        await asyncio.to_thread(os.replace, tmp_path, path)
+    return set_id, name
+
+
+def _remove(path: str) -> int:
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+        return size
+    except FileNotFoundError:
+        return 0
+
+
+def _stale_files(referenced: set[str], now: float) -> list[tuple[str, int]]:
+    stale = []
+    for d in (UPLOAD_DIR, VARIANT_DIR):
+        if not os.path.isdir(d):
+            continue
+        for name in os.listdir(d):
+            path = os.path.join(d, name)
+            if not os.path.isfile(path):
+                continue
+            st = os.stat(path)
+            if now - st.st_mtime < GC_GRACE_SECONDS:
+                continue
+            if name.startswith(TMP_PREFIX):
+                stale.append((path, st.st_size))
+                continue
+            # Variantlar: <set_id>_<w>.webp / <set_id>.json
+            set_id, _, ext = name.rpartition(".")
+            if d == VARIANT_DIR and ext != "json":
+                set_id = _WIDTH_SUFFIX.sub("", set_id)
+            if set_id not in referenced:
+                stale.append((path, st.st_size))
+    return stale
+
+
+async def collect_garbage(session: AsyncSession, dry_run: bool = True) -> dict:
+    """Hech bir taomga bog'lanmagan yuklamalarni o'chirish."""
+    rows = (await session.execute(select(Food.image_url, Food.image_variants))).all()
+    referenced: set[Optional[str]] = set()
+    for image_url, variants in rows:
+        referenced.add(set_id_from_url(image_url))
+        if variants and variants.get("src"):
+            referenced.add(variants["src"].rsplit("/", 1)[-1])
+    referenced.discard(None)
+
+    stale = await asyncio.to_thread(_stale_files, referenced, time.time())
+    if dry_run:
+        freed = sum(size for _, size in stale)
+    else:
+        freed = 0
+        for path, _ in stale:
+            freed += await asyncio.to_thread(_remove, path)
+        logger.info(f"Uploads GC: removed {len(stale)} files, {freed} bytes")
+    return {"dry_run": dry_run, "files": sorted(os.path.relpath(p, UPLOAD_DIR) for p, _ in stale), "bytes": freed}
@@ -0,0 +1,143 @@
+"""
+Web-app statik fayllari — xotiradan, oldindan siqilgan holda.
+
+Ishga tushishda ``web_app/`` dagi CSS/JS fayllar kontent hash bilan nomlanadi
+(``style.3f2a9c1b7d.css``), HTML sahifalardagi havolalar shu nomlarga
+almashtiriladi va hammasi gzip (``brotli`` o'rnatilgan bo'lsa br ham) bilan
+bir marta siqiladi. Hashli fayllar ``/static/`` ostida
+``Cache-Control: immutable`` bilan beriladi — fayl o'zgarsa nomi ham o'zgaradi.
+Sahifalar (``/``, ``/admin``) ETag + ``no-cache`` bilan: qayta ochishda 304.
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from typing import Optional
+
+from fastapi import Request, Response
+from fastapi.staticfiles import StaticFiles
+
+from app.http_cache import etag_matches
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ASSET_DIR = "web_app"
+STATIC_PREFIX = "/static"
+HASHED_ASSETS = ("style.css", "script.js")
+PAGES = ("index.html", "admin.html")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Faqat asl yuklangan fayllar (``<sha256[:32]>.<ext>``) o'zgarmaydi; ``v/`` dagi
+# variantlar va manifest ``images --backfill --force`` da shu nom bilan qayta yoziladi
+_HASHED_UPLOAD = re.compile(r"[0-9a-f]{32}\.(?:jpg|jpeg|png|webp|gif)")
+
+
+class Asset:
+    __slots__ = ("body", "gzip", "br", "etag", "media_type", "cache_control")
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str):
+        self.body = body
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        gz = gzip.compress(body, compresslevel=9, mtime=0)
+        self.gzip = gz if len(gz) < len(body) else None
+        br = brotli.compress(body, quality=11) if brotli is not None else None
+        self.br = br if br is not None and len(br) < len(body) else None
+
+
+# url yo'li -> Asset ("/static/style.<hash>.css", "index.html")
+_assets: dict[str, Asset] = {}
+_pages: dict[str, Asset] = {}
+
+
+def _media_type(name: str) -> str:
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return f"{media_type}; charset=utf-8" if media_type.startswith("text/") or name.endswith(".js") else media_type
+
+
+def build(asset_dir: str = ASSET_DIR) -> None:
+    """Fayllarni o'qib, hash lab, siqib xotiraga joylaydi (startup da bir marta)."""
+    assets: dict[str, Asset] = {}
+    renames: dict[str, str] = {}
+    for name in HASHED_ASSETS:
+        path = os.path.join(asset_dir, name)
+        if not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            body = f.read()
+        stem, ext = os.path.splitext(name)
+        url = f"{STATIC_PREFIX}/{stem}.{hashlib.sha256(body).hexdigest()[:10]}{ext}"
+        assets[url] = Asset(body, _media_type(name), IMMUTABLE)
+        renames[name] = url
+
+    pages: dict[str, Asset] = {}
+    for name in PAGES:
+        path = os.path.join(asset_dir, name)
+        if not os.path.isfile(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        for old, url in renames.items():
+            html = re.sub(rf'((?:src|href)=["\'])(?:\./)?{re.escape(old)}(["\'])', rf"\g<1>{url}\g<2>", html)
+        pages[name] = Asset(html.encode("utf-8"), "text/html; charset=utf-8", "no-cache")
+
+    _assets.clear()
+    _assets.update(assets)
+    _pages.clear()
+    _pages.update(pages)
+    logger.info(f"Static assets built: {', '.join(renames.values()) or '-'}; pages: {', '.join(pages) or '-'}")
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        if token.strip().lower() == coding:
+            q = params.strip()
+            return not (q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"))
+    return False
+
+
+def asset_response(request: Request, asset: Asset) -> Response:
+    headers = {"ETag": asset.etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), asset.etag):
+        return Response(status_code=304, headers=headers)
+    accept = request.headers.get("accept-encoding", "")
+    body = asset.body
+    if asset.br is not None and _accepts(accept, "br"):
+        body = asset.br
+        headers["Content-Encoding"] = "br"
+    elif asset.gzip is not None and _accepts(accept, "gzip"):
+        body = asset.gzip
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type=asset.media_type, headers=headers)
+
+
+def get_page(name: str) -> Optional[Asset]:
+    return _pages.get(name)
+
+
+async def serve_static(request: Request, path: str):
+    asset = _assets.get(f"{STATIC_PREFIX}/{path}")
+    if asset is None:
+        return Response(status_code=404)
+    return asset_response(request, asset)
+
+
+class UploadFiles(StaticFiles):
+    """/uploads — kontent hash bilan nomlangan asl fayllar o'zgarmaydi, qolganlari revalidatsiya bilan."""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if _HASHED_UPLOAD.fullmatch(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = IMMUTABLE
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
@@ -0,0 +1,15 @@
+"""
+Mahalliy vaqt (Toshkent, UTC+5) — ish vaqti, kunlik yig'indilar, statistika
+va xabarlardagi vaqt shu yerdan olinadi.
+"""
+from datetime import date, datetime, timedelta, timezone
+
+LOCAL_TZ = timezone(timedelta(hours=5))
+
+
+def local_day(moment: datetime) -> date:
+    return moment.astimezone(LOCAL_TZ).date()
+
+
+def local_today() -> date:
+    return local_day(datetime.now(LOCAL_TZ))
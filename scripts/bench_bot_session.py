@@ -0,0 +1,138 @@
+"""
+Bot API chaqiruvi narxi: har so'rovda yangi ``Bot()`` vs yagona pooled bot.
+
+    python -m scripts.bench_bot_session
+    python -m scripts.bench_bot_session -n 200 --no-tls
+
+Lokal soxta Bot API server (aiohttp) ko'tariladi — ``openssl`` bo'lsa
+self-signed sertifikat bilan HTTPS, aks holda HTTP. Internet kerak emas.
+
+Uch holat, har biri ``sendMessage``:
+  * per-call Bot   — eski kod: ``Bot(token=...)`` + so'rov + ``session.close()``
+                     (aiogram close 250 ms kutadi — u ham so'rov yo'lida edi);
+  * per-call, no close wait — faqat yangi ulanish (TCP + TLS) narxi;
+  * shared bot     — ``app.bot.PooledSession``, keep-alive ulanish.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import ssl
+import statistics
+import subprocess
+import tempfile
+import time
+
+os.environ.setdefault("BOT_TOKEN", "123456:bench-token")
+os.environ.setdefault("DB_URL", "postgresql+asyncpg://bench@localhost/bench")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+
+from aiogram import Bot
+from aiohttp import web
+
+from app.bot import PooledSession
+from app.config import settings
+
+CHAT_ID = -1001234567890
+
+
+async def _send_message(request: web.Request) -> web.Response:
+    await request.post()
+    return web.json_response({
+        "ok": True,
+        "result": {"message_id": 1, "date": int(time.time()), "chat": {"id": CHAT_ID, "type": "channel"}},
+    })
+
+
+def _self_signed(tmp: str) -> tuple[str, str] | None:
+    if not shutil.which("openssl"):
+        return None
+    cert, key = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+async def _start_server(tls: bool, tmp: str):
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", _send_message)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+
+    server_ctx = client_ctx = None
+    pair = _self_signed(tmp) if tls else None
+    if pair:
+        server_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_ctx.load_cert_chain(*pair)
+        client_ctx = ssl.create_default_context(cafile=pair[0])
+    site = web.TCPSite(runner, "127.0.0.1", 0, ssl_context=server_ctx)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    scheme = "https" if pair else "http"
+    return runner, f"{scheme}://127.0.0.1:{port}", client_ctx
+
+
+def _new_bot(api_url: str, ctx) -> Bot:
+    return Bot(token=settings.BOT_TOKEN, session=PooledSession(api_url=api_url, ssl=ctx))
+
+
+async def per_call(api_url: str, ctx, close_wait: bool) -> float:
+    t0 = time.perf_counter()
+    bot = _new_bot(api_url, ctx)
+    try:
+        await bot.send_message(CHAT_ID, "bench")
+    finally:
+        if close_wait:
+            await bot.session.close()
+        else:
+            await bot.session._session.close()
+    return time.perf_counter() - t0
+
+
+async def shared_call(bot: Bot) -> float:
+    t0 = time.perf_counter()
+    await bot.send_message(CHAT_ID, "bench")
+    return time.perf_counter() - t0
+
+
+def _report(label: str, samples: list[float], base: float | None = None) -> float:
+    ms = sorted(s * 1000 for s in samples)
+    p50 = statistics.median(ms)
+    p95 = ms[int(len(ms) * 0.95) - 1]
+    ratio = f"  (x{base / p50:.1f})" if base else ""
+    print(f"  {label:<26} p50 {p50:8.2f} ms   p95 {p95:8.2f} ms{ratio}")
+    return p50
+
+
+async def main(n: int, tls: bool):
+    with tempfile.TemporaryDirectory() as tmp:
+        runner, api_url, ctx = await _start_server(tls, tmp)
+        try:
+            print(f"fake Bot API: {api_url}, {n} sequential sendMessage calls each")
+            # per-call close() 250 ms uxlaydi — shuning uchun kamroq takrorlanadi
+            slow = [await per_call(api_url, ctx, close_wait=True) for _ in range(max(5, n // 20))]
+            fresh = [await per_call(api_url, ctx, close_wait=False) for _ in range(n)]
+            bot = _new_bot(api_url, ctx)
+            try:
+                await shared_call(bot)  # birinchi ulanish
+                shared = [await shared_call(bot) for _ in range(n)]
+            finally:
+                await bot.session.close()
+        finally:
+            await runner.cleanup()
+
+    base = _report("per-call Bot + close()", slow)
+    _report("per-call, no close wait", fresh, base)
+    _report("shared pooled bot", shared, base)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--number", type=int, default=200)
+    parser.add_argument("--no-tls", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.number, not args.no_tls))
@@ -0,0 +1,99 @@
+"""
+JSON javoblarini kodlash bo'yicha mikrobenchmark (DB kerak emas).
+
+    python -m scripts.bench_json
+    python -m scripts.bench_json --orders 500 --foods 300 -n 200
+
+Ikki holat o'lchanadi:
+  * admin_orders — ``--orders`` ta buyurtma (har birida 3 ta item);
+  * to'liq menyu — ``--foods`` ta taom (MenuSnapshot bilan bir xil dict lar).
+
+Har biri uchun: FastAPI standart yo'li (jsonable_encoder + JSONResponse),
+jsonable_encoder + FastJSONResponse, va to'g'ridan-to'g'ri FastJSONResponse.
+Oxirida javob hajmi: siqilmagan / gzip (GZipMiddleware bilan bir xil daraja).
+"""
+import argparse
+import gzip
+import os
+import timeit
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+os.environ.setdefault("BOT_TOKEN", "0:bench")
+os.environ.setdefault("DB_URL", "postgresql+asyncpg://bench@localhost/bench")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.admin_api import _ser_order
+from app.models.order import OrderStatus
+from app.responses import FastJSONResponse
+from app.services.menu_cache import FOOD_FIELDS
+
+
+def fake_orders(n: int) -> list:
+    now = datetime.now(timezone.utc)
+    statuses = list(OrderStatus)
+    orders = []
+    for i in range(n):
+        items = [
+            SimpleNamespace(id=i * 3 + k, name_snapshot=f"Lavash tandir {k}", qty=k + 1,
+                            price_snapshot=28000.0, line_total=28000.0 * (k + 1))
+            for k in range(3)
+        ]
+        orders.append(SimpleNamespace(
+            id=i, order_number=f"{100000 + i}", customer_name="Aziz Karimov", phone="+998901234567",
+            comment="Eshik oldida qo'ng'iroq qiling" if i % 3 == 0 else None,
+            total=sum(it.line_total for it in items), status=statuses[i % len(statuses)],
+            promo_code=None, created_at=now - timedelta(minutes=i),
+            delivered_at=now if i % 2 else None,
+            courier=SimpleNamespace(id=1, name="Jasur") if i % 2 else None, items=items,
+        ))
+    return orders
+
+
+def fake_menu(n: int) -> list[dict]:
+    foods = []
+    for i in range(n):
+        row = {
+            "id": i, "name": f"Pizza Pepperoni {i}", "description": "Pishloq, pepperoni, pomidor sousi " * 2,
+            "price": 65000.0 + i, "rating": 4.8, "is_new": i % 5 == 0,
+            "image_url": f"https://example.com/uploads/{i:032x}.png",
+            "image_variants": {"src": f"https://example.com/uploads/v/{i:032x}", "w": [160, 320, 640]},
+            "category_id": i % 8 + 1,
+        }
+        foods.append({k: row[k] for k in FOOD_FIELDS})
+    return foods
+
+
+def bench(name: str, data, number: int):
+    variants = {
+        "jsonable_encoder + JSONResponse": lambda: JSONResponse(jsonable_encoder(data)).body,
+        "jsonable_encoder + FastJSONResponse": lambda: FastJSONResponse(jsonable_encoder(data)).body,
+        "FastJSONResponse (direct)": lambda: FastJSONResponse(data).body,
+    }
+    print(f"\n-- {name}")
+    base = None
+    for label, fn in variants.items():
+        per_call = min(timeit.repeat(fn, number=number, repeat=3)) / number * 1000
+        base = base or per_call
+        print(f"  {label:<38} {per_call:8.3f} ms/req  (x{base / per_call:.1f})")
+    body = FastJSONResponse(data).body
+    print(f"  size: {len(body) / 1024:.1f} KB raw, {len(gzip.compress(body, compresslevel=6)) / 1024:.1f} KB gzip")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--foods", type=int, default=300)
+    parser.add_argument("-n", "--number", type=int, default=50)
+    args = parser.parse_args()
+
+    orders = [_ser_order(o) for o in fake_orders(args.orders)]
+    bench(f"admin_orders ({args.orders} orders)", orders, args.number)
+    bench(f"full menu ({args.foods} foods)", fake_menu(args.foods), args.number)
+
+
+if __name__ == "__main__":
+    main()
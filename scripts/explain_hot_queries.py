@@ -0,0 +1,122 @@
+"""
+Eng ko'p ishlatiladigan so'rovlarning EXPLAIN rejalarini chiqarish.
+
+    python -m scripts.explain_hot_queries            # joriy sxema bo'yicha
+    python -m scripts.explain_hot_queries --compare  # indekslar bilan va ularsiz
+    python -m scripts.explain_hot_queries --analyze  # EXPLAIN ANALYZE
+
+``--compare`` rejimida 0002_query_indexes indekslari bitta tranzaksiya ichida
+vaqtincha DROP qilinadi va oxirida ROLLBACK bo'ladi. DROP INDEX jadvalni
+qulflaydi — faqat lokal / staging bazada ishlating.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.db.session import engine
+
+ACTIVE = "('NEW', 'CONFIRMED', 'COOKING', 'COURIER_ASSIGNED', 'OUT_FOR_DELIVERY')"
+
+HOT_QUERIES = {
+    "stats: daily sales range": (
+        "SELECT sum(orders_count), sum(delivered_count), sum(revenue) FROM daily_sales "
+        "WHERE day BETWEEN :day_from AND :day_to"
+    ),
+    "stats: active count": (
+        f"SELECT count(*) FROM orders WHERE status IN {ACTIVE}"
+    ),
+    "stats: top foods": (
+        "SELECT food_id, sum(qty) FROM daily_food_sales "
+        "WHERE day BETWEEN :day_from AND :day_to "
+        "GROUP BY food_id ORDER BY sum(qty) DESC LIMIT 5"
+    ),
+    "stats: food names fallback": (
+        "SELECT DISTINCT ON (food_id) food_id, name_snapshot FROM order_items "
+        "WHERE food_id IN (:o1, :o2, :o3) ORDER BY food_id, order_id DESC"
+    ),
+    "admin: active orders": (
+        f"SELECT * FROM orders WHERE status IN {ACTIVE} "
+        "ORDER BY created_at DESC LIMIT 100"
+    ),
+    "checkout: duplicate check": (
+        "SELECT id FROM orders WHERE user_id = :user_id AND created_at >= :cutoff "
+        "ORDER BY created_at DESC LIMIT 1"
+    ),
+    "bot: assign_cancel": (
+        "SELECT id FROM orders WHERE channel_message_id = :message_id"
+    ),
+    "orders: items selectinload": (
+        "SELECT * FROM order_items WHERE order_id IN (:o1, :o2, :o3)"
+    ),
+    "menu: active foods by category": (
+        "SELECT * FROM foods WHERE is_active = true AND category_id = :category_id"
+    ),
+}
+
+NEW_INDEXES = [
+    "ix_orders_created_at",
+    "ix_orders_status",
+    "ix_orders_user_id_created_at",
+    "ix_orders_delivered_at",
+    "ix_orders_active",
+    "ix_orders_channel_message_id",
+    "ix_order_items_order_id",
+    "ix_foods_is_active_category_id",
+]
+
+
+def _params() -> dict:
+    now = datetime.now(timezone.utc)
+    return {
+        "day_from": (now - timedelta(days=29)).date(),
+        "day_to": now.date(),
+        "cutoff": now - timedelta(seconds=60),
+        "user_id": 1,
+        "message_id": 1,
+        "o1": 1, "o2": 2, "o3": 3,
+        "category_id": 1,
+    }
+
+
+async def _explain_all(conn, analyze: bool) -> dict[str, str]:
+    prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+    params = _params()
+    plans = {}
+    for name, sql in HOT_QUERIES.items():
+        rows = (await conn.execute(text(prefix + sql), params)).all()
+        plans[name] = "\n".join(r[0] for r in rows)
+    return plans
+
+
+def _print(title: str, plans: dict[str, str]):
+    print(f"\n{'=' * 20} {title} {'=' * 20}")
+    for name, plan in plans.items():
+        print(f"\n-- {name}\n{plan}")
+
+
+async def main(compare: bool, analyze: bool):
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            after = await _explain_all(conn, analyze)
+            if compare:
+                for name in NEW_INDEXES:
+                    await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+                before = await _explain_all(conn, analyze)
+                _print("BEFORE (without 0002 indexes)", before)
+                _print("AFTER (with 0002 indexes)", after)
+            else:
+                _print("current schema", after)
+        finally:
+            await trans.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--compare", action="store_true", help="indekslarsiz rejalarni ham ko'rsatish")
+    parser.add_argument("--analyze", action="store_true", help="EXPLAIN ANALYZE (so'rovlar haqiqatan bajariladi)")
+    args = parser.parse_args()
+    asyncio.run(main(args.compare, args.analyze))
@@ -0,0 +1,301 @@
+"""
+Checkout va menyu trafigi uchun lokal yuklama testi.
+
+    # Ilova + soxta Bot API ni o'zi ishga tushiradi (DB_URL — lokal Postgres, REDIS_URL)
+    python -m scripts.loadtest --spawn-app --sessions 50 --duration 60
+
+    # Allaqachon ishlayotgan ilovaga (TELEGRAM_API_URL soxta Bot API ga qaratilgan bo'lsin)
+    python -m scripts.loadtest --base-url http://127.0.0.1:8000 --fake-bot-port 8081
+
+Har bir sessiya mini-app ni taqlid qiladi: ``/api/bootstrap`` → ``/api/foods``
+→ ``/api/promo/validate`` → ``POST /api/orders`` (guest, o'z telefoni bilan,
+``Idempotency-Key``) → admin status o'tishlari (CONFIRMED → COOKING →
+DELIVERED). Soxta Bot API (aiohttp) webhook, kanal va mijoz xabarlarini
+qabul qiladi; ``--bot-latency`` Telegram RTT ni taqlid qiladi.
+
+Natija: har bir route uchun so'rovlar, xatolar, rps, p50/p95/p99. Byudjetdan
+(``BUDGETS``, ``--budget order.p95=300``) yoki ``--max-error-rate`` dan oshsa —
+exit 1. Test buyurtmalar bazada qoladi — faqat lokal / staging bazada.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import aiohttp
+from aiohttp import web
+
+# route -> {metrika: ms}
+BUDGETS = {
+    "bootstrap": {"p95": 150, "p99": 300},
+    "foods": {"p95": 150, "p99": 300},
+    "promo": {"p95": 150, "p99": 300},
+    "order": {"p95": 500, "p99": 1000},
+    "status": {"p95": 300, "p99": 600},
+}
+OK_STATUSES = {
+    "bootstrap": {200, 304},
+    "foods": {200, 304},
+    "promo": {200, 404},
+    "order": {200},
+    "status": {200},
+}
+STATUS_STEPS = ("CONFIRMED", "COOKING", "DELIVERED")
+ORDER_TARGET = 60000  # MIN_ORDER_TOTAL dan yuqori
+
+
+# ── Soxta Telegram Bot API ───────────────────────────────────────────────
+
+class FakeBotAPI:
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.calls: Counter = Counter()
+        self._message_ids = itertools.count(1)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        data = await request.post()
+        self.calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        chat_id = int(data.get("chat_id") or 0)
+        if method in ("sendMessage", "editMessageText"):
+            result = {
+                "message_id": int(data.get("message_id") or next(self._message_ids)),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "channel"},
+                "text": data.get("text", ""),
+            }
+        elif method == "getChat":
+            result = {"id": chat_id, "type": "channel", "title": "loadtest"}
+        elif method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "loadtest", "username": "loadtest_bot"}
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def start(self, port: int) -> web.AppRunner:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        return runner
+
+
+# ── Metrikalar ───────────────────────────────────────────────────────────
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.error_samples: dict[str, str] = {}
+
+    def record(self, route: str, seconds: float, status: int, detail: str = ""):
+        self.latencies[route].append(seconds * 1000)
+        if status not in OK_STATUSES[route]:
+            self.errors[route] += 1
+            self.error_samples.setdefault(route, f"{status} {detail[:120]}")
+
+
+def percentile(sorted_ms: list[float], p: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    rank = max(1, -(-len(sorted_ms) * p // 100))  # nearest-rank
+    return sorted_ms[int(rank) - 1]
+
+
+def report(stats: Stats, elapsed: float, budgets: dict, max_error_rate: float) -> bool:
+    ok = True
+    total = sum(len(v) for v in stats.latencies.values())
+    print(f"\n{total} requests in {elapsed:.1f}s — {total / elapsed:.1f} req/s")
+    print(f"{'route':<10} {'count':>7} {'err':>5} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8}  budget")
+    for route in OK_STATUSES:
+        ms = sorted(stats.latencies.get(route, []))
+        if not ms:
+            continue
+        values = {"p50": percentile(ms, 50), "p95": percentile(ms, 95), "p99": percentile(ms, 99)}
+        failed = [f"{m}>{limit:g}" for m, limit in budgets.get(route, {}).items() if values[m] > limit]
+        err_rate = stats.errors[route] / len(ms)
+        if err_rate > max_error_rate:
+            failed.append(f"errors {err_rate:.1%}")
+        ok &= not failed
+        print(
+            f"{route:<10} {len(ms):>7} {stats.errors[route]:>5} {len(ms) / elapsed:>7.1f} "
+            f"{values['p50']:>8.1f} {values['p95']:>8.1f} {values['p99']:>8.1f}  "
+            + ("FAIL " + ", ".join(failed) if failed else "ok")
+        )
+    for route, sample in stats.error_samples.items():
+        print(f"  {route} error sample: {sample}")
+    return ok
+
+
+# ── Sessiyalar ───────────────────────────────────────────────────────────
+
+async def timed(stats: Stats, route: str, http: aiohttp.ClientSession, method: str, url: str, **kw):
+    t0 = time.perf_counter()
+    try:
+        async with http.request(method, url, **kw) as resp:
+            body = await resp.json(content_type=None) if resp.status != 304 else None
+            stats.record(route, time.perf_counter() - t0, resp.status, "" if resp.status < 400 else str(body))
+            return resp.status, body, resp.headers
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        stats.record(route, time.perf_counter() - t0, 0, repr(e))
+        return 0, None, {}
+
+
+def build_cart(foods: list[dict], rng: random.Random) -> list[dict]:
+    cart: dict[int, int] = {}
+    total = 0.0
+    while total < ORDER_TARGET:
+        food = rng.choice(foods)
+        cart[food["id"]] = cart.get(food["id"], 0) + 1
+        total += float(food["price"])
+    return [{"food_id": fid, "qty": qty} for fid, qty in cart.items()]
+
+
+async def session_loop(n: int, args, http: aiohttp.ClientSession, stats: Stats, deadline: float):
+    rng = random.Random(n)
+    base = args.base_url
+    phone = f"+99899{n:07d}"
+    etag = None
+    foods: list[dict] = []
+    categories: list[int] = []
+    done = 0
+    while time.monotonic() < deadline and (not args.orders_per_session or done < args.orders_per_session):
+        headers = {"Accept-Encoding": "gzip"}
+        if etag and rng.random() < 0.5:
+            headers["If-None-Match"] = etag  # qayta ochilgan mini-app
+        status, boot, resp_headers = await timed(
+            stats, "bootstrap", http, "GET", f"{base}/api/bootstrap", headers=headers
+        )
+        if status == 200 and boot:
+            foods = [f for f in boot.get("foods", []) if f.get("price")]
+            categories = [c["id"] for c in boot.get("categories", [])]
+            etag = resp_headers.get("ETag")
+        if not foods:
+            await asyncio.sleep(1)
+            continue
+
+        params = {"category_id": rng.choice(categories)} if categories else {}
+        await timed(stats, "foods", http, "GET", f"{base}/api/foods", params=params)
+        await timed(stats, "promo", http, "GET", f"{base}/api/promo/validate", params={"code": args.promo})
+
+        payload = {
+            "items": build_cart(foods, rng),
+            "customer_name": f"Loadtest {n}",
+            "phone": phone,
+            "comment": "loadtest",
+            "location": {"lat": 41.31 + rng.random() / 100, "lng": 69.24 + rng.random() / 100},
+        }
+        status, body, _ = await timed(
+            stats, "order", http, "POST", f"{base}/api/orders",
+            json=payload, headers={"Idempotency-Key": uuid.uuid4().hex},
+        )
+        done += 1
+        if status == 200 and body and body.get("order_id"):
+            for step in STATUS_STEPS[:args.status_steps]:
+                await timed(
+                    stats, "status", http, "PATCH", f"{base}/api/admin/orders/{body['order_id']}/status",
+                    json={"status": step},
+                )
+        if args.think:
+            await asyncio.sleep(rng.uniform(0, 2 * args.think / 1000))
+
+
+# ── Ilovani ishga tushirish ──────────────────────────────────────────────
+
+def spawn_app(args, bot_url: str) -> subprocess.Popen:
+    env = dict(os.environ, TELEGRAM_API_URL=bot_url, WEBHOOK_URL=args.base_url)
+    env.setdefault("BOT_TOKEN", "123456:loadtest")
+    env.setdefault("SHOP_CHANNEL_ID", "-1001000000000")  # kanal xabarlari ham soxta Bot API ga
+    port = args.base_url.rsplit(":", 1)[-1].strip("/")
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", port,
+           "--workers", str(args.workers), "--log-level", "warning"]
+    return subprocess.Popen(cmd, env=env)
+
+
+async def wait_ready(base: str, proc: subprocess.Popen | None, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as http:
+        while time.monotonic() < deadline:
+            if proc is not None and proc.poll() is not None:
+                raise SystemExit(f"Ilova to'xtadi (exit {proc.returncode})")
+            try:
+                async with http.get(f"{base}/api/bootstrap") as resp:
+                    if resp.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    raise SystemExit(f"{base} {timeout:.0f}s ichida javob bermadi")
+
+
+def parse_budgets(overrides: list[str]) -> dict:
+    budgets = {route: dict(limits) for route, limits in BUDGETS.items()}
+    for item in overrides:
+        key, _, value = item.partition("=")
+        route, _, metric = key.partition(".")
+        if route not in OK_STATUSES or metric not in ("p50", "p95", "p99") or not value:
+            raise SystemExit(f"Noto'g'ri --budget: {item} (masalan: order.p95=300)")
+        budgets.setdefault(route, {})[metric] = float(value)
+    return budgets
+
+
+async def main(args) -> int:
+    budgets = parse_budgets(args.budget)
+    fake_bot = FakeBotAPI(args.bot_latency)
+    bot_runner = await fake_bot.start(args.fake_bot_port) if args.fake_bot_port else None
+    proc = spawn_app(args, f"http://127.0.0.1:{args.fake_bot_port}") if args.spawn_app else None
+    try:
+        await wait_ready(args.base_url, proc)
+        stats = Stats()
+        connector = aiohttp.TCPConnector(limit=args.sessions)
+        timeout = aiohttp.ClientTimeout(total=args.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http:
+            print(f"{args.sessions} sessions for {args.duration}s against {args.base_url}")
+            t0 = time.monotonic()
+            deadline = t0 + args.duration
+            await asyncio.gather(*(session_loop(n, args, http, stats, deadline) for n in range(args.sessions)))
+            elapsed = time.monotonic() - t0
+        ok = report(stats, elapsed, budgets, args.max_error_rate)
+        if bot_runner:
+            await asyncio.sleep(args.drain)  # outbox worker navbatni bo'shatsin
+            print("fake Bot API calls: " + (", ".join(f"{m}={c}" for m, c in fake_bot.calls.most_common()) or "-"))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if bot_runner:
+            await bot_runner.cleanup()
+    print("\nOK" if ok else "\nFAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8010")
+    parser.add_argument("--spawn-app", action="store_true", help="uvicorn app.main:app ni o'zi ishga tushirish")
+    parser.add_argument("--workers", type=int, default=1, help="--spawn-app uchun uvicorn workerlar")
+    parser.add_argument("--fake-bot-port", type=int, default=8081, help="0 — soxta Bot API ko'tarilmaydi")
+    parser.add_argument("--bot-latency", type=float, default=50, help="soxta Bot API javob kechikishi, ms")
+    parser.add_argument("--sessions", type=int, default=20, help="parallel mini-app sessiyalari")
+    parser.add_argument("--duration", type=float, default=30, help="soniya")
+    parser.add_argument("--orders-per-session", type=int, default=0, help="0 — duration tugaguncha")
+    parser.add_argument("--status-steps", type=int, default=len(STATUS_STEPS), choices=range(len(STATUS_STEPS) + 1))
+    parser.add_argument("--think", type=float, default=200, help="sessiya ichidagi o'rtacha pauza, ms")
+    parser.add_argument("--promo", default="LOADTEST")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--drain", type=float, default=3, help="oxirida outbox uchun kutish, s")
+    parser.add_argument("--budget", action="append", default=[], help="route.pXX=ms, masalan order.p95=300")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,67 @@
+"""Guest telefon raqamlari: normallashtirish, tg_id va upsert."""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.models.user import User
+from app.services.guests import guest_tg_id, normalize_phone, upsert_guest_cte
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("+998901234567", "+998901234567"),
+    ("+998 (90) 123-45-67", "+998901234567"),
+    ("998901234567", "+998901234567"),
+    ("90 123 45 67", "+998901234567"),  # mahalliy 9 xonali
+    ("901234567", "+998901234567"),
+    ("+7 (912) 345-67-89", "+79123456789"),
+    ("+1 202 555 0123", "+12025550123"),
+    ("+123456789012345", "+123456789012345"),  # 15 xona — E.164 chegarasi
+])
+def test_normalize_phone_accepts(raw, expected):
+    assert normalize_phone(raw) == expected
+
+
+@pytest.mark.parametrize("raw", [
+    None,
+    "",
+    "abc",
+    "12345678",          # eski guest id uzunligi
+    "1234567890123456",  # 16 xona
+    "0901234567",        # 0 bilan boshlanadi
+    "+0 998 901 234 567",
+    "12345",
+])
+def test_normalize_phone_rejects(raw):
+    assert normalize_phone(raw) is None
+
+
+def test_guest_tg_id():
+    assert guest_tg_id("+998901234567") == -998901234567
+    # bir xil raqam turli yozilishda — bitta guest
+    assert guest_tg_id(normalize_phone("90 123-45-67")) == guest_tg_id(normalize_phone("+998901234567"))
+    # real Telegram id lar musbat, eski tasodifiy guest id lar 8 xonali
+    assert guest_tg_id(normalize_phone("+1 202 555 0123")) < -10**9
+
+
+def test_upsert_keeps_existing_name():
+    sql = str(upsert_guest_cte("+998901234567", "Ali").compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (tg_id) DO UPDATE SET" in sql
+    assert "full_name = coalesce(nullif(users.full_name, " in sql
+    assert "excluded.full_name), phone = excluded.phone" in sql
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("existing, expected", [("Ali", "Ali"), ("", "Vali")])
+async def test_upsert_name_on_postgres(pg, existing, expected):
+    _, sessions = pg
+    phone = "+998901234567"
+    async with sessions() as s:
+        s.add(User(tg_id=guest_tg_id(phone), full_name=existing))
+        await s.commit()
+
+    async with sessions() as s:
+        guest = upsert_guest_cte(phone, "Vali")
+        await s.execute(select(guest.c.id))
+        await s.commit()
+        user = (await s.execute(select(User))).scalar_one()
+    assert (user.full_name, user.phone) == (expected, phone)
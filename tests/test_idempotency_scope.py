@@ -0,0 +1,21 @@
+"""Idempotency kaliti doirasi: mehmonlar bir-birining javobini ololmaydi."""
+from app.api import OrderCreateRequest, _idempotency_scope
+
+
+def _body(phone: str) -> OrderCreateRequest:
+    return OrderCreateRequest(items=[], customer_name="Test", phone=phone, location={})
+
+
+def test_telegram_user_scope():
+    assert _idempotency_scope(_body("+998901234567"), 1001) == "1001"
+
+
+def test_guest_scope_follows_normalized_phone():
+    a = _idempotency_scope(_body("+998 (90) 123-45-67"), None)
+    assert a == _idempotency_scope(_body("901234567"), None)
+    assert a != _idempotency_scope(_body("+998901234568"), None)
+    assert a.startswith("guest-") and "901234567" not in a
+
+
+def test_invalid_guest_phone_has_no_scope():
+    assert _idempotency_scope(_body("12"), None) is None
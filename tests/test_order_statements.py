@@ -0,0 +1,119 @@
+"""
+Checkout yo'lidagi SQL round trip lar soni (so'rovlar + COMMIT) — Postgres da.
+
+asyncpg BEGIN ni alohida yubormaydi (birinchi so'rov bilan), shuning uchun
+sanalmaydi; COMMIT sanaladi.
+"""
+import pytest
+from sqlalchemy import event, func, select
+
+from app.models.notification_outbox import NotificationOutbox
+from app.models.order import Order
+from app.models.promo import Promo
+from app.models.sales_rollup import DailySales
+from app.models.user import User
+from app.services.guests import guest_tg_id
+from app.services.orders import create_order, find_user_for_order
+from app.services.promo import PromoUnavailable, checkout_promo
+
+pytestmark = pytest.mark.anyio
+
+BUDGET = 4  # SELECT user+dup (yoki promo), INSERT orders+CTE, INSERT order_items+CTE, COMMIT
+
+ITEMS = [
+    {"food_id": None, "name": "Lavash", "price": 28000.0, "qty": 2},
+    {"food_id": None, "name": "Cola 0.5", "price": 8000.0, "qty": 3},
+    {"food_id": None, "name": "Fri", "price": 15000.0, "qty": 1},
+]
+TOTAL = 95000.0
+GUEST_PHONE = "+998901234567"
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.engine = engine.sync_engine
+        self.log: list[str] = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.log.append(" ".join(statement.split())[:120])
+
+    def _on_commit(self, conn):
+        self.log.append("COMMIT")
+
+    def __enter__(self):
+        self.log = []
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        event.listen(self.engine, "commit", self._on_commit)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+        event.remove(self.engine, "commit", self._on_commit)
+
+
+async def test_existing_user_checkout(pg):
+    engine, sessions = pg
+    async with sessions() as s:
+        s.add(User(tg_id=1001, full_name="Test"))
+        await s.commit()
+
+    async with sessions() as s:
+        with StatementCounter(engine) as counter:
+            user, recent = await find_user_for_order(s, 1001, 60)
+            order = await create_order(
+                s, user, "Test", "+998900000000", None, TOTAL, 41.3, 69.2, ITEMS, notify_user=True
+            )
+
+    assert len(counter.log) <= BUDGET, counter.log
+    assert recent is None
+    assert len(order.items) == len(ITEMS)
+    assert order.created_at is not None and order.user.tg_id == 1001
+
+    async with sessions() as s:
+        outbox_rows = (await s.execute(select(func.count()).select_from(NotificationOutbox))).scalar_one()
+        day = (await s.execute(select(DailySales))).scalar_one()
+    assert outbox_rows == 2  # shop kanal + mijoz
+    assert (day.orders_count, day.orders_total) == (1, TOTAL)
+
+
+async def test_guest_promo_checkout(pg):
+    engine, sessions = pg
+    async with sessions() as s:
+        s.add(Promo(code="TEST10", discount_percent=10, usage_limit=5))
+        await s.commit()
+
+    async with sessions() as s:
+        with StatementCounter(engine) as counter:
+            promo = await checkout_promo(s, "test10")
+            order = await create_order(
+                s, None, "Guest", GUEST_PHONE, None, TOTAL, 41.3, 69.2, ITEMS,
+                promo=promo, guest_phone=GUEST_PHONE,
+            )
+
+    assert len(counter.log) <= BUDGET, counter.log
+    assert order.promo_code == "TEST10"
+    async with sessions() as s:
+        used = (await s.execute(select(Promo.used_count).where(Promo.code == "TEST10"))).scalar_one()
+        guest = (await s.execute(select(User).where(User.id == order.user_id))).scalar_one()
+    assert used == 1
+    assert guest.tg_id == guest_tg_id(GUEST_PHONE)
+
+
+async def test_unavailable_promo_writes_nothing(pg):
+    _, sessions = pg
+    async with sessions() as s:
+        s.add(Promo(code="USEDUP", discount_percent=10, usage_limit=1, used_count=1))
+        await s.commit()
+
+    async with sessions() as s:
+        with pytest.raises(PromoUnavailable):
+            await create_order(
+                s, None, "Guest", GUEST_PHONE, None, TOTAL, 41.3, 69.2, ITEMS,
+                promo={"code": "USEDUP", "discount_percent": 10, "limited": True},
+                guest_phone=GUEST_PHONE,
+            )
+
+    async with sessions() as s:
+        orders = (await s.execute(select(func.count()).select_from(Order))).scalar_one()
+        users = (await s.execute(select(func.count()).select_from(User))).scalar_one()
+    assert (orders, users) == (0, 0)
@@ -0,0 +1,122 @@
+"""Savatni server narxlari bilan qayta hisoblash (soxta menyu snapshoti bilan)."""
+from collections import namedtuple
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app import api
+from app.services import pricing
+from app.services.pricing import MAX_QTY, MIN_ORDER_TOTAL, CartError, price_cart
+
+pytestmark = pytest.mark.anyio
+
+Row = namedtuple("Row", "id name price is_active")
+
+MENU = {
+    1: {"id": 1, "name": "Lavash", "price": 28000},
+    2: {"id": 2, "name": "Cola 0.5", "price": 8000},
+}
+# Bittasi snapshotda bo'lmasa butun savat DB dan o'qiladi
+DB_ROWS = [
+    Row(1, "Lavash", 28000, True), Row(2, "Cola 0.5", 8000, True),
+    Row(3, "Somsa", 7000, True), Row(4, "Eski burger", 30000, False),
+]
+
+
+class FakeSession:
+    def __init__(self, rows=DB_ROWS):
+        self.rows = rows
+        self.queries = 0
+
+    async def execute(self, stmt, params=None):
+        self.queries += 1
+        ids = set(params["ids"])
+        return SimpleNamespace(all=lambda: [r for r in self.rows if r.id in ids])
+
+
+@pytest.fixture(autouse=True)
+def snapshot(monkeypatch):
+    monkeypatch.setattr(pricing, "current_snapshot", lambda: SimpleNamespace(foods_by_id=MENU))
+
+
+async def test_prices_come_from_menu_not_client():
+    session = FakeSession()
+    cart = await price_cart(session, [{"food_id": 1, "qty": 2, "price": 1, "name": "x"}])
+    assert cart == {
+        "items": [{"food_id": 1, "name": "Lavash", "price": 28000.0, "qty": 2}],
+        "subtotal": 56000.0, "discount": 0.0, "total": 56000.0,
+    }
+    assert session.queries == 0  # hammasi snapshotda
+
+
+async def test_duplicate_items_are_merged():
+    cart = await price_cart(FakeSession(), [
+        {"food_id": 1, "qty": 1}, {"food_id": 2, "qty": 3}, {"food_id": "1", "qty": 2},
+    ])
+    assert [(i["food_id"], i["qty"]) for i in cart["items"]] == [(1, 3), (2, 3)]
+    assert cart["total"] == 3 * 28000 + 3 * 8000
+
+
+@pytest.mark.parametrize("items", [
+    [{"food_id": 1, "qty": MAX_QTY + 1}],
+    [{"food_id": 1, "qty": MAX_QTY}, {"food_id": 1, "qty": 1}],  # birlashgandan keyin
+])
+async def test_qty_above_max(items):
+    with pytest.raises(CartError, match=str(MAX_QTY)):
+        await price_cart(FakeSession(), items)
+
+
+async def test_max_qty_is_allowed():
+    cart = await price_cart(FakeSession(), [{"food_id": 2, "qty": MAX_QTY}])
+    assert cart["items"][0]["qty"] == MAX_QTY
+
+
+@pytest.mark.parametrize("items", [
+    [],
+    [{"food_id": 1, "qty": 0}],
+    [{"food_id": 1, "qty": -2}],
+    [{"food_id": "abc", "qty": 1}],
+    [{"qty": 1}],
+    [{"food_id": 1, "qty": None}],
+])
+async def test_malformed_items(items):
+    with pytest.raises(CartError):
+        await price_cart(FakeSession(), items)
+
+
+async def test_food_outside_snapshot_is_read_from_db():
+    session = FakeSession()
+    cart = await price_cart(session, [{"food_id": 1, "qty": 1}, {"food_id": 3, "qty": 2}])
+    assert session.queries == 1
+    assert cart["total"] == 28000 + 2 * 7000
+
+
+@pytest.mark.parametrize("food_id", [4, 999])  # aktiv emas, mavjud emas
+async def test_inactive_or_unknown_food(food_id):
+    with pytest.raises(CartError, match="mavjud emas"):
+        await price_cart(FakeSession(), [{"food_id": 1, "qty": 1}, {"food_id": food_id, "qty": 1}])
+
+
+async def test_discount_is_rounded():
+    cart = await price_cart(FakeSession(), [{"food_id": 1, "qty": 1}, {"food_id": 2, "qty": 1}], 15)
+    assert cart["subtotal"] == 36000.0
+    assert cart["total"] == 30600.0 and cart["discount"] == 5400.0
+
+
+async def test_discount_below_min_order_total_is_rejected(monkeypatch):
+    items = [{"food_id": 1, "qty": 2}]  # 56 000 — minimaldan yuqori
+    cart = await price_cart(FakeSession(), items, 20)
+    assert cart["subtotal"] >= MIN_ORDER_TOTAL > cart["total"]
+
+    async def promo(session, code):
+        return {"code": code, "discount_percent": 20, "limited": False}
+
+    monkeypatch.setattr(api, "checkout_promo", promo)
+    body = api.OrderCreateRequest(
+        items=items, customer_name="Test", phone="+998901234567",
+        location={"lat": 41.3, "lng": 69.2}, promo_code="TEST20",
+    )
+    with pytest.raises(HTTPException) as e:
+        await api._create_order(body, None, FakeSession())
+    assert e.value.status_code == 400 and "Minimal" in e.value.detail
@@ -0,0 +1,51 @@
+"""Promo-kod formati va topilmagan kodlarni keshlamaslik."""
+import pytest
+
+from app.services import promo as promo_service
+from app.services.promo import CODE_MAX_LENGTH, normalize_code, validate_promo
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("fiesta20", "FIESTA20"),
+    ("  Yangi-2025 ", "YANGI-2025"),
+    ("A_B", "A_B"),
+    ("X" * CODE_MAX_LENGTH, "X" * CODE_MAX_LENGTH),
+    ("X" * (CODE_MAX_LENGTH + 1), None),
+    ("", None),
+    ("FIESTA 20", None),
+    ("ЯНГИ", None),
+    ("A%", None),
+    ("A'; --", None),
+])
+def test_normalize_code(raw, expected):
+    assert normalize_code(raw) == expected
+
+
+class CountingSession:
+    """Har ``execute`` ni sanaydi; promo jadvali bo'sh."""
+
+    def __init__(self):
+        self.queries = 0
+
+    async def execute(self, stmt):
+        self.queries += 1
+        return self
+
+    def scalar_one_or_none(self):
+        return None
+
+
+async def test_unknown_code_is_not_cached(fake_redis):
+    session = CountingSession()
+    assert await validate_promo(session, "NOPE") is None
+    assert await validate_promo(session, "NOPE") is None
+    assert session.queries == 2
+    assert [k async for k in fake_redis.scan_iter(match="cache:promo:*")] == []
+
+
+async def test_invalid_code_skips_lookup():
+    session = CountingSession()
+    assert await validate_promo(session, "x" * 10_000) is None
+    assert session.queries == 0
@@ -0,0 +1,89 @@
+"""Status o'zgarishida kunlik yig'indilar farqi (``status_change_deltas``)."""
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.models.order import OrderStatus
+from app.services.rollups import OrderFacts, status_change_deltas
+from app.utils.time import local_day
+
+UTC = timezone.utc
+CREATED = datetime(2025, 3, 10, 8, 0, tzinfo=UTC)     # 13:00 mahalliy, 10-mart
+DELIVERED = datetime(2025, 3, 10, 9, 0, tzinfo=UTC)   # 14:00 mahalliy, 10-mart
+LATE = datetime(2025, 3, 10, 19, 30, tzinfo=UTC)      # 00:30 mahalliy, 11-mart
+D10, D11 = date(2025, 3, 10), date(2025, 3, 11)
+TOTAL = 95000.0
+
+
+def facts(status, delivered_at=None, courier_id=None, created_at=CREATED):
+    return OrderFacts(OrderStatus(status), created_at, delivered_at, courier_id, TOTAL)
+
+
+def test_local_day_crosses_midnight_at_utc_19():
+    assert local_day(datetime(2025, 3, 10, 18, 59, tzinfo=UTC)) == D10
+    assert local_day(datetime(2025, 3, 10, 19, 0, tzinfo=UTC)) == D11
+
+
+@pytest.mark.parametrize("before, after, sales, couriers", [
+    pytest.param(
+        facts("COOKING"), facts("COOKING"), {}, {},
+        id="no-change",
+    ),
+    pytest.param(
+        facts("NEW"), facts("CONFIRMED"), {}, {},
+        id="active-to-active",
+    ),
+    pytest.param(
+        facts("OUT_FOR_DELIVERY", courier_id=7), facts("DELIVERED", DELIVERED, 7),
+        {(D10,): {"delivered_count": 1, "revenue": TOTAL}},
+        {(D10, 7): {"delivered_count": 1, "revenue": TOTAL}},
+        id="delivered",
+    ),
+    pytest.param(
+        facts("DELIVERED", DELIVERED, 7), facts("CANCELED", DELIVERED, 7),
+        {(D10,): {"delivered_count": -1, "revenue": -TOTAL, "canceled_count": 1}},
+        {(D10, 7): {"delivered_count": -1, "revenue": -TOTAL}},
+        id="delivered-to-canceled",
+    ),
+    pytest.param(
+        facts("CANCELED"), facts("NEW"),
+        {(D10,): {"canceled_count": -1}}, {},
+        id="uncanceled",
+    ),
+    pytest.param(
+        facts("DELIVERED", DELIVERED, 7), facts("DELIVERED", DELIVERED, 8),
+        {},  # kunlik savdo o'zgarmaydi
+        {(D10, 7): {"delivered_count": -1, "revenue": -TOTAL}, (D10, 8): {"delivered_count": 1, "revenue": TOTAL}},
+        id="courier-reassigned-after-delivery",
+    ),
+    pytest.param(
+        facts("COURIER_ASSIGNED", courier_id=7), facts("COURIER_ASSIGNED", courier_id=8), {}, {},
+        id="courier-reassigned-before-delivery",
+    ),
+    pytest.param(
+        facts("OUT_FOR_DELIVERY", courier_id=7), facts("DELIVERED", LATE, 7),
+        {(D11,): {"delivered_count": 1, "revenue": TOTAL}},  # yaratilgan kun emas, yetkazilgan kun
+        {(D11, 7): {"delivered_count": 1, "revenue": TOTAL}},
+        id="delivered-after-local-midnight",
+    ),
+    pytest.param(
+        facts("DELIVERED", LATE, 7, created_at=LATE), facts("CANCELED", LATE, 7, created_at=LATE),
+        {(D11,): {"delivered_count": -1, "revenue": -TOTAL, "canceled_count": 1}},
+        {(D11, 7): {"delivered_count": -1, "revenue": -TOTAL}},
+        id="canceled-after-local-midnight",
+    ),
+    pytest.param(
+        facts("DELIVERED", DELIVERED, 7), facts("CANCELED", LATE, 7),
+        {(D10,): {"delivered_count": -1, "revenue": -TOTAL, "canceled_count": 1}},  # bekor — created_at kuni
+        {(D10, 7): {"delivered_count": -1, "revenue": -TOTAL}},
+        id="canceled-next-local-day",
+    ),
+    pytest.param(
+        facts("DELIVERED", DELIVERED, 7), facts("DELIVERED", LATE, 7),
+        {(D10,): {"delivered_count": -1, "revenue": -TOTAL}, (D11,): {"delivered_count": 1, "revenue": TOTAL}},
+        {(D10, 7): {"delivered_count": -1, "revenue": -TOTAL}, (D11, 7): {"delivered_count": 1, "revenue": TOTAL}},
+        id="delivered-at-moved-across-midnight",
+    ),
+])
+def test_status_change_deltas(before, after, sales, couriers):
+    assert status_change_deltas(before, after) == (sales, couriers)
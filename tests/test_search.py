@@ -0,0 +1,99 @@
+"""Qidiruv: normalizatsiya, index ni bosqichma-bosqich yangilash va tartib."""
+import pytest
+
+from app.services.search import SearchIndex, normalize, tokenize
+
+
+def _food(fid, name, description=None, category_id=1, rating=0):
+    return {"id": fid, "name": name, "description": description, "category_id": category_id, "rating": rating}
+
+
+def _ids(results):
+    return [f["id"] for f in results]
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Шашлик", "Shashlik"),
+    ("Лаваш", "lavash"),
+    ("Чой", "Choy"),
+    ("Хот-дог", "Hot-dog"),
+    ("Пицца", "Pizza"),  # ц → z, takroriy harf
+    ("Кока-Кола", "Coca-Cola"),  # c → k
+    ("Қўй гўшти", "Qo'y go'shti"),
+    ("Qoʻy goʻshti", "Qo'y go'shti"),  # ʻ va ' apostroflar
+    ("Qo’y go`shti", "Qoy goshti"),
+    ("Xo'ja", "Kho'ja"),  # x / kh → h
+    ("Ёгурт", "Yogurt"),
+])
+def test_normalize_variants_match(a, b):
+    assert normalize(a) == normalize(b)
+
+
+@pytest.mark.parametrize("text, tokens", [
+    ("Хот-дог", ["hot", "dog"]),
+    ("Qo'y go'shti 0.5", ["koy", "goshti", "0", "5"]),
+    ("", []),
+    (None, []),
+])
+def test_tokenize(text, tokens):
+    assert tokenize(text) == tokens
+
+
+def test_sync_only_reindexes_changes():
+    index = SearchIndex()
+    foods = {1: _food(1, "Lavash"), 2: _food(2, "Shashlik")}
+    assert index.sync(foods) == 2
+    assert index.sync(dict(foods)) == 0
+
+    # 1 — nomi o'zgardi, 2 — o'chirildi, 3 — qo'shildi
+    foods = {1: _food(1, "Burger"), 3: _food(3, "Choy")}
+    assert index.sync(foods) == 3
+    assert _ids(index.search("lavash")) == []
+    assert _ids(index.search("burger")) == [1]
+    assert _ids(index.search("shashlik")) == []
+    assert _ids(index.search("чой")) == [3]
+    # eski tokenlar index dan butunlay ketgan
+    assert "lavash" not in index._exact and "l" not in index._prefix
+
+
+def test_sync_description_change():
+    index = SearchIndex()
+    index.sync({1: _food(1, "Osh", "guruch va go'sht")})
+    assert index.sync({1: _food(1, "Osh", "sabzi")}) == 1
+    assert _ids(index.search("guruch")) == []
+    assert _ids(index.search("sabzi")) == [1]
+
+
+@pytest.mark.parametrize("query, expected", [
+    # barcha so'zlar mos kelishi shart (AND)
+    ("tovuk lavash", [2, 3]),
+    ("lavash pishloq", [3]),
+    ("pishloq tovuk", [3]),
+    ("lavash burger", []),
+    # nomdagi to'liq moslik > nomdagi prefiks > tavsif
+    ("lavash", [2, 1, 3, 6, 4]),  # teng ball — reyting, keyin id bo'yicha
+    ("lav", [2, 6, 1, 3, 4]),
+    ("tov", [2, 3]),
+    # kirill so'rov, "hot dog" → "hotdog" birikmasi
+    ("лаваш тов", [2, 3]),
+    ("hotdog", [5]),
+    ("hot-dog", [5]),
+])
+def test_multi_word_ranking(query, expected):
+    index = SearchIndex()
+    index.sync({
+        1: _food(1, "Lavash", rating=4),
+        2: _food(2, "Tovuk lavash", rating=5),
+        3: _food(3, "Lavash tovuk", "pishloq bilan", rating=3),
+        4: _food(4, "Shaurma", "lavash ichida", rating=5),
+        5: _food(5, "Hot dog"),
+        6: _food(6, "Lavashli somsa", rating=5),
+    })
+    assert _ids(index.search(query)) == expected
+
+
+def test_category_filter_and_limit():
+    index = SearchIndex()
+    index.sync({i: _food(i, f"Choy {i}", category_id=1 + i % 2) for i in range(1, 7)})
+    assert _ids(index.search("choy", category_id=2)) == [1, 3, 5]
+    assert len(index.search("choy", limit=2)) == 2
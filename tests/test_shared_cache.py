@@ -0,0 +1,239 @@
+"""
+shared_cache: versiya kalitlari, lokal nusxa, generation guard va workerlar
+o'rtasidagi pub/sub invalidatsiya.
+
+Bitta jarayonda ikki "worker" — modulning ikki mustaqil nusxasi (o'z lokal
+keshi, WORKER_ID, Redis klienti va tinglovchisi bilan). Ikki worker testlari
+fakeredis da va, topilsa, haqiqiy ``redis-server`` da ishlaydi; ulanishni
+uzish (qayta obuna) testi faqat ``redis-server`` da.
+"""
+import asyncio
+import importlib.util
+import shutil
+import socket
+import subprocess
+import time
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+from redis.asyncio import from_url
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.services import shared_cache
+
+pytestmark = pytest.mark.anyio
+
+NS = "test"
+WAIT = 10.0  # soniya — tinglovchi xatodan keyin 5 s kutib qayta ulanadi
+
+
+async def _wait(predicate, timeout: float = WAIT) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.02)
+    return True
+
+
+class Source:
+    """Loader — chaqiruvlar sonini sanaydi."""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+# ── Bitta worker (conftest dagi fakeredis) ──────────────────────────────────
+
+async def test_loader_result_is_shared_through_redis(fake_redis):
+    source = Source({"a": 1})
+    assert await shared_cache.cached(NS, "k", source) == {"a": 1}
+    assert await fake_redis.get("cache:test:0:k") == b'{"a": 1}'
+
+    # Tinglovchi yo'q — lokal nusxa yo'q, ikkinchi o'qish Redis dan
+    assert NS not in shared_cache._local
+    assert await shared_cache.cached(NS, "k", source) == {"a": 1}
+    assert source.calls == 1
+
+
+async def test_invalidate_bumps_version(fake_redis):
+    source = Source(1)
+    await shared_cache.cached(NS, "k", source)
+    source.value = 2
+    await shared_cache.invalidate(NS)
+
+    assert await fake_redis.get("cache:test:version") == b"1"
+    assert await shared_cache.cached(NS, "k", source) == 2
+    assert source.calls == 2
+
+
+async def test_invalidate_preload_is_written_before_publish(fake_redis):
+    await shared_cache.invalidate(NS, preload={"k": [1, 2]})
+    source = Source(None)
+    assert await shared_cache.cached(NS, "k", source) == [1, 2]
+    assert source.calls == 0
+
+
+async def test_local_copy_only_while_listening(monkeypatch):
+    source = Source(1)
+    monkeypatch.setattr(shared_cache, "_listening", True)
+    await shared_cache.cached(NS, "k", source)
+    assert shared_cache._local[NS] == {"k": 1}
+
+    shared_cache.drop_local(NS)
+    assert NS not in shared_cache._local
+    assert shared_cache._generation[NS] == 1
+
+
+async def test_generation_guard(monkeypatch):
+    monkeypatch.setattr(shared_cache, "_listening", True)
+
+    async def stale_loader():
+        shared_cache.drop_local(NS)  # yuklash paytida invalidatsiya keldi
+        return "eski"
+
+    assert await shared_cache.cached(NS, "k", stale_loader) == "eski"
+    assert "k" not in shared_cache._local.get(NS, {})
+
+
+async def test_redis_down_falls_back_to_loader(monkeypatch):
+    class Down:
+        async def get(self, key):
+            raise RedisConnectionError("down")
+
+    monkeypatch.setattr(shared_cache, "get_redis", lambda: Down())
+    source = Source(7)
+    assert await shared_cache.cached(NS, "k", source) == 7
+    assert not shared_cache._redis_ok()
+    # Qayta urinish vaqtigacha Redis ga bormaydi
+    assert await shared_cache.cached(NS, "k", source) == 7
+    assert source.calls == 2
+
+
+# ── Ikki worker ─────────────────────────────────────────────────────────────
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def redis_server_url():
+    binary = shutil.which("redis-server")
+    if not binary:
+        pytest.skip("redis-server topilmadi")
+    port = _free_port()
+    proc = subprocess.Popen(
+        [binary, "--port", str(port), "--bind", "127.0.0.1", "--save", "", "--appendonly", "no"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                proc.kill()
+                pytest.skip("redis-server ishga tushmadi")
+            time.sleep(0.05)
+    yield f"redis://127.0.0.1:{port}/0"
+    proc.terminate()
+    proc.wait(timeout=5)
+
+
+@pytest.fixture(params=["fakeredis", "redis-server"])
+def redis_client_factory(request, fake_redis_server):
+    if request.param == "fakeredis":
+        return lambda name: FakeRedis(server=fake_redis_server)
+    url = request.getfixturevalue("redis_server_url")
+    return lambda name: from_url(url, client_name=f"shared-cache-test-{name}")
+
+
+def _module_copy():
+    spec = importlib.util.find_spec("app.services.shared_cache")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+async def workers(redis_client_factory):
+    """Ikki tinglayotgan worker ``(a, b)``; ``w.client`` — uning Redis klienti."""
+    pair = []
+    for name in ("a", "b"):
+        module = _module_copy()
+        client = redis_client_factory(name)
+        module.get_redis = lambda client=client: client
+        module.client = client
+        module.listener = asyncio.create_task(module.run_invalidation_listener())
+        pair.append(module)
+    a, b = pair
+    assert await _wait(lambda: a.is_listening() and b.is_listening())
+    yield a, b
+    for w in pair:
+        w.listener.cancel()
+    await asyncio.gather(*(w.listener for w in pair), return_exceptions=True)
+    await a.client.flushdb()
+    for w in pair:
+        await w.client.aclose()
+
+
+async def test_invalidate_reaches_other_worker(workers):
+    a, b = workers
+    source = Source(1)
+    assert await a.cached(NS, "k", source) == 1
+    assert await b.cached(NS, "k", source) == 1  # Redis dan
+    assert source.calls == 1 and b._local[NS] == {"k": 1}
+
+    source.value = 2
+    await a.invalidate(NS)
+    assert await _wait(lambda: NS not in b._local)
+    assert await b.cached(NS, "k", source) == 2
+
+
+async def test_generation_guard_across_workers(workers):
+    a, b = workers
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_loader():
+        started.set()
+        await release.wait()
+        return "eski"
+
+    load = asyncio.create_task(b.cached(NS, "k", slow_loader))
+    await asyncio.wait_for(started.wait(), WAIT)
+    await a.invalidate(NS)
+    assert await _wait(lambda: b._generation.get(NS, 0) == 1)
+    release.set()
+
+    assert await asyncio.wait_for(load, WAIT) == "eski"
+    assert "k" not in b._local.get(NS, {})
+
+
+async def test_resubscribe_drops_local_copy(workers):
+    a, b = workers
+    if isinstance(b.client, FakeRedis):
+        pytest.skip("ulanishni uzish faqat redis-server da")
+    source = Source(1)
+    await b.cached(NS, "k", source)
+    assert b._local[NS] == {"k": 1}
+
+    # Uzilish paytidagi xabar yo'qolgan: versiya oshdi, publish yo'q
+    source.value = 2
+    await a.client.incr(a._version_key(NS))
+    killed = 0
+    for conn in await a.client.client_list(_type="pubsub"):
+        if conn.get("name") == "shared-cache-test-b":
+            killed += await a.client.client_kill_filter(_id=conn["id"])
+    assert killed == 1
+
+    assert await _wait(lambda: NS not in b._local)
+    assert await _wait(b.is_listening)
+    assert await b.cached(NS, "k", source) == 2
@@ -0,0 +1,30 @@
+"""/uploads: faqat asl (hash nomli) fayllar immutable."""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.static_assets import IMMUTABLE, UploadFiles
+
+SET_ID = "0123456789abcdef0123456789abcdef"
+
+
+@pytest.fixture
+def client(tmp_path):
+    (tmp_path / "v").mkdir()
+    for name in (f"{SET_ID}.jpg", f"v/{SET_ID}_320.webp", f"v/{SET_ID}.json", "logo.png"):
+        (tmp_path / name).write_bytes(b"x")
+    app = FastAPI()
+    app.mount("/uploads", UploadFiles(directory=tmp_path), name="uploads")
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path, cache_control", [
+    (f"{SET_ID}.jpg", IMMUTABLE),
+    (f"v/{SET_ID}_320.webp", "no-cache"),  # backfill --force qayta yozadi
+    (f"v/{SET_ID}.json", "no-cache"),
+    ("logo.png", "no-cache"),
+])
+def test_upload_cache_control(client, path, cache_control):
+    response = client.get(f"/uploads/{path}")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == cache_control
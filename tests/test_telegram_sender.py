@@ -0,0 +1,186 @@
+"""Telegram rate limit: token bucket, ustuvorlik navbati va 429 dan keyin qayta urinish (soxta soat bilan)."""
+import asyncio
+import heapq
+import itertools
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import GetMe, SendMessage
+
+from app.services import telegram_sender
+from app.services.telegram_sender import (
+    GROUP_CHAT_RATE,
+    MAX_RETRIES,
+    MAX_RETRY_AFTER,
+    PRIORITY_CHANNEL,
+    PRIORITY_COURIER,
+    PRIORITY_CUSTOMER,
+    RateLimitMiddleware,
+    SendScheduler,
+    TokenBucket,
+    send_priority,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeClock:
+    """``time.monotonic`` va ``asyncio.sleep`` o'rniga: vaqt faqat ``run`` ichida, eng yaqin taymerga sakraydi."""
+
+    def __init__(self):
+        self.now = 0.0
+        self._timers: list = []
+        self._seq = itertools.count()
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float):
+        if delay <= 0:
+            await asyncio.sleep(0)
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._timers, (self.now + delay, next(self._seq), fut))
+        await fut
+
+    async def run(self, *aws):
+        """Korutinlarni bajaradi; hamma kutib qolganda vaqtni keyingi taymergacha suradi."""
+        tasks = [asyncio.ensure_future(aw) for aw in aws]
+        while not all(t.done() for t in tasks):
+            for _ in range(50):  # tayyor vazifalar o'z qadamini qilsin
+                await asyncio.sleep(0)
+            if all(t.done() for t in tasks):
+                break
+            assert self._timers, "deadlock: taymer yo'q, vazifalar tugamagan"
+            at, _, fut = heapq.heappop(self._timers)
+            self.now = max(self.now, at)
+            fut.set_result(None)
+        return [t.result() for t in tasks]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(telegram_sender, "time", SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(telegram_sender, "asyncio", SimpleNamespace(
+        sleep=clock.sleep,
+        get_running_loop=asyncio.get_running_loop,
+        create_task=asyncio.create_task,
+    ))
+    return clock
+
+
+def test_token_bucket(clock):
+    bucket = TokenBucket(rate=2.0, capacity=2)
+    assert bucket.reserve(0.0) == 0.0
+    assert bucket.reserve(0.0) == 0.0
+    assert bucket.reserve(0.0) == 0.5   # navbatdagi token 0.5 s dan keyin
+    assert bucket.reserve(0.0) == 1.0
+    assert not bucket.is_idle(1.0)
+    assert bucket.is_idle(2.0)
+
+    bucket.pause(2.0, 10)
+    assert bucket.reserve(2.0) == pytest.approx(10.0)
+
+
+async def _record(clock, sched, log, tag, chat_id, priority):
+    await sched.acquire(chat_id, priority)
+    log.append((tag, clock.now))
+
+
+async def test_high_priority_goes_before_bulk(clock):
+    sched = SendScheduler(global_rate=1.0)
+    log = []
+    # Global token band — hammasi navbatga tushadi
+    await clock.run(_record(clock, sched, log, "first", None, PRIORITY_CUSTOMER))
+    await clock.run(
+        *(_record(clock, sched, log, f"bulk{i}", None, PRIORITY_CUSTOMER) for i in range(3)),
+        _record(clock, sched, log, "channel", None, PRIORITY_CHANNEL),
+        _record(clock, sched, log, "courier", None, PRIORITY_COURIER),
+    )
+    assert [tag for tag, _ in log] == ["first", "courier", "channel", "bulk0", "bulk1", "bulk2"]
+    assert [t for _, t in log] == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+async def test_private_chat_bucket(clock):
+    sched = SendScheduler()
+    log = []
+    await clock.run(
+        *(_record(clock, sched, log, "a", 101, PRIORITY_CUSTOMER) for _ in range(3)),
+        _record(clock, sched, log, "b", 202, PRIORITY_CUSTOMER),
+    )
+    # bitta chatga 1/s; boshqa chat kutmaydi
+    assert sorted(t for tag, t in log if tag == "a") == [0.0, 1.0, 2.0]
+    assert [t for tag, t in log if tag == "b"] == [0.0]
+
+
+async def test_group_chat_bucket(clock):
+    sched = SendScheduler()
+    log = []
+    await clock.run(*(_record(clock, sched, log, "g", -100500, PRIORITY_CHANNEL) for _ in range(5)))
+    step = 1 / GROUP_CHAT_RATE
+    assert sorted(t for _, t in log) == pytest.approx([0.0, 0.0, 0.0, step, 2 * step])
+
+
+class StubRequest:
+    """``make_request`` o'rniga: avval ``failures`` marta 429, keyin javob."""
+
+    def __init__(self, clock, failures: int, retry_after: int = 5):
+        self.clock = clock
+        self.failures = failures
+        self.retry_after = retry_after
+        self.calls: list[float] = []
+
+    async def __call__(self, bot, method):
+        self.calls.append(self.clock.now)
+        if len(self.calls) <= self.failures:
+            raise TelegramRetryAfter(method, "Too Many Requests", self.retry_after)
+        return "ok"
+
+
+async def test_retry_after_429(clock):
+    middleware = RateLimitMiddleware(SendScheduler())
+    stub = StubRequest(clock, failures=2, retry_after=5)
+    [result] = await clock.run(middleware(stub, None, SendMessage(chat_id=101, text="x")))
+    assert result == "ok"
+    assert stub.calls == [0.0, 5.0, 10.0]  # har safar chat retry_after ga to'xtatildi
+
+
+async def test_retry_gives_up_after_max_retries(clock):
+    middleware = RateLimitMiddleware(SendScheduler())
+    stub = StubRequest(clock, failures=MAX_RETRIES + 1)
+    with pytest.raises(TelegramRetryAfter):
+        await clock.run(middleware(stub, None, SendMessage(chat_id=101, text="x")))
+    assert len(stub.calls) == MAX_RETRIES + 1
+
+
+async def test_long_retry_after_is_not_waited(clock):
+    middleware = RateLimitMiddleware(SendScheduler())
+    stub = StubRequest(clock, failures=1, retry_after=MAX_RETRY_AFTER + 1)
+    with pytest.raises(TelegramRetryAfter):
+        await clock.run(middleware(stub, None, SendMessage(chat_id=101, text="x")))
+    assert stub.calls == [0.0]
+
+
+async def test_unlimited_methods_bypass_scheduler(clock):
+    sched = SendScheduler(global_rate=1.0)
+    sched._global.reserve(0.0)  # global token tugagan
+    stub = StubRequest(clock, failures=0)
+    assert await RateLimitMiddleware(sched)(stub, None, GetMe()) == "ok"
+    assert sched.stats() == {"waiting": 0, "chats": 0}
+
+
+async def test_send_priority_is_used(clock, monkeypatch):
+    seen = []
+
+    async def acquire(chat_id, priority):
+        seen.append(priority)
+
+    sched = SendScheduler()
+    monkeypatch.setattr(sched, "acquire", acquire)
+    stub = StubRequest(clock, failures=0)
+    with send_priority(PRIORITY_COURIER):
+        await RateLimitMiddleware(sched)(stub, None, SendMessage(chat_id=1, text="x"))
+    await RateLimitMiddleware(sched)(stub, None, SendMessage(chat_id=1, text="x"))
+    assert seen == [PRIORITY_COURIER, telegram_sender.PRIORITY_DEFAULT]
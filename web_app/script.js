@@ -15,9 +15,13 @@ let state = {
   selectedCat: 'all',
   sortBy: '',
   search: '',
+  searchIds: null,
   promoCode: null,
   promoDiscount: 0,
   location: null,
+  shop: null,
+  orderKey: null,     // Idempotency-Key joriy buyurtma uchun
+  orderKeyFor: null,
 };
 
 const $ = id => document.getElementById(id);
@@ -44,13 +48,28 @@ const promoResult = $('promoResult');
 
 function getInitData() { return tg?.initData || ''; }
 
+// Menyu javoblari ETag bilan keladi — localStorage dagi nusxa o'zgarmagan bo'lsa
+// server 304 qaytaradi va tana qayta yuklanmaydi.
+function cacheGet(key) {
+  try { return JSON.parse(localStorage.getItem('api:' + key)); } catch { return null; }
+}
+function cachePut(key, etag, data) {
+  try { localStorage.setItem('api:' + key, JSON.stringify({ etag, data })); } catch {}
+}
+
 async function apiFetch(endpoint) {
   const sep = endpoint.includes('?') ? '&' : '?';
   const init_data = encodeURIComponent(getInitData());
   const url = `${API_BASE}${endpoint}${sep}init_data=${init_data}`;
-  const resp = await fetch(url);
+  const cached = cacheGet(endpoint);
+  const headers = cached?.etag ? { 'If-None-Match': cached.etag } : {};
+  const resp = await fetch(url, { headers });
+  if (resp.status === 304 && cached) return cached.data;
   if (!resp.ok) throw new Error(await resp.text());
-  return resp.json();
+  const data = await resp.json();
+  const etag = resp.headers.get('ETag');
+  if (etag) cachePut(endpoint, etag, data);
+  return data;
 }
 
 async function init() {
@@ -59,12 +78,10 @@ async function init() {
     $('customerName').value = [u.first_name, u.last_name].filter(Boolean).join(' ');
   }
   try {
-    const [cats, foods] = await Promise.all([
-      apiFetch('/api/categories'),
-      apiFetch('/api/foods'),
-    ]);
-    state.categories = cats;
-    state.foods = foods;
+    const boot = await apiFetch('/api/bootstrap');
+    state.categories = boot.categories;
+    state.foods = boot.foods;
+    state.shop = boot.shop;
     renderCategories();
     renderFoods();
   } catch (e) {
@@ -102,8 +119,14 @@ function getFilteredFoods() {
     foods = foods.filter(f => String(f.category_id) === String(state.selectedCat));
   }
   if (state.search.trim()) {
-    const q = state.search.toLowerCase();
-    foods = foods.filter(f => f.name.toLowerCase().includes(q) || (f.description || '').toLowerCase().includes(q));
+    if (state.searchIds) {
+      // Server reytingi bo'yicha tartib (lotin/kirill qidiruvi)
+      const rank = new Map(state.searchIds.map((id, i) => [id, i]));
+      foods = foods.filter(f => rank.has(f.id)).sort((a, b) => rank.get(a.id) - rank.get(b.id));
+    } else {
+      const q = state.search.toLowerCase();
+      foods = foods.filter(f => f.name.toLowerCase().includes(q) || (f.description || '').toLowerCase().includes(q));
+    }
   }
   if (state.sortBy === 'rating') foods.sort((a, b) => b.rating - a.rating);
   else if (state.sortBy === 'new') foods.sort((a, b) => b.id - a.id);
@@ -131,9 +154,18 @@ function createFoodCard(food) {
   card.className = 'food-card';
   card.dataset.id = food.id;
 
-  const imgHtml = food.image_url
-    ? `<img class="food-img" src="${escHtml(food.image_url)}" alt="${escHtml(food.name)}" loading="lazy" onerror="this.style.display='none';this.nextElementSibling.style.display='flex'">`
-    : '';
+  const onErr = `this.closest('.food-img-wrap').querySelector('.food-img-placeholder').style.display='flex';this.style.display='none'`;
+  let imgHtml = '';
+  if (food.image_variants) {
+    // Kartochka ekranning ~yarmi — brauzer kerakli kenglikni o'zi tanlaydi
+    const v = food.image_variants;
+    const set = ext => v.w.map(w => `${escHtml(v.src)}_${w}.${ext} ${w}w`).join(', ');
+    const mid = v.w[Math.min(1, v.w.length - 1)];
+    imgHtml = `<picture><source type="image/webp" srcset="${set('webp')}" sizes="50vw">`
+      + `<img class="food-img" src="${escHtml(v.src)}_${mid}.jpg" srcset="${set('jpg')}" sizes="50vw" alt="${escHtml(food.name)}" loading="lazy" onerror="${onErr}"></picture>`;
+  } else if (food.image_url) {
+    imgHtml = `<img class="food-img" src="${escHtml(food.image_url)}" alt="${escHtml(food.name)}" loading="lazy" onerror="${onErr}">`;
+  }
   const placeholder = `<div class="food-img-placeholder" ${food.image_url ? 'style="display:none"' : ''}>🍔</div>`;
   const badge = food.is_new ? `<span class="badge-new">NEW</span>` : '';
   const inCart = state.cart[food.id];
@@ -294,6 +326,7 @@ submitOrderBtn.addEventListener('click', async () => {
   if (!name) { alert('Ismingizni kiriting'); return; }
   if (!phone) { alert('Telefon raqamingizni kiriting'); return; }
   if (!state.location) { alert('Yetkazib berish uchun joylashuvni ko\'rsating'); return; }
+  if (state.shop && !state.shop.is_open) { alert(`Hozir yopiqmiz. Ish vaqti: ${state.shop.work_hours}`); return; }
 
   const items = cartItems().map(({ food, qty }) => ({
     food_id: food.id, name: food.name, qty, price: food.price,
@@ -311,6 +344,16 @@ submitOrderBtn.addEventListener('click', async () => {
     created_at_client: new Date().toISOString(),
   };
 
+  // Xuddi shu buyurtmani qayta yuborish (tarmoq xatosi) — o'sha kalit, server ikkinchi buyurtma yaratmaydi
+  const { created_at_client, ...orderBody } = payload;
+  const orderFingerprint = JSON.stringify(orderBody);
+  if (state.orderKeyFor !== orderFingerprint) {
+    state.orderKey = (window.crypto && crypto.randomUUID)
+      ? crypto.randomUUID()
+      : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+    state.orderKeyFor = orderFingerprint;
+  }
+
   submitOrderBtn.disabled = true;
   submitOrderBtn.textContent = '⏳ Yuborilmoqda...';
 
@@ -318,13 +361,14 @@ submitOrderBtn.addEventListener('click', async () => {
     const init_data = encodeURIComponent(getInitData());
     const resp = await fetch(`${API_BASE}/api/orders?init_data=${init_data}`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', 'Idempotency-Key': state.orderKey },
       body: JSON.stringify(payload),
     });
     const result = await resp.json();
     if (!resp.ok) throw new Error(result.detail || 'Xatolik yuz berdi');
 
     // Muvaffaqiyatli — savatni tozalash
+    state.orderKey = state.orderKeyFor = null;
     checkoutModal.style.display = 'none';
     state.cart = {};
     updateCartPanel();
@@ -360,7 +404,20 @@ applyFilter.addEventListener('click', () => {
 let searchTimer;
 searchInput.addEventListener('input', () => {
   clearTimeout(searchTimer);
-  searchTimer = setTimeout(() => { state.search = searchInput.value; renderFoods(); }, 250);
+  searchTimer = setTimeout(async () => {
+    const q = searchInput.value;
+    state.search = q;
+    state.searchIds = null;
+    if (q.trim()) {
+      try {
+        const hits = await apiFetch(`/api/foods/search?q=${encodeURIComponent(q.trim())}&limit=100`);
+        if (state.search === q) state.searchIds = hits.map(f => f.id);
+      } catch (e) {
+        console.error(e);
+      }
+    }
+    if (state.search === q) renderFoods();
+  }, 250);
 });
 
 function fmt(n) { return Math.round(n).toLocaleString('uz-UZ') + ' so\'m'; }